@@ -17,8 +17,16 @@
     'depends': ['base'],
     'data': [
         'security/ir.model.access.csv',
+        'wizard/opcua_node_import_views.xml',
+        'wizard/opcua_data_export_views.xml',
         'views/opcua_device_views.xml',
+        'views/opcua_node_views.xml',
         'views/opcua_data_views.xml',
+        'views/opcua_data_rollup_views.xml',
+        'views/opcua_alarm_event_views.xml',
+        'views/opcua_bridge_views.xml',
+        'views/opcua_worker_views.xml',
+        'data/ir_cron_data.xml',
     ],
     'installable': True,
     'application': True,
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""Offline benchmark of the OPC UA collection paths.
+
+Starts local simulation servers (``server/simserver.js``, one endpoint per
+simulated device), the OPC UA API bridge (``server/opcuaapi.js``) and runs
+one or more scenarios against them:
+
+- ``bridge``: ``POST /data`` per device and ``POST /data/batch``, no Odoo
+- ``fetch``: ``opcua.device.fetch_data()`` per device, through ``odoo-bin shell``
+- ``batch``: ``opcua.device._collect_by_bridge()`` over all devices
+- ``cron``: ``opcua.data.fetch_opcua_data()``, the scheduled collection
+- ``polling``: the polling scheduler for ``--duration`` seconds
+
+Results (throughput, poll latency percentiles, history rows/s, memory) are
+printed and saved as JSON under ``--output`` so runs of different commits
+can be compared with ``--compare``. Only the standard library is needed
+here; the Odoo scenarios run ``odoo_driver.py`` inside ``odoo-bin shell``.
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+SERVER_DIR = os.path.join(ROOT_DIR, 'server')
+ODOO_SCENARIOS = ('fetch', 'batch', 'cron', 'polling')
+SCENARIOS = ('bridge',) + ODOO_SCENARIOS
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples``, None when empty."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies_ms, samples, elapsed, errors=0, rows=None):
+    """Common result block of a scenario."""
+    result = {
+        'polls': len(latencies_ms),
+        'errors': errors,
+        'samples': samples,
+        'elapsed_s': round(elapsed, 3),
+        'samples_per_s': round(samples / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'p50': percentile(latencies_ms, 50),
+            'p95': percentile(latencies_ms, 95),
+            'p99': percentile(latencies_ms, 99),
+            'max': max(latencies_ms) if latencies_ms else None,
+        },
+    }
+    if rows is not None:
+        result['db_rows'] = rows
+        result['db_rows_per_s'] = round(rows / elapsed, 1) if elapsed else None
+    return result
+
+
+def rss_kb(pid):
+    """Current and peak resident memory of a process, from /proc (Linux only)."""
+    memory = {}
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    key, value = line.split(':', 1)
+                    memory['rss_kb' if key == 'VmRSS' else 'peak_rss_kb'] = int(value.split()[0])
+    except OSError:
+        pass
+    return memory
+
+
+def port_in_use(port):
+    with socket.socket() as sock:
+        return sock.connect_ex(('127.0.0.1', port)) == 0
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Nothing is listening on port {port} after {timeout} s")
+
+
+def http_json(url, payload=None, timeout=30):
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Processes:
+    """Simulation servers and bridge started for the run, stopped on exit."""
+
+    def __init__(self, args):
+        self.args = args
+        self.sims = []
+        self.bridge = None
+        self.logs = []
+
+    def __enter__(self):
+        args = self.args
+        busy = [port for port in [args.api_port] + [args.sim_port + i for i in range(args.endpoints)]
+                if port_in_use(port)]
+        if busy:
+            raise RuntimeError(f"Port(s) {', '.join(map(str, busy))} already in use, stop what runs there "
+                               f"or pick others with --sim-port/--api-port")
+        for i in range(args.endpoints):
+            port = args.sim_port + i
+            env = dict(os.environ, SIM_PORT=str(port), SIM_TAGS=str(args.tags), SIM_CHANGE_MS=str(args.change_ms))
+            self.sims.append(self._spawn(['node', 'simserver.js'], env, f'sim-{port}'))
+        for i in range(args.endpoints):
+            wait_for_port(args.sim_port + i)
+        env = dict(os.environ, API_PORT=str(args.api_port))
+        self.bridge = self._spawn(['node', 'opcuaapi.js'], env, 'bridge')
+        wait_for_port(args.api_port)
+        return self
+
+    def __exit__(self, *exc):
+        for process in [self.bridge] + self.sims:
+            if process and process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        for log in self.logs:
+            log.close()
+
+    def _spawn(self, cmd, env, name):
+        log = open(os.path.join(self.args.output, f'{name}.log'), 'w')
+        self.logs.append(log)
+        return subprocess.Popen(cmd, cwd=SERVER_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    def memory(self):
+        return {
+            'bridge': rss_kb(self.bridge.pid),
+            'simulators': [rss_kb(process.pid) for process in self.sims],
+        }
+
+
+def endpoints(args):
+    """OPC UA endpoint of every simulated device; devices share endpoints round-robin."""
+    return [f'opc.tcp://localhost:{args.sim_port + i % args.endpoints}/UA/Sim' for i in range(args.devices)]
+
+
+def node_ids(args):
+    return [f'ns=1;s=MyObject.Tag{j}' for j in range(args.tags)]
+
+
+def run_bridge(args):
+    """Drive the bridge directly, one ``/data`` call per device, then ``/data/batch``."""
+    base_url = f'http://127.0.0.1:{args.api_port}'
+    nodes = node_ids(args)
+    devices = endpoints(args)
+    # Warm up: open the sessions before measuring
+    for endpoint in set(devices):
+        http_json(base_url + '/data', {'endpoint': endpoint, 'node_ids': nodes})
+
+    results = {}
+    latencies, samples, errors = [], 0, 0
+    start = time.perf_counter()
+    for _iteration in range(args.iterations):
+        for endpoint in devices:
+            t0 = time.perf_counter()
+            data = http_json(base_url + '/data', {'endpoint': endpoint, 'node_ids': nodes})
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += bool(data.get('error'))
+            samples += len(data.get('values') or {})
+    results['data'] = summarize(latencies, samples, time.perf_counter() - start, errors)
+
+    latencies, samples, errors = [], 0, 0
+    payload = {'requests': [{'key': i, 'endpoint': endpoint, 'node_ids': nodes} for i, endpoint in enumerate(devices)]}
+    start = time.perf_counter()
+    for _iteration in range(args.iterations):
+        t0 = time.perf_counter()
+        data = http_json(base_url + '/data/batch', payload)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        for result in data.get('results', []):
+            errors += bool(result.get('error'))
+            samples += len(result.get('values') or {})
+    results['data_batch'] = summarize(latencies, samples, time.perf_counter() - start, errors)
+    return results
+
+
+def run_odoo(args, scenario):
+    """Run one scenario inside ``odoo-bin shell`` and return the result it prints."""
+    config = {
+        'scenario': scenario,
+        'devices': endpoints(args),
+        'node_ids': node_ids(args),
+        'api_url': f'http://127.0.0.1:{args.api_port}',
+        'iterations': args.iterations,
+        'duration': args.duration,
+        'interval': args.interval,
+        'keep': args.keep,
+    }
+    cmd = [args.odoo_bin, 'shell', '-d', args.database, '--no-http', '--log-level', args.odoo_log_level]
+    cmd += args.odoo_arg
+    env = dict(os.environ, BENCH_CONFIG=json.dumps(config))
+    with open(os.path.join(BENCH_DIR, 'odoo_driver.py')) as driver:
+        completed = subprocess.run(cmd, stdin=driver, env=env, capture_output=True, text=True)
+    with open(os.path.join(args.output, f'odoo-{scenario}.log'), 'w') as log:
+        log.write(completed.stdout)
+        log.write(completed.stderr)
+    for line in completed.stdout.splitlines():
+        if line.startswith('BENCH_RESULT '):
+            raw = json.loads(line[len('BENCH_RESULT '):])
+            result = summarize(raw['latencies_ms'], raw['samples'], raw['elapsed_s'], raw['errors'], raw['db_rows'])
+            result['memory'] = raw['memory']
+            return result
+    raise RuntimeError(f"odoo-bin shell did not report a result for '{scenario}' "
+                       f"(exit code {completed.returncode}), see odoo-{scenario}.log")
+
+
+def compare(previous_path, current):
+    """Print the relative change of the headline metrics against a previous run."""
+    with open(previous_path) as previous_file:
+        previous = json.load(previous_file)
+    print(f"\nCompared with {previous['meta'].get('commit')} ({previous['meta'].get('started')}):")
+    for name, result in flatten(current['results']).items():
+        before = flatten(previous.get('results', {})).get(name)
+        if not before:
+            continue
+        for metric, getter in (('samples/s', lambda r: r.get('samples_per_s')),
+                               ('p95 ms', lambda r: r['latency_ms'].get('p95')),
+                               ('db rows/s', lambda r: r.get('db_rows_per_s'))):
+            old, new = getter(before), getter(result)
+            if old and new is not None:
+                print(f"  {name:<20} {metric:<10} {old:>10.1f} -> {new:>10.1f} ({(new - old) / old * 100:+.1f}%)")
+
+
+def flatten(results):
+    """Scenario results keyed by ``scenario`` or ``scenario.sub`` for the bridge."""
+    flat = {}
+    for scenario, result in results.items():
+        if 'latency_ms' in result:
+            flat[scenario] = result
+        else:
+            flat.update({f'{scenario}.{name}': sub for name, sub in result.items() if isinstance(sub, dict)
+                         and 'latency_ms' in sub})
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help='scenario to run, repeatable (default: bridge, plus all Odoo ones with --odoo-bin)')
+    parser.add_argument('--devices', type=int, default=4, help='simulated devices')
+    parser.add_argument('--endpoints', type=int, default=None,
+                        help='simulation servers to start, devices share them round-robin (default: one per device)')
+    parser.add_argument('--tags', type=int, default=50, help='variables per device')
+    parser.add_argument('--change-ms', type=int, default=500, help='value change period of the simulators')
+    parser.add_argument('--iterations', type=int, default=50, help='polls per device for fetch/batch/cron/bridge')
+    parser.add_argument('--duration', type=float, default=30, help='seconds the polling scenario runs')
+    parser.add_argument('--interval', type=int, default=1000, help='polling interval (ms) of the polling scenario')
+    parser.add_argument('--sim-port', type=int, default=48400, help='port of the first simulation server')
+    parser.add_argument('--api-port', type=int, default=4101, help='port of the bridge')
+    parser.add_argument('--odoo-bin', help='odoo-bin to run the Odoo scenarios with')
+    parser.add_argument('-d', '--database', help='database with opcua_connector installed')
+    parser.add_argument('--odoo-arg', action='append', default=[],
+                        help='extra odoo-bin argument, repeatable (e.g. --odoo-arg=--addons-path=...)')
+    parser.add_argument('--odoo-log-level', default='warn')
+    parser.add_argument('--keep', action='store_true', help='keep the benchmark devices and history in the database')
+    parser.add_argument('--output', default=os.path.join(BENCH_DIR, 'results'), help='directory for results and logs')
+    parser.add_argument('--compare', help='previous result JSON to compare with')
+    args = parser.parse_args()
+
+    args.endpoints = min(args.endpoints or args.devices, args.devices)
+    scenarios = args.scenario or (SCENARIOS if args.odoo_bin else ('bridge',))
+    if any(scenario in ODOO_SCENARIOS for scenario in scenarios) and not (args.odoo_bin and args.database):
+        parser.error('the Odoo scenarios need --odoo-bin and --database')
+    os.makedirs(args.output, exist_ok=True)
+
+    started = datetime.datetime.now(datetime.timezone.utc)
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'started': started.isoformat(timespec='seconds'),
+            'host': platform.node(),
+            'python': platform.python_version(),
+            'node': subprocess.run(['node', '--version'], capture_output=True, text=True).stdout.strip(),
+            'config': {key: getattr(args, key) for key in
+                       ('devices', 'endpoints', 'tags', 'change_ms', 'iterations', 'duration', 'interval')},
+        },
+        'results': {},
+    }
+    with Processes(args) as processes:
+        for scenario in scenarios:
+            print(f"Running {scenario}...", flush=True)
+            if scenario == 'bridge':
+                report['results'][scenario] = run_bridge(args)
+            else:
+                report['results'][scenario] = run_odoo(args, scenario)
+        report['memory'] = processes.memory()
+
+    for name, result in flatten(report['results']).items():
+        latency = result['latency_ms']
+        print(f"{name:<20} {result['samples_per_s'] or 0:>10.1f} samples/s   "
+              f"p50 {latency['p50'] or 0:>8.1f}  p95 {latency['p95'] or 0:>8.1f}  p99 {latency['p99'] or 0:>8.1f} ms"
+              + (f"   {result['db_rows_per_s']:>8.1f} rows/s" if result.get('db_rows_per_s') is not None else '')
+              + (f"   {result['errors']} errors" if result['errors'] else ''))
+
+    path = os.path.join(args.output, f"{started:%Y%m%dT%H%M%SZ}-{report['meta']['commit']}.json")
+    with open(path, 'w') as result_file:
+        json.dump(report, result_file, indent=2)
+    print(f"Results saved to {path}")
+    if args.compare:
+        compare(args.compare, report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Benchmark scenario run inside ``odoo-bin shell`` (code read from stdin).
+
+Configured by the ``BENCH_CONFIG`` environment variable set by ``bench.py``;
+prints one ``BENCH_RESULT <json>`` line with the raw measurements. ``env``
+is provided by the shell.
+"""
+import json
+import os
+import resource
+import threading
+import time
+
+config = json.loads(os.environ['BENCH_CONFIG'])
+scenario = config['scenario']
+
+
+def bench_memory():
+    memory = {'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                memory['rss_kb'] = int(line.split()[1])
+    return memory
+
+
+def bench_history_rows(device_ids):
+    env.cr.execute("SELECT count(*) FROM opcua_data WHERE device_id IN %s", (tuple(device_ids),))
+    return env.cr.fetchone()[0]
+
+
+def bench_setup():
+    Device = env['opcua.device']
+    Device.search([('name', '=like', 'bench-%'), ('active', 'in', (True, False))]).unlink()
+    devices = Device.create([{
+        'name': f'bench-{i}',
+        'endpoint': endpoint,
+        'polling_interval': config['interval'],
+        'node_ids': [(0, 0, {'name': node_id.rsplit('.', 1)[-1], 'node_id': node_id})
+                     for node_id in config['node_ids']],
+    } for i, endpoint in enumerate(config['devices'])])
+    # api_url is computed from api_port for the Docker setup; point it at the local bridge
+    devices.write({'api_url': config['api_url']})
+    env.cr.commit()
+    return devices
+
+
+def bench_teardown(devices):
+    if config['keep']:
+        return
+    env['opcua.data']._delete_history(devices.ids)
+    env['opcua.data.rollup']._delete_rollups(devices.ids)
+    devices.unlink()
+    env.cr.commit()
+
+
+def bench_run(devices):
+    """Run the scenario, returning per-poll latencies (ms), sample and error counts."""
+    latencies, samples, errors = [], 0, 0
+    tags = len(config['node_ids'])
+
+    if scenario == 'fetch':
+        for _iteration in range(config['iterations']):
+            for device in devices:
+                t0 = time.perf_counter()
+                device.fetch_data()
+                env.cr.commit()
+                latencies.append((time.perf_counter() - t0) * 1000)
+                if device.connection_status == 'error':
+                    errors += 1
+                else:
+                    samples += tags
+
+    elif scenario in ('batch', 'cron'):
+        for _iteration in range(config['iterations']):
+            t0 = time.perf_counter()
+            if scenario == 'batch':
+                ok_count = env['opcua.device']._collect_by_bridge(devices)
+            else:
+                ok_count = env['opcua.data'].fetch_opcua_data()
+            env.cr.commit()
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += len(devices) - ok_count
+            samples += ok_count * tags
+
+    elif scenario == 'polling':
+        # Time every poll the scheduler threads run, on the registry class they use
+        Device = env.registry['opcua.device']
+        fetch_data = Device.fetch_data
+        lock = threading.Lock()
+        polls = []
+
+        def timed_fetch_data(self):
+            t0 = time.perf_counter()
+            try:
+                return fetch_data(self)
+            finally:
+                with lock:
+                    polls.append(((time.perf_counter() - t0) * 1000, self.connection_status))
+
+        Device.fetch_data = timed_fetch_data
+        try:
+            for device in devices:
+                device.action_start_polling()
+            env.cr.commit()
+            time.sleep(config['duration'])
+        finally:
+            for device in devices:
+                device.action_stop_polling()
+            env.cr.commit()
+            time.sleep(config['interval'] / 1000.0 + 1)
+            Device.fetch_data = fetch_data
+        latencies = [latency for latency, _status in polls]
+        errors = sum(1 for _latency, status in polls if status == 'error')
+        samples = (len(polls) - errors) * tags
+
+    return latencies, samples, errors
+
+
+bench_devices = bench_setup()
+bench_rows_before = bench_history_rows(bench_devices.ids)
+bench_start = time.perf_counter()
+bench_latencies, bench_samples, bench_errors = bench_run(bench_devices)
+bench_elapsed = time.perf_counter() - bench_start
+env.invalidate_all()
+bench_rows = bench_history_rows(bench_devices.ids) - bench_rows_before
+bench_result = {
+    'latencies_ms': bench_latencies,
+    'samples': bench_samples,
+    'errors': bench_errors,
+    'elapsed_s': bench_elapsed,
+    'db_rows': bench_rows,
+    'memory': bench_memory(),
+}
+bench_teardown(bench_devices)
+print('BENCH_RESULT ' + json.dumps(bench_result), flush=True)
@@ -0,0 +1,163 @@
+import odoo
+from odoo import http, fields, api, SUPERUSER_ID
+from odoo.http import request, content_disposition, Response
+from odoo.service import db as db_service
+from odoo.tools import consteq
+from datetime import datetime, timezone
+import json
+import logging
+
+from ..models.opcua_export import FORMATS, parquet_available, stream_export
+from ..models.opcua_metrics import render_prometheus
+from ..models.opcua_scheduler import get_scheduler
+
+_logger = logging.getLogger(__name__)
+
+
+def _parse_source_timestamp(value):
+    """Convert an ISO 8601 timestamp sent by the API server to a naive UTC datetime."""
+    if not value:
+        return fields.Datetime.now()
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+class OpcuaPushController(http.Controller):
+
+    @http.route('/opcua/push', type='http', auth='none', methods=['POST'], csrf=False, save_session=False)
+    def push(self, **kwargs):
+        """Ingest change notifications pushed by the API server for subscribed devices.
+
+        The database is the one named by the subscription (``db``), opened
+        explicitly: with several databases the request itself may have none
+        selected, or another one.
+
+        Expected body::
+
+            {
+                "db": "mydb",
+                "device_id": 1,
+                "token": "...",
+                "samples": [{"node_id": "ns=2;s=Temp", "value": 21.5,
+                             "source_timestamp": "2024-03-14T12:00:00.000Z"}],
+                "errors": {"ns=2;s=Other": "Bad StatusCode: ..."}
+            }
+        """
+        try:
+            payload = json.loads(request.httprequest.get_data() or b'{}')
+        except ValueError:
+            return request.make_json_response({'error': 'Invalid JSON body'}, status=400)
+
+        db_name = payload.get('db') or request.db
+        if not db_name or not db_service.exp_db_exist(db_name):
+            return request.make_json_response({'error': 'Unknown database'}, status=404)
+        with odoo.registry(db_name).cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            device = env['opcua.device'].browse(payload.get('device_id') or 0).exists()
+            token = payload.get('token') or ''
+            if not device or not device.push_token or not consteq(device.push_token, token):
+                return request.make_json_response({'error': 'Unknown device or invalid token'}, status=403)
+            stored = self._ingest_push(device, payload)
+        return request.make_json_response({'stored': stored})
+
+    def _ingest_push(self, device, payload):
+        """Store the samples and node errors of one push; return the number of samples."""
+        samples = [
+            (sample['node_id'], sample.get('value'), _parse_source_timestamp(sample.get('source_timestamp')))
+            for sample in payload.get('samples', [])
+            if sample.get('node_id')
+        ]
+        errors = payload.get('errors') or {}
+        # Back after an outage: find the hole in the history before the pushed samples close it
+        gaps = None
+        if device.backfill_enabled and device.connection_status == 'error':
+            gaps = device._get_history_gaps()
+        device._ingest_samples(samples)
+        status = 'polling' if device.is_polling else 'connected'
+        error_message = '\n'.join(f'{node_id}: {error}' for node_id, error in errors.items()) or False
+        if gaps:
+            device._schedule_backfill(gaps)
+        if device.connection_status != status or device.error_message != error_message:
+            device.write({'connection_status': status, 'error_message': error_message})
+        _logger.debug(f"Ingested {len(samples)} pushed samples for device {device.name}")
+        return len(samples)
+
+    @http.route('/opcua/metrics', type='http', auth='none', methods=['GET'], csrf=False)
+    def metrics(self, **kwargs):
+        """Expose poll stage timings and error counters in the Prometheus text format.
+
+        Only served while the ``opcua_connector.metrics`` system parameter is
+        set. Scrapers must send ``opcua_connector.metrics_token`` as
+        ``Authorization: Bearer <token>``; without a token configured, only
+        the session of an administrator is accepted. Metrics are kept per
+        server process.
+        """
+        env = request.env(user=SUPERUSER_ID)
+        params = env['ir.config_parameter']
+        if not params.get_param('opcua_connector.metrics'):
+            return request.make_response('Metrics are disabled', status=404)
+        token = params.get_param('opcua_connector.metrics_token')
+        authorization = request.httprequest.headers.get('Authorization') or ''
+        if token:
+            if not consteq(authorization, f'Bearer {token}'):
+                return request.make_response('Invalid token', status=403)
+        elif not (request.session.uid and env['res.users'].browse(request.session.uid)._is_system()):
+            return request.make_response('Set opcua_connector.metrics_token to scrape metrics', status=403)
+
+        devices = env['opcua.device'].with_context(active_test=False).search_read([], ['name'])
+        device_names = {device['id']: device['name'] for device in devices}
+        scheduler = get_scheduler(env.cr.dbname)
+        stats = {device_id: scheduler.stats(device_id) for device_id in device_names}
+        stats = {device_id: device_stats for device_id, device_stats in stats.items() if device_stats}
+        body = render_prometheus(env.cr.dbname, device_names, gauges=[
+            ('opcua_poll_lag_seconds', 'Delay between the deadline and the start of the last poll.',
+             {device_id: device_stats['lag_ms'] / 1000 for device_id, device_stats in stats.items()}),
+            ('opcua_poll_missed_deadlines', 'Polling ticks skipped since polling started.',
+             {device_id: device_stats['missed'] for device_id, device_stats in stats.items()}),
+        ])
+        return request.make_response(body, headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')])
+
+    @http.route('/opcua/export', type='http', auth='user', methods=['GET'])
+    def export(self, device_id, start, end, node_ids=None, file_format='csv', **kwargs):
+        """Stream the history of a device as a wide CSV or Parquet file.
+
+        ``node_ids`` is a comma separated list of ``opcua.node`` ids, all the
+        nodes of the device by default; ``start`` and ``end`` are UTC
+        datetimes, the range excluding ``end``. The file has one row per
+        timestamp and one column per node, and is sent while it is read from
+        a server-side cursor, so memory stays constant whatever its size.
+        """
+        env = request.env
+        env['opcua.data'].check_access('read')
+        device = env['opcua.device'].browse(int(device_id)).exists()
+        if not device:
+            return request.not_found()
+        if file_format not in FORMATS:
+            return request.make_response(f'Unknown format {file_format}', status=400)
+        if file_format == 'parquet' and not parquet_available():
+            return request.make_response('Parquet export requires the pyarrow Python package', status=400)
+        try:
+            start = fields.Datetime.to_datetime(start)
+            end = fields.Datetime.to_datetime(end)
+        except ValueError as e:
+            return request.make_response(f'Invalid range: {e}', status=400)
+        nodes = device.node_ids
+        if node_ids:
+            nodes = env['opcua.node'].browse([int(node_id) for node_id in node_ids.split(',')])
+            nodes = nodes.exists().filtered(lambda node: node.device_id == device)
+        if not nodes:
+            return request.make_response('No node to export', status=400)
+
+        # Columns are named after the nodes, by node id when names are not unique
+        names = nodes.mapped('name')
+        headers = [node.name if node.name and names.count(node.name) == 1 else node.node_id for node in nodes]
+        content_type, extension = FORMATS[file_format]
+        filename = f"{device.name}_{start:%Y%m%d%H%M%S}_{end:%Y%m%d%H%M%S}.{extension}"
+        chunks = stream_export(env.cr.dbname, env.uid, device.id, nodes.mapped('node_id'), headers,
+                               start, end, file_format)
+        return Response(chunks, headers=[
+            ('Content-Type', content_type),
+            ('Content-Disposition', content_disposition(filename)),
+        ], direct_passthrough=True)
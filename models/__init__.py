@@ -1,3 +1,9 @@
+from . import opcua_consumer_mixin
 from . import opcua_device
 from . import opcua_data
 from . import opcua_node
+from . import opcua_data_rollup
+from . import opcua_alarm_event
+from . import opcua_bridge
+from . import opcua_worker
+from . import opcua_device_lease
@@ -0,0 +1,23 @@
+from odoo import models, fields
+
+ALARM_STATES = [
+    ('normal', 'Normal'),
+    ('warning', 'Warning'),
+    ('critical', 'Critical'),
+    ('out_of_range', 'Out of Range')
+]
+
+
+class OpcuaAlarmEvent(models.Model):
+    _name = 'opcua.alarm.event'
+    _description = 'OPC UA Alarm Event'
+    _order = 'timestamp desc, id desc'
+    _rec_name = 'message'
+
+    timestamp = fields.Datetime('Timestamp', required=True, index=True)
+    device_id = fields.Many2one('opcua.device', string='Device', required=True, ondelete='cascade', index=True)
+    opcua_node_id = fields.Many2one('opcua.node', string='Node', required=True, ondelete='cascade', index=True)
+    previous_state = fields.Selection(ALARM_STATES, string='Previous State', required=True)
+    state = fields.Selection(ALARM_STATES, string='State', required=True)
+    value = fields.Float('Value', digits=(16, 4))
+    message = fields.Char('Message')
@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from numbers import Number
+
+import odoo
+from odoo import api, fields, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+# Read timeout of one /history call, in seconds
+HISTORY_TIMEOUT = 120
+
+
+def _to_iso(moment):
+    return moment.isoformat(timespec='milliseconds') + 'Z'
+
+
+def _from_epoch_ms(value):
+    return datetime.fromtimestamp(value / 1000, timezone.utc).replace(tzinfo=None)
+
+
+def merge_gaps(gaps, more):
+    """Union of two ``{node_id: (start, end)}`` gap maps, widening the gaps of a node found in both."""
+    merged = dict(gaps or {})
+    for node_id, (start, end) in (more or {}).items():
+        if node_id in merged:
+            start, end = min(start, merged[node_id][0]), max(end, merged[node_id][1])
+        merged[node_id] = (start, end)
+    return merged
+
+
+class BackfillWorker:
+    """Fills the history gaps of devices from the OPC UA server history.
+
+    A single thread per Odoo process and database, separate from the polling
+    workers, handles one queued device at a time: the gaps found by
+    ``opcua.device._get_history_gaps`` are read through the API server
+    ``/history`` endpoint in time chunks, each chunk inserted and committed on
+    its own. After every call the thread sleeps long enough to keep the
+    values read under ``opcua_connector.backfill_rate`` per second, so a long
+    backfill never competes with live polling for the bridge or the database.
+    """
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self._queue = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._status = {}
+
+    def enqueue(self, device_id, gaps=None):
+        """Queue a device, once: it is already pending when queued twice.
+
+        :param gaps: ``{node_id: (start, end)}`` to read on top of the gaps
+            found when the backfill runs, e.g. the outage window detected by
+            the poll that ended it; merged when the device is already queued
+        """
+        with self._cond:
+            if device_id not in self._queue:
+                self._queue[device_id] = merge_gaps({}, gaps)
+                if self._status.get(device_id, {}).get('state') != 'running':
+                    self._status[device_id] = {'state': 'queued'}
+            else:
+                self._queue[device_id] = merge_gaps(self._queue[device_id], gaps)
+            self._ensure_thread()
+            self._cond.notify()
+
+    def status(self, device_id):
+        """Return ``{'state', 'values', 'nodes', 'finished', 'error'}`` of the last backfill, or None."""
+        return self._status.get(device_id)
+
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name=f'opcua-backfill-{self.db_name}', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                device_id, gaps = self._queue.popitem(last=False)
+                self._status[device_id] = {'state': 'running', 'values': 0}
+            try:
+                values, nodes = self._backfill(device_id, gaps)
+                self._status[device_id] = {'state': 'done', 'values': values, 'nodes': nodes,
+                                           'finished': fields.Datetime.now()}
+            except Exception as e:
+                _logger.error(f"History backfill of device {device_id} failed: {e}")
+                self._status[device_id] = dict(self._status[device_id], state='error', error=str(e),
+                                               finished=fields.Datetime.now())
+
+    def _backfill(self, device_id, gaps=None):
+        """Backfill the gaps of one device, plus the ``gaps`` given when it was queued.
+
+        :return: ``(values inserted, nodes with a gap)``
+        """
+        registry = odoo.registry(self.db_name)
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            device = env['opcua.device'].browse(device_id).exists()
+            if not device or not device.backfill_enabled:
+                return 0, 0
+            params = env['ir.config_parameter'].sudo()
+            chunk = timedelta(minutes=int(params.get_param('opcua_connector.backfill_chunk_minutes', 15) or 15))
+            rate = float(params.get_param('opcua_connector.backfill_rate', 2000) or 0)
+            max_values = int(params.get_param('opcua_connector.backfill_max_values', 10000) or 10000)
+            record_ids = {node.node_id: node.id for node in device.node_ids}
+            gaps = {node_id: gap for node_id, gap in merge_gaps(device._get_history_gaps(), gaps).items()
+                    if node_id in record_ids}
+            endpoint, client, name = device.endpoint, device._get_bridge_client(), device.name
+        if not gaps:
+            return 0, 0
+
+        _logger.info(f"Backfilling history gaps of {len(gaps)} nodes of device {name}")
+        inserted = 0
+        window_start = min(start for start, _end in gaps.values())
+        backfill_end = max(end for _start, end in gaps.values())
+        while window_start < backfill_end:
+            window_end = min(window_start + chunk, backfill_end)
+            # Nodes whose gap overlaps the window, and where their read starts
+            pending = {node_id: max(start, window_start) for node_id, (start, end) in gaps.items()
+                       if start < window_end and end > window_start}
+            while pending:
+                began = time.monotonic()
+                response = client.post('/history', json={
+                    'endpoint': endpoint,
+                    'node_ids': sorted(pending),
+                    'start': _to_iso(min(pending.values())),
+                    'end': _to_iso(window_end),
+                    'max_values': max_values,
+                }, idempotent=True, timeout=(3.05, HISTORY_TIMEOUT))
+                response.raise_for_status()
+                data = response.json()
+                if data.get('error'):
+                    raise Exception(data['error'])
+                rows, pending, read_count = self._collect_rows(device_id, record_ids, gaps, pending,
+                                                               data.get('nodes') or {})
+                if rows:
+                    with registry.cursor() as cr:
+                        env = api.Environment(cr, SUPERUSER_ID, {})
+                        inserted += env['opcua.data']._insert_history_rows(rows)
+                        cr.commit()
+                    self._status[device_id]['values'] = inserted
+                if rate > 0:
+                    time.sleep(max(0.0, read_count / rate - (time.monotonic() - began)))
+            window_start = window_end
+        _logger.info(f"Backfilled {inserted} history values of device {name}")
+        return inserted, len(gaps)
+
+    def _collect_rows(self, device_id, record_ids, gaps, pending, nodes):
+        """Turn a ``/history`` result into history rows inside each node's gap.
+
+        Values are collapsed to one per second, like live samples.
+
+        :return: ``(rows, nodes to read again with their new start, values read)``
+        """
+        rows = []
+        more = {}
+        read_count = 0
+        for node_id, node in nodes.items():
+            if node_id not in pending:
+                continue
+            if node.get('error'):
+                _logger.warning(f"History of node {node_id} could not be read: {node['error']}")
+                continue
+            timestamps = node.get('timestamps') or []
+            read_count += len(timestamps)
+            gap_start, gap_end = gaps[node_id]
+            by_second = {}
+            for timestamp, value in zip(timestamps, node.get('values') or []):
+                if isinstance(value, bool):
+                    value = float(value)
+                if not isinstance(value, Number):
+                    continue
+                timestamp = _from_epoch_ms(timestamp).replace(microsecond=0)
+                if gap_start < timestamp < gap_end:
+                    by_second[timestamp] = value
+            rows += [(device_id, node_id, record_ids.get(node_id), timestamp, value)
+                     for timestamp, value in by_second.items()]
+            # Truncated at max_values: continue after the last value read
+            if node.get('more') and timestamps:
+                last = _from_epoch_ms(timestamps[-1])
+                if last > pending[node_id]:
+                    more[node_id] = last
+        return rows, more, read_count
+
+
+_workers = {}
+_workers_lock = threading.Lock()
+
+
+def get_backfill_worker(db_name):
+    """Return the process-wide backfill worker for ``db_name``, creating it on first use."""
+    with _workers_lock:
+        worker = _workers.get(db_name)
+        if worker is None:
+            worker = _workers[db_name] = BackfillWorker(db_name)
+        return worker
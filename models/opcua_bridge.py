@@ -0,0 +1,67 @@
+from odoo import models, fields, api
+from odoo.tools import ormcache
+
+from .opcua_bridge_client import get_bridge_client
+
+
+class OpcuaBridge(models.Model):
+    _name = 'opcua.bridge'
+    _description = 'OPC UA API Server'
+    _order = 'sequence, id'
+
+    name = fields.Char('Name', required=True)
+    url = fields.Char('URL', required=True, help='Base URL of the API server, e.g. http://bridge-1:4001')
+    active = fields.Boolean('Active', default=True)
+    sequence = fields.Integer('Sequence', default=10)
+    state = fields.Selection([
+        ('closed', 'Available'),
+        ('open', 'Unavailable')
+    ], string='State', compute='_compute_state')
+    last_error = fields.Char('Last Error', compute='_compute_state')
+    device_count = fields.Integer('Devices', compute='_compute_device_count',
+                                  help='Devices of the bridge pool assigned to this API server')
+
+    _sql_constraints = [
+        ('url_uniq', 'unique(url)', 'An API server can only be registered once!')
+    ]
+
+    def _compute_state(self):
+        for bridge in self:
+            client = get_bridge_client(bridge.url) if bridge.url else None
+            bridge.state = client.state if client else 'closed'
+            bridge.last_error = client.last_error if client and client.state == 'open' else False
+
+    def _compute_device_count(self):
+        counts = dict(self.env['opcua.device']._read_group(
+            [('bridge_mode', '=', 'pool'), ('api_url', 'in', self.mapped('url'))], ['api_url'], ['__count']))
+        for bridge in self:
+            bridge.device_count = counts.get(bridge.url, 0)
+
+    @api.model
+    @ormcache()
+    def _get_pool_urls(self):
+        """URLs of the active API servers of the pool."""
+        return tuple(self.sudo().search([]).mapped('url'))
+
+    def _pool_changed(self):
+        # _get_pool_urls is cached in the 'default' cache
+        self.env.registry.clear_cache('default')
+        Device = self.env['opcua.device']
+        self.env.add_to_compute(Device._fields['api_url'], Device.search([('bridge_mode', '=', 'pool')]))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        bridges = super().create(vals_list)
+        self._pool_changed()
+        return bridges
+
+    def write(self, vals):
+        result = super().write(vals)
+        if {'url', 'active'} & set(vals):
+            self._pool_changed()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self._pool_changed()
+        return result
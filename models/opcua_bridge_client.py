@@ -0,0 +1,135 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_logger = logging.getLogger(__name__)
+
+# Connect / read timeouts in seconds
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+# Retries of idempotent calls after connection errors, with jittered
+# exponential backoff. Read timeouts are not retried: a hung bridge would
+# otherwise hold a poll for (MAX_RETRIES + 1) * READ_TIMEOUT.
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.2
+# Circuit breaker: consecutive failures before opening, and probe period
+FAILURE_THRESHOLD = 3
+PROBE_INTERVAL = 5
+
+
+class BridgeUnavailableError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while the circuit breaker is open."""
+
+
+class BridgeClient:
+    """Shared HTTP client of one OPC UA API server (bridge).
+
+    Keeps pooled keep-alive connections, retries idempotent calls that could
+    not reach the bridge with jittered backoff and wraps everything in a circuit breaker: after
+    ``FAILURE_THRESHOLD`` consecutive failures calls fail fast with
+    :class:`BridgeUnavailableError` while a background thread probes
+    ``/health`` until the bridge answers again.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._last_error = None
+        self._probe_thread = None
+
+    @property
+    def state(self):
+        return 'open' if self._opened_at else 'closed'
+
+    @property
+    def last_error(self):
+        return self._last_error
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def request(self, method, path, idempotent=None, timeout=None, **kwargs):
+        """Send a request to the bridge.
+
+        :param idempotent: retry on connection errors; defaults to True for
+            GET requests. Read timeouts are never retried.
+        :raises BridgeUnavailableError: when the circuit breaker is open
+        """
+        if self._opened_at:
+            raise BridgeUnavailableError(
+                f"OPC UA API at {self.base_url} is unavailable ({self._last_error}), retrying in the background")
+        if idempotent is None:
+            idempotent = method == 'GET'
+        attempts = MAX_RETRIES + 1 if idempotent else 1
+        url = self.base_url + path
+        for attempt in range(attempts):
+            try:
+                response = self.session.request(method, url, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT),
+                                                **kwargs)
+                if response.status_code in (502, 503, 504):
+                    raise requests.exceptions.ConnectionError(f"HTTP {response.status_code} from {url}")
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._record_failure(e)
+                if self._opened_at or attempt + 1 >= attempts \
+                        or isinstance(e, requests.exceptions.ReadTimeout):
+                    raise
+                time.sleep(BACKOFF_BASE * 2 ** attempt * random.uniform(0.5, 1.5))
+                continue
+            self._record_success()
+            return response
+
+    def _record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._last_error = None
+
+    def _record_failure(self, error):
+        with self._lock:
+            self._failures += 1
+            self._last_error = str(error)
+            if self._failures < FAILURE_THRESHOLD or self._opened_at:
+                return
+            self._opened_at = time.time()
+            _logger.warning(f"Circuit breaker opened for OPC UA API at {self.base_url}: {error}")
+            if not (self._probe_thread and self._probe_thread.is_alive()):
+                self._probe_thread = threading.Thread(target=self._probe, name='opcua-bridge-probe', daemon=True)
+                self._probe_thread.start()
+
+    def _probe(self):
+        while self._opened_at:
+            time.sleep(PROBE_INTERVAL)
+            try:
+                response = self.session.get(self.base_url + '/health', timeout=(CONNECT_TIMEOUT, 2))
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                self._last_error = str(e)
+                continue
+            self._record_success()
+            _logger.info(f"Circuit breaker closed for OPC UA API at {self.base_url}")
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_bridge_client(base_url):
+    """Return the process-wide client of the bridge at ``base_url``."""
+    with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None:
+            client = _clients[base_url] = BridgeClient(base_url)
+        return client
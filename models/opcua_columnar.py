@@ -0,0 +1,77 @@
+import hashlib
+import threading
+
+# Index id the API server acknowledged for each device, keyed by (database name,
+# opcua.device id). Per process: after a restart the first poll sends the node list again.
+_lock = threading.Lock()
+_known_indexes = {}
+
+
+def index_id(node_ids):
+    """Return the index id of a node list, computed the same way by the API server."""
+    return hashlib.sha1('\n'.join(node_ids).encode('utf-8')).hexdigest()
+
+
+def build_request(db_name, device_id, endpoint, node_ids, response_format='json', max_age=0):
+    """Return the ``/data`` request body of a device.
+
+    With the columnar format the node list is only sent until the API server
+    has acknowledged its index; later requests carry the index id alone.
+    With ``max_age`` (ms) the API server may answer from its last-value cache.
+    """
+    if response_format != 'columnar':
+        payload = {'endpoint': endpoint, 'node_ids': node_ids}
+    else:
+        index = index_id(node_ids)
+        payload = {'endpoint': endpoint, 'format': 'columnar', 'index': index}
+        with _lock:
+            if _known_indexes.get((db_name, device_id)) != index:
+                payload['node_ids'] = node_ids
+    if max_age:
+        payload['max_age'] = max_age
+    return payload
+
+
+def post_data(client, payload, node_ids, **kwargs):
+    """POST ``/data``, sending the node list again when the API server answers
+    409 because it does not know the index (e.g. after it restarted)."""
+    response = client.post('/data', json=payload, **kwargs)
+    if response.status_code == 409 and 'node_ids' not in payload:
+        response = client.post('/data', json=dict(payload, node_ids=node_ids), **kwargs)
+    response.raise_for_status()
+    return response
+
+
+def decode_result(db_name, device_id, node_ids, data):
+    """Turn a ``/data`` result into the JSON format keyed by node id.
+
+    JSON results are returned unchanged. Columnar results are mapped back onto
+    ``node_ids``, the node list the request was built from, with ``status``
+    becoming the ``errors`` dict and source timestamps (epoch milliseconds)
+    returned as ``source_timestamps``.
+    """
+    if not isinstance(data, dict) or data.get('format') != 'columnar':
+        return data
+    key = (db_name, device_id)
+    index = index_id(node_ids)
+    if data.get('unknown_index') or data.get('index') != index:
+        with _lock:
+            _known_indexes.pop(key, None)
+        if not data.get('unknown_index'):
+            data = dict(data, error=f"Node index mismatch: expected {index}, got {data.get('index')}",
+                        connectionStatus='error')
+        return dict(data, values={}, errors={}, source_timestamps={})
+    with _lock:
+        _known_indexes[key] = index
+    values = data.get('values') or []
+    if values and len(values) != len(node_ids):
+        return dict(data, values={}, errors={}, source_timestamps={}, connectionStatus='error',
+                    error=f"Columnar result has {len(values)} values for {len(node_ids)} nodes")
+    return dict(
+        data,
+        values=dict(zip(node_ids, values)),
+        errors={node_id: status for node_id, status in zip(node_ids, data.get('status') or []) if status},
+        source_timestamps={node_id: timestamp for node_id, timestamp
+                           in zip(node_ids, data.get('source_timestamps') or []) if timestamp is not None},
+    )
+
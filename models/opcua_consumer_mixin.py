@@ -0,0 +1,15 @@
+from odoo import models
+
+
+class OpcuaConsumerMixin(models.AbstractModel):
+    """Inherit in models receiving the samples of a device.
+
+    Inheriting models are registered as consumers of the device their
+    ``_opcua_device_field`` points at. ``opcua.device`` caches the consumers
+    per version of their table, so no invalidation is needed here.
+    """
+    _name = 'opcua.consumer.mixin'
+    _description = 'OPC UA Sample Consumer'
+
+    # Reference field pointing at the opcua.device
+    _opcua_device_field = 'device_id'
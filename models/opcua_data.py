@@ -1,17 +1,86 @@
 from odoo import models, fields, api
-import requests
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dateutil.relativedelta import relativedelta
+from psycopg2.extras import execute_values
 import logging
+import requests
+import time
+
+from .opcua_bridge_client import get_bridge_client
+from . import opcua_columnar
+from .opcua_data_rollup import ROLLUP_RESOLUTIONS
+from .opcua_metrics import get_metrics
 
 _logger = logging.getLogger(__name__)
 
+# Partition granularity -> (step, name format)
+PARTITION_INTERVALS = {
+    'day': (relativedelta(days=1), '%Y%m%d'),
+    'month': (relativedelta(months=1), '%Y%m'),
+}
+
+
+def _uncovered_ranges(start, end, covered):
+    """Return the parts of ``[start, end)`` outside the ``(lower, upper)`` ranges of ``covered``."""
+    pieces = []
+    cursor = start
+    for lower, upper in sorted(covered):
+        if upper <= cursor or lower >= end:
+            continue
+        if lower > cursor:
+            pieces.append((cursor, lower))
+        cursor = max(cursor, upper)
+        if cursor >= end:
+            break
+    if cursor < end:
+        pieces.append((cursor, end))
+    return pieces
+
+
+def _lttb(points, threshold):
+    """Downsample ``(x, y)`` points to ``threshold`` points with Largest-Triangle-Three-Buckets."""
+    if threshold >= len(points) or threshold < 3:
+        return points
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, len(points))
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(point[0] for point in next_bucket) / len(next_bucket)
+        avg_y = sum(point[1] for point in next_bucket) / len(next_bucket)
+
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = points[a]
+        best_area = -1
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                a_next = j
+        sampled.append(points[a_next])
+        a = a_next
+    sampled.append(points[-1])
+    return sampled
+
+
 class OpcuaData(models.Model):
     _name = 'opcua.data'
     _description = 'OPC UA Historical Data'
     _order = 'timestamp desc'
+    # The table is range partitioned by timestamp, which the ORM cannot
+    # create: init() manages its DDL instead (see _init_partitioned_table).
+    _auto = False
 
     device_id = fields.Many2one('opcua.device', string='Device', required=True, ondelete='cascade')
     node_id = fields.Char('Node ID', required=True)
-    node_name = fields.Char('Node Name', related='device_id.node_ids.name', store=True)
+    opcua_node_id = fields.Many2one('opcua.node', string='Node', ondelete='set null')
+    node_name = fields.Char('Node Name', related='opcua_node_id.name')
     timestamp = fields.Datetime('Timestamp', required=True, default=fields.Datetime.now)
     value = fields.Float('Value', digits=(10, 2))
     error = fields.Text('Error Message')
@@ -21,55 +90,487 @@ class OpcuaData(models.Model):
          'Only one value can be recorded per node at a given timestamp!')
     ]
 
+    def init(self):
+        self._init_partitioned_table()
+
+    # ------------------------------------------------------------------
+    # Partitioning
+    # ------------------------------------------------------------------
+    def _get_table_kind(self):
+        self.env.cr.execute("""
+            SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+             WHERE c.relname = %s AND n.nspname = current_schema()
+        """, (self._table,))
+        row = self.env.cr.fetchone()
+        return row and row[0]
+
+    def _init_partitioned_table(self):
+        """Create (or convert to) the range partitioned history table.
+
+        The parent is partitioned by ``timestamp`` and keeps a DEFAULT
+        partition so no insert ever fails; columns of stored fields are
+        added as the model grows. An existing regular table is converted
+        in place by copying its rows into the new partitions.
+
+        Foreign keys are added once every model of the registry has its
+        table (see ``_init_foreign_keys``): the tables they reference may
+        belong to models initialized after this one.
+        """
+        cr = self.env.cr
+        kind = self._get_table_kind()
+        legacy = False
+        if kind == 'r':
+            legacy = f'{self._table}_legacy'
+            _logger.info(f"Converting {self._table} to a partitioned table")
+            cr.execute("""
+                SELECT column_name FROM information_schema.columns
+                 WHERE table_name = %s AND table_schema = current_schema()
+            """, (self._table,))
+            legacy_columns = {row[0] for row in cr.fetchall()}
+            cr.execute(f'ALTER TABLE "{self._table}" RENAME TO "{legacy}"')
+            cr.execute("""
+                SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'f')
+            """, (legacy,))
+            for (conname,) in cr.fetchall():
+                cr.execute(f'ALTER TABLE "{legacy}" DROP CONSTRAINT "{conname}"')
+            cr.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s AND schemaname = current_schema()",
+                       (legacy,))
+            for (indexname,) in cr.fetchall():
+                cr.execute(f'DROP INDEX "{indexname}"')
+            cr.execute(f'ALTER SEQUENCE "{self._table}_id_seq" OWNED BY NONE')
+        if kind != 'p':
+            cr.execute(f'CREATE SEQUENCE IF NOT EXISTS "{self._table}_id_seq"')
+            cr.execute(f"""
+                CREATE TABLE "{self._table}" (
+                    id integer NOT NULL DEFAULT nextval('{self._table}_id_seq'),
+                    "timestamp" timestamp without time zone NOT NULL,
+                    PRIMARY KEY (id, "timestamp")
+                ) PARTITION BY RANGE ("timestamp")
+            """)
+            cr.execute(f'ALTER SEQUENCE "{self._table}_id_seq" OWNED BY "{self._table}".id')
+            cr.execute(f'COMMENT ON TABLE "{self._table}" IS %s', (self._description,))
+            cr.execute(f'CREATE TABLE "{self._table}_default" PARTITION OF "{self._table}" DEFAULT')
+
+        # Add the columns of stored fields missing from the table
+        cr.execute("""
+            SELECT column_name FROM information_schema.columns
+             WHERE table_name = %s AND table_schema = current_schema()
+        """, (self._table,))
+        columns = {row[0] for row in cr.fetchall()}
+        added_columns = set()
+        for field in self._fields.values():
+            if field.store and field.column_type and field.name not in columns:
+                cr.execute(f'ALTER TABLE "{self._table}" ADD COLUMN "{field.name}" {field.column_type[1]}')
+                added_columns.add(field.name)
+
+        cr.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass", (self._table,))
+        constraints = {row[0] for row in cr.fetchall()}
+        if f'{self._table}_timestamp_node_uniq' not in constraints:
+            cr.execute(f"""
+                ALTER TABLE "{self._table}" ADD CONSTRAINT "{self._table}_timestamp_node_uniq"
+                UNIQUE ("timestamp", node_id, device_id)
+            """)
+        # Access path of trend queries: one node of one device over a time range
+        cr.execute(f"""
+            CREATE INDEX IF NOT EXISTS "{self._table}_device_node_timestamp_index"
+                ON "{self._table}" (device_id, node_id, "timestamp")
+        """)
+
+        if legacy:
+            cr.execute(f'SELECT min("timestamp"), max("timestamp") FROM "{legacy}"')
+            oldest, newest = cr.fetchone()
+            if oldest:
+                self._ensure_partitions(oldest, newest)
+            names = ', '.join(f'"{name}"' for name in sorted(legacy_columns)
+                              if name in self._fields and self._fields[name].store)
+            cr.execute(f'INSERT INTO "{self._table}" ({names}) SELECT {names} FROM "{legacy}"')
+            cr.execute(f'DROP TABLE "{legacy}"')
+            _logger.info(f"Converted {self._table} to a partitioned table")
+        self._ensure_partitions()
+        # Existing history gets linked to its node record, once
+        link_nodes = kind is not None and 'opcua_node_id' in added_columns
+        self.pool.post_init(self._init_foreign_keys, link_nodes)
+
+    def _init_foreign_keys(self, link_nodes=False):
+        """Add the missing foreign keys of the many2one columns.
+
+        Runs after all models are initialized, when the referenced tables exist.
+        """
+        cr = self.env.cr
+        if link_nodes:
+            cr.execute(f"""
+                UPDATE "{self._table}" d SET opcua_node_id = n.id
+                  FROM opcua_node n
+                 WHERE n.device_id = d.device_id AND n.node_id = d.node_id
+            """)
+        cr.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass", (self._table,))
+        constraints = {row[0] for row in cr.fetchall()}
+        for field in self._fields.values():
+            conname = f'{self._table}_{field.name}_fkey'
+            if field.type != 'many2one' or not field.store or conname in constraints:
+                continue
+            ondelete = {'cascade': 'CASCADE', 'restrict': 'RESTRICT'}.get((field.ondelete or '').lower(), 'SET NULL')
+            cr.execute(f"""
+                ALTER TABLE "{self._table}" ADD CONSTRAINT "{conname}"
+                FOREIGN KEY ("{field.name}") REFERENCES "{self.env[field.comodel_name]._table}"(id)
+                ON DELETE {ondelete}
+            """)
+
+    def _get_partition_interval(self):
+        interval = self.env['ir.config_parameter'].sudo().get_param('opcua_connector.partition_interval', 'day')
+        return interval if interval in PARTITION_INTERVALS else 'day'
+
+    def _partition_start(self, moment, interval):
+        moment = datetime(moment.year, moment.month, moment.day)
+        return moment.replace(day=1) if interval == 'month' else moment
+
+    def _ensure_partitions(self, oldest=None, newest=None, ahead=7):
+        """Create the partitions covering ``[oldest, newest + ahead days]``.
+
+        Coverage is read from the bounds of the attached partitions, so
+        ranges created with another ``partition_interval`` are respected: a
+        range partly covered is clipped to its uncovered parts, which are
+        named after their first day.
+
+        Rows already stored in the DEFAULT partition for a new range are moved
+        into it, so the partition can be attached.
+        """
+        interval = self._get_partition_interval()
+        step, name_format = PARTITION_INTERVALS[interval]
+        now = fields.Datetime.now()
+        start = self._partition_start(oldest or now, interval)
+        stop = (newest or now) + timedelta(days=ahead)
+        covered = [(lower, upper) for _name, lower, upper in self._get_partitions()]
+        while start <= stop:
+            for lower, upper in _uncovered_ranges(start, start + step, covered):
+                piece_format = name_format if (lower, upper) == (start, start + step) \
+                    else PARTITION_INTERVALS['day'][1]
+                self._create_partition(f'{self._table}_p{lower.strftime(piece_format)}', lower, upper)
+                covered.append((lower, upper))
+            start += step
+
+    def _create_partition(self, name, start, end):
+        """Create and attach the partition ``name`` for ``[start, end)``."""
+        cr = self.env.cr
+        cr.execute(f'CREATE TABLE "{name}" (LIKE "{self._table}" INCLUDING DEFAULTS)')
+        cr.execute(f"""
+            WITH moved AS (
+                DELETE FROM "{self._table}_default"
+                 WHERE "timestamp" >= %s AND "timestamp" < %s
+             RETURNING *
+            )
+            INSERT INTO "{name}" SELECT * FROM moved
+        """, (start, end))
+        cr.execute(f"""
+            ALTER TABLE "{self._table}" ATTACH PARTITION "{name}"
+            FOR VALUES FROM (%s) TO (%s)
+        """, (start, end))
+        _logger.info(f"Created history partition {name}")
+
+    def _get_partitions(self):
+        """Return ``(name, lower, upper)`` of the range partitions, oldest first."""
+        self.env.cr.execute("""
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+              FROM pg_inherits
+              JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+              JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+             WHERE parent.relname = %s AND child.relname != %s
+             ORDER BY child.relname
+        """, (self._table, f'{self._table}_default'))
+        partitions = []
+        for name, bound in self.env.cr.fetchall():
+            # FOR VALUES FROM ('2024-01-01 00:00:00') TO ('2024-01-02 00:00:00')
+            lower, upper = [part.split("'")[1] for part in bound.split(' TO ')]
+            partitions.append((name, fields.Datetime.to_datetime(lower), fields.Datetime.to_datetime(upper)))
+        return partitions
+
     @api.model
-    def fetch_opcua_data(self):
-        """Fetch data from OPC UA server for all active records"""
-        records = self.search([('active', '=', True)])
-        api_url = 'http://localhost:4001/data'
-
-        for record in records:
-            try:
-                params = {
-                    'endpoint': record.endpoint,
-                    'node_ids': record.node_ids
-                }
-                response = requests.get(api_url, params=params, timeout=5)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('error'):
-                        record.write({
-                            'error_message': data['error'],
-                            'connection_status': 'error'
-                        })
-                    else:
-                        # Get the first value from the response
-                        first_node = record.node_ids.split('\n')[0].strip()
-                        value = data['values'].get(first_node)
-                        record.write({
-                            'value': value,
-                            'last_update': fields.Datetime.now(),
-                            'error_message': False,
-                            'connection_status': data.get('connectionStatus', 'disconnected')
-                        })
+    def _cron_maintain_partitions(self):
+        """Create upcoming partitions and apply the retention policies.
+
+        ``opcua_connector.retention_days`` (0 keeps everything) drops, or with
+        ``opcua_connector.retention_action`` = ``detach`` detaches, whole
+        partitions older than the retention. Devices with their own
+        ``retention_days`` get their older rows deleted set-based. Aggregates
+        older than ``opcua_connector.rollup_retention_days`` are deleted,
+        which defaults to ``retention_days``.
+        """
+        self._ensure_partitions()
+        params = self.env['ir.config_parameter'].sudo()
+        retention_days = int(params.get_param('opcua_connector.retention_days', 0) or 0)
+        if retention_days > 0:
+            detach = params.get_param('opcua_connector.retention_action', 'drop') == 'detach'
+            cutoff = fields.Datetime.now() - timedelta(days=retention_days)
+            for name, _lower, upper in self._get_partitions():
+                if upper > cutoff:
+                    continue
+                if detach:
+                    self.env.cr.execute(f'ALTER TABLE "{self._table}" DETACH PARTITION "{name}"')
+                    _logger.info(f"Detached history partition {name}")
                 else:
-                    record.write({
-                        'error_message': f'HTTP Error: {response.status_code}',
-                        'connection_status': 'error'
-                    })
-            except Exception as e:
-                _logger.error(f"Error fetching OPC UA data for {record.name}: {str(e)}")
-                record.write({
-                    'error_message': str(e),
-                    'connection_status': 'error'
-                })
+                    self.env.cr.execute(f'DROP TABLE "{name}"')
+                    _logger.info(f"Dropped history partition {name}")
+            self.env.cr.execute(f'DELETE FROM "{self._table}_default" WHERE "timestamp" < %s', (cutoff,))
+        for device in self.env['opcua.device'].search([('retention_days', '>', 0)]):
+            cutoff = fields.Datetime.now() - timedelta(days=device.retention_days)
+            self._delete_history(device.ids, before=cutoff)
+        rollup_retention_days = int(params.get_param('opcua_connector.rollup_retention_days', retention_days) or 0)
+        if rollup_retention_days > 0:
+            self.env['opcua.data.rollup']._delete_rollups(
+                before=fields.Datetime.now() - timedelta(days=rollup_retention_days))
+        self.invalidate_model()
+
+    @api.model
+    def _delete_history(self, device_ids, before=None):
+        """Delete history rows of devices with one statement, without loading ids.
+
+        :param before: only delete rows older than this datetime
+        :return: number of deleted rows
+        """
+        self.flush_model()
+        query = f'DELETE FROM "{self._table}" WHERE device_id IN %s'
+        params = [tuple(device_ids)]
+        if before:
+            query += ' AND "timestamp" < %s'
+            params.append(before)
+        self.env.cr.execute(query, params)
+        count = self.env.cr.rowcount
+        self.invalidate_model()
+        return count
+
+    @api.model
+    def _insert_history_rows(self, rows):
+        """Bulk insert history rows, skipping the ones already stored for the
+        same node and timestamp (``timestamp_node_uniq``).
+
+        :param rows: list of ``(device_id, node_id, opcua_node_id, timestamp, value)``
+        :return: number of inserted rows
+        """
+        if not rows:
+            return 0
+        self.flush_model()
+        uid = self.env.uid
+        inserted = execute_values(self.env.cr._obj, f"""
+            INSERT INTO "{self._table}" (device_id, node_id, opcua_node_id, "timestamp", value,
+                                         create_uid, create_date, write_uid, write_date)
+            VALUES %s
+            ON CONFLICT ON CONSTRAINT "{self._table}_timestamp_node_uniq" DO NOTHING
+            RETURNING 1
+        """, [row + (uid, uid) for row in rows],
+            template="(%s, %s, %s, %s, %s, %s, now() at time zone 'UTC', %s, now() at time zone 'UTC')",
+            page_size=1000, fetch=True)
+        self.invalidate_model()
+        return len(inserted)
+
+    # ------------------------------------------------------------------
+    # Trend queries
+    # ------------------------------------------------------------------
+    @api.model
+    def read_series(self, node, start, end, max_points=2000, method='minmax'):
+        """Return the history of a node over ``[start, end]`` as columnar arrays.
+
+        Ranges holding more than ``max_points`` samples are downsampled in
+        the database: ``minmax`` keeps the lowest and highest sample of each
+        of ``max_points / 2`` time buckets, so spikes stay visible; ``lttb``
+        further reduces such buckets to ``max_points`` with the
+        Largest-Triangle-Three-Buckets algorithm, which follows the shape of
+        the signal more closely.
+
+        When a bucket spans at least a minute, the buckets are read from the
+        minute/hour/day aggregates instead of the raw history; only the edges
+        of the range and the part not rolled up yet are read raw.
+
+        :param node: ``opcua.node`` record or id
+        :return: dict with ``timestamps`` (epoch milliseconds), ``values``,
+            the ``method`` actually used (``raw``, ``minmax`` or ``lttb``) and
+            the ``resolution`` read (``raw``, ``minute``, ``hour`` or ``day``)
+        """
+        node = self.env['opcua.node'].browse(node) if isinstance(node, int) else node
+        node.ensure_one()
+        start = fields.Datetime.to_datetime(start)
+        end = fields.Datetime.to_datetime(end)
+        max_points = max(int(max_points), 4)
+        self.flush_model()
+        cr = self.env.cr
+
+        # Short ranges: the index alone answers, no downsampling needed
+        cr.execute(f"""
+            SELECT (extract(epoch FROM "timestamp") * 1000)::bigint, value
+              FROM "{self._table}"
+             WHERE device_id = %s AND node_id = %s AND "timestamp" BETWEEN %s AND %s
+             ORDER BY "timestamp"
+             LIMIT %s
+        """, (node.device_id.id, node.node_id, start, end, max_points + 1))
+        rows = cr.fetchall()
+        if len(rows) <= max_points:
+            return {
+                'timestamps': [row[0] for row in rows],
+                'values': [row[1] for row in rows],
+                'method': 'raw',
+                'resolution': 'raw',
+            }
+
+        buckets = max_points // 2 if method == 'minmax' else max_points * 4
+        resolution = 'raw'
+        if (end - start) / buckets >= ROLLUP_RESOLUTIONS[0][1]:
+            resolution = self.env['opcua.data.rollup']._pick_resolution(start, end, buckets)
+            rows = self._read_rollup_buckets(node, start, end, resolution)
+            if rows is None:
+                resolution = 'raw'
+        if resolution == 'raw':
+            rows = self._read_minmax_buckets(node, start, end, buckets)
+        if method == 'lttb':
+            rows = _lttb(rows, max_points)
+        return {
+            'timestamps': [row[0] for row in rows],
+            'values': [row[1] for row in rows],
+            'method': method if method == 'lttb' else 'minmax',
+            'resolution': resolution,
+        }
+
+    def _read_rollup_buckets(self, node, start, end, resolution):
+        """Return ``(epoch_ms, value)`` of the min and max of each ``resolution`` bucket over ``[start, end]``.
+
+        Only buckets lying entirely in the range and older than the last
+        rolled-up bucket, which may still be incomplete, come from the
+        aggregates; the partial bucket at the start of the range and
+        everything from the last rolled-up bucket on are read raw, one
+        min/max pair per ``resolution`` interval. The min and max of an
+        aggregate bucket carry its start time, in the order of the bucket's
+        trend.
+
+        :return: points in time order, or ``None`` when the node has no
+            aggregates at that resolution
+        """
+        length = dict(ROLLUP_RESOLUTIONS)[resolution]
+        self.env['opcua.data.rollup'].flush_model()
+        cr = self.env.cr
+        cr.execute("""
+            SELECT max(bucket) FROM opcua_data_rollup
+             WHERE device_id = %s AND node_id = %s AND resolution = %s AND bucket <= %s
+        """, (node.device_id.id, node.node_id, resolution, end))
+        horizon = cr.fetchone()[0]
+        if horizon is None or horizon <= start:
+            return None
+        cr.execute("""
+            SELECT bucket, value_min::float8, value_max::float8, first_value <= last_value
+              FROM opcua_data_rollup
+             WHERE device_id = %s AND node_id = %s AND resolution = %s
+               AND bucket >= %s AND bucket < %s
+             ORDER BY bucket
+        """, (node.device_id.id, node.node_id, resolution, start, horizon))
+        rollups = cr.fetchall()
+        first_bucket = rollups[0][0] if rollups else horizon
+
+        def raw(lower, upper):
+            if upper <= lower:
+                return []
+            return self._read_minmax_buckets(node, lower, upper - timedelta(microseconds=1),
+                                             max(int((upper - lower) / length) + 1, 1))
+
+        rows = raw(start, first_bucket)
+        for bucket, value_min, value_max, rising in rollups:
+            epoch_ms = int((bucket - datetime(1970, 1, 1)).total_seconds() * 1000)
+            points = [(epoch_ms, value_min), (epoch_ms, value_max)] if rising \
+                else [(epoch_ms, value_max), (epoch_ms, value_min)]
+            rows.extend(points[:1] if value_min == value_max else points)
+        rows.extend(raw(max(horizon, start), end + timedelta(microseconds=1)))
+        return rows
+
+    def _read_minmax_buckets(self, node, start, end, buckets):
+        """Return ``(epoch_ms, value)`` of the min and max sample of each time bucket, in time order."""
+        # min()/max() over [value, epoch] arrays pick the extreme sample and its
+        # time in one pass, without sorting the bucket
+        self.env.cr.execute(f"""
+            WITH extremes AS (
+                SELECT min(ARRAY[value::float8, extract(epoch FROM "timestamp")::float8]) AS low,
+                       max(ARRAY[value::float8, extract(epoch FROM "timestamp")::float8]) AS high
+                  FROM "{self._table}"
+                 WHERE device_id = %s AND node_id = %s AND "timestamp" BETWEEN %s AND %s
+                   AND value IS NOT NULL
+                 GROUP BY width_bucket(extract(epoch FROM "timestamp"),
+                                       extract(epoch FROM %s::timestamp),
+                                       extract(epoch FROM %s::timestamp) + 1, %s)
+            )
+            SELECT DISTINCT (point[2] * 1000)::bigint AS epoch_ms, point[1]
+              FROM (SELECT low AS point FROM extremes UNION ALL SELECT high FROM extremes) AS points
+             ORDER BY epoch_ms
+        """, (node.device_id.id, node.node_id, start, end, start, end, buckets))
+        return self.env.cr.fetchall()
+
+    @api.model
+    def fetch_opcua_data(self, max_workers=16):
+        """Collect data of all active devices that are not polled on their own.
+
+        The HTTP calls run concurrently in a bounded thread pool, each with
+        the ``fetch_timeout`` of its device, so a run takes as long as the
+        slowest device rather than the sum of all of them. The threads only
+        talk HTTP; every result is written back here, in this transaction.
+
+        :return: number of devices fetched without error
+        """
+        devices = self.env['opcua.device'].search([('active', '=', True), ('is_polling', '=', False)])
+        devices = devices.filtered('node_ids')
+        if not devices:
+            return 0
+        start_time = time.time()
+
+        # Read everything the threads need up front, the ORM stays in this thread
+        db_name = self.env.cr.dbname
+        max_age = self.env['opcua.device']._get_read_max_age()
+        jobs = {}
+        for device in devices:
+            node_ids = device.node_ids.mapped('node_id')
+            payload = opcua_columnar.build_request(db_name, device.id, device.endpoint, node_ids,
+                                                   device.response_format, max_age)
+            jobs[device.id] = (device._get_bridge_client(), payload, node_ids, device.fetch_timeout or 10)
+
+        metrics = get_metrics(self.env)
+
+        def fetch(device_id, client, payload, node_ids, timeout):
+            with metrics.stage(device_id, 'http'):
+                response = opcua_columnar.post_data(client, payload, node_ids, idempotent=False,
+                                                    timeout=(min(3.05, timeout), timeout))
+            with metrics.stage(device_id, 'parse'):
+                return opcua_columnar.decode_result(db_name, device_id, node_ids, response.json())
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+            futures = {executor.submit(fetch, device_id, *job): device_id for device_id, job in jobs.items()}
+            for future in as_completed(futures):
+                device_id = futures[future]
+                try:
+                    results[device_id] = future.result()
+                except Exception as e:
+                    results[device_id] = e
+
+        ok_count = 0
+        for device in devices:
+            result = results.get(device.id)
+            if isinstance(result, dict):
+                try:
+                    device._apply_fetch_result(result)
+                    ok_count += not result.get('error')
+                    continue
+                except Exception as e:
+                    result = e
+            metrics.error(device.id, 'connection' if isinstance(result, requests.exceptions.ConnectionError)
+                          else 'processing')
+            _logger.error(f"Error fetching OPC UA data for {device.name}: {str(result)}")
+            device.write({
+                'error_message': f"Error fetching data: {str(result)}",
+                'connection_status': 'error'
+            })
+        latency = (time.time() - start_time) * 1000
+        _logger.info(f"Time taken to collect {len(devices)} devices: {latency} ms ({ok_count} ok)")
+        return ok_count
 
     @api.model
     def test_connection(self):
         """Test connection to OPC UA server"""
-        api_url = 'http://localhost:4001/test'
         try:
-            response = requests.get(api_url, params={'endpoint': self.endpoint}, timeout=5)
+            response = get_bridge_client('http://localhost:4001').get('/test', params={'endpoint': self.endpoint},
+                                                                      timeout=(3.05, 5))
             if response.status_code == 200:
                 data = response.json()
                 self.write({
@@ -0,0 +1,214 @@
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Resolutions from finest to coarsest, with their bucket length
+ROLLUP_RESOLUTIONS = [
+    ('minute', timedelta(minutes=1)),
+    ('hour', timedelta(hours=1)),
+    ('day', timedelta(days=1)),
+]
+
+WATERMARK_PARAM = 'opcua_connector.rollup_watermark'
+# "<id>,<txid>": ids up to <id> were allocated by transactions older than <txid>
+MARK_PARAM = 'opcua_connector.rollup_mark'
+
+
+class OpcuaDataRollup(models.Model):
+    _name = 'opcua.data.rollup'
+    _description = 'OPC UA Historical Data Aggregate'
+    _order = 'bucket desc'
+
+    device_id = fields.Many2one('opcua.device', string='Device', required=True, ondelete='cascade', index=True)
+    node_id = fields.Char('Node ID', required=True)
+    resolution = fields.Selection([
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+        ('day', 'Day')
+    ], string='Resolution', required=True)
+    bucket = fields.Datetime('Bucket Start', required=True)
+    sample_count = fields.Integer('Count')
+    value_sum = fields.Float('Sum')
+    value_min = fields.Float('Min', digits=(10, 2))
+    value_max = fields.Float('Max', digits=(10, 2))
+    value_avg = fields.Float('Average', digits=(10, 2), compute='_compute_value_avg')
+    first_value = fields.Float('First', digits=(10, 2))
+    first_timestamp = fields.Datetime('First Sample')
+    last_value = fields.Float('Last', digits=(10, 2))
+    last_timestamp = fields.Datetime('Last Sample')
+
+    _sql_constraints = [
+        ('bucket_uniq', 'unique(device_id, node_id, resolution, bucket)',
+         'Only one aggregate can exist per node, resolution and bucket!')
+    ]
+
+    @api.depends('value_sum', 'sample_count')
+    def _compute_value_avg(self):
+        for rollup in self:
+            rollup.value_avg = rollup.value_sum / rollup.sample_count if rollup.sample_count else 0.0
+
+    @api.model
+    def _cron_update_rollups(self, batch_size=100000, time_budget=50):
+        """Fold new history rows into the aggregates, incrementally.
+
+        Rows are processed by increasing id from a watermark stored in
+        ``opcua_connector.rollup_watermark``, so each run only reads the rows
+        inserted since the previous one. Late-arriving samples get new ids and
+        are merged into the (older) buckets they belong to, which corrects
+        them without any recompute.
+
+        The watermark never passes an id a transaction still in flight may
+        commit: each run marks the last id allocated along with the next
+        transaction id (``opcua_connector.rollup_mark``), and the ids up to
+        that mark are only processed once every transaction older than it
+        has ended, however long a flush or backfill chunk runs.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        watermark = int(params.get_param(WATERMARK_PARAM, 0))
+        limit = self._get_settled_id(watermark)
+        deadline = time.time() + time_budget
+        processed = 0
+        while time.time() < deadline:
+            self.env.cr.execute("""
+                SELECT max(id) FROM (
+                    SELECT id FROM opcua_data
+                     WHERE id > %s AND id <= %s
+                     ORDER BY id
+                     LIMIT %s
+                ) AS batch
+            """, (watermark, limit, batch_size))
+            upper = self.env.cr.fetchone()[0]
+            if not upper:
+                break
+            for resolution, _length in ROLLUP_RESOLUTIONS:
+                self._merge_rollups(resolution, watermark, upper)
+            processed += upper - watermark
+            watermark = upper
+            params.set_param(WATERMARK_PARAM, watermark)
+            self.env.cr.commit()
+        if processed:
+            _logger.info(f"Rolled up OPC UA history up to id {watermark}")
+        self.env.invalidate_all()
+        return watermark
+
+    @api.model
+    def _delete_rollups(self, before):
+        """Delete the aggregates of buckets starting before ``before``; return their number."""
+        self.flush_model()
+        self.env.cr.execute("DELETE FROM opcua_data_rollup WHERE bucket < %s", (before,))
+        count = self.env.cr.rowcount
+        self.invalidate_model()
+        if count:
+            _logger.info(f"Deleted {count} OPC UA aggregates older than {before}")
+        return count
+
+    @api.model
+    def _get_settled_id(self, watermark):
+        """Return the highest history id no transaction in flight can still commit below,
+        moving the mark forward once the previous one settled."""
+        params = self.env['ir.config_parameter'].sudo()
+        cr = self.env.cr
+        cr.execute("""
+            SELECT last_value, txid_snapshot_xmin(txid_current_snapshot()), txid_snapshot_xmax(txid_current_snapshot())
+              FROM opcua_data_id_seq
+        """)
+        last_id, oldest_txid, next_txid = cr.fetchone()
+        mark = params.get_param(MARK_PARAM)
+        settled = watermark
+        if mark:
+            mark_id, mark_txid = (int(part) for part in mark.split(','))
+            if oldest_txid < mark_txid:
+                # Transactions that may hold ids up to the mark are still running
+                return watermark
+            settled = max(mark_id, watermark)
+        params.set_param(MARK_PARAM, f'{last_id},{next_txid}')
+        return settled
+
+    def _merge_rollups(self, resolution, lower_id, upper_id):
+        """Aggregate history rows with ``lower_id < id <= upper_id`` into ``resolution`` buckets."""
+        self.flush_model()
+        self.env.cr.execute("""
+            INSERT INTO opcua_data_rollup AS r (
+                device_id, node_id, resolution, bucket,
+                sample_count, value_sum, value_min, value_max,
+                first_value, first_timestamp, last_value, last_timestamp,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT device_id, node_id, %(resolution)s, date_trunc(%(resolution)s, timestamp),
+                   count(*), sum(value), min(value), max(value),
+                   (array_agg(value ORDER BY timestamp))[1], min(timestamp),
+                   (array_agg(value ORDER BY timestamp DESC))[1], max(timestamp),
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM opcua_data
+             WHERE id > %(lower)s AND id <= %(upper)s AND value IS NOT NULL
+             GROUP BY device_id, node_id, date_trunc(%(resolution)s, timestamp)
+            ON CONFLICT (device_id, node_id, resolution, bucket) DO UPDATE SET
+                sample_count = r.sample_count + EXCLUDED.sample_count,
+                value_sum = r.value_sum + EXCLUDED.value_sum,
+                value_min = LEAST(r.value_min, EXCLUDED.value_min),
+                value_max = GREATEST(r.value_max, EXCLUDED.value_max),
+                first_value = CASE WHEN EXCLUDED.first_timestamp < r.first_timestamp
+                                   THEN EXCLUDED.first_value ELSE r.first_value END,
+                first_timestamp = LEAST(r.first_timestamp, EXCLUDED.first_timestamp),
+                last_value = CASE WHEN EXCLUDED.last_timestamp >= r.last_timestamp
+                                  THEN EXCLUDED.last_value ELSE r.last_value END,
+                last_timestamp = GREATEST(r.last_timestamp, EXCLUDED.last_timestamp),
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+        """, {
+            'resolution': resolution,
+            'lower': lower_id,
+            'upper': upper_id,
+            'uid': self.env.uid,
+        })
+
+    @api.model
+    def _delete_rollups(self, device_ids):
+        """Delete the aggregates of devices with one statement."""
+        self.flush_model()
+        self.env.cr.execute("DELETE FROM opcua_data_rollup WHERE device_id IN %s", (tuple(device_ids),))
+        self.invalidate_model()
+
+    @api.model
+    def _pick_resolution(self, start, end, max_points=2000):
+        """Return the finest resolution whose bucket count over the range fits ``max_points``."""
+        span = end - start
+        for resolution, length in ROLLUP_RESOLUTIONS:
+            if span / length <= max_points:
+                return resolution
+        return ROLLUP_RESOLUTIONS[-1][0]
+
+    @api.model
+    def read_aggregates(self, device_id, node_id, start, end, max_points=2000, resolution=None):
+        """Return the aggregates of a node over ``[start, end)``.
+
+        The resolution is picked automatically so long ranges are served from
+        the coarser hour/day buckets instead of scanning raw history.
+
+        :return: list of dicts with ``bucket``, ``count``, ``min``, ``max``,
+            ``avg``, ``first`` and ``last``, ordered by bucket
+        """
+        start = fields.Datetime.to_datetime(start)
+        end = fields.Datetime.to_datetime(end)
+        resolution = resolution or self._pick_resolution(start, end, max_points)
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT bucket, sample_count, value_min, value_max,
+                   value_sum / NULLIF(sample_count, 0), first_value, last_value
+              FROM opcua_data_rollup
+             WHERE device_id = %s AND node_id = %s AND resolution = %s
+               AND bucket >= date_trunc(%s, %s::timestamp) AND bucket < %s
+             ORDER BY bucket
+        """, (device_id, node_id, resolution, resolution, start, end))
+        return [{
+            'bucket': bucket,
+            'count': count,
+            'min': value_min,
+            'max': value_max,
+            'avg': value_avg,
+            'first': first_value,
+            'last': last_value,
+        } for bucket, count, value_min, value_max, value_avg, first_value, last_value in self.env.cr.fetchall()]
@@ -1,14 +1,33 @@
 from odoo import models, fields, api
+from odoo.exceptions import UserError
 import requests
-from datetime import datetime
+import secrets
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 import logging
+from psycopg2 import IntegrityError
 import threading
 import time
 import odoo
 from odoo.api import Environment
+from odoo.tools import ormcache
+import functools
+
+from .opcua_backfill import get_backfill_worker
+from .opcua_bridge_client import get_bridge_client
+from . import opcua_columnar
+from .opcua_metrics import get_metrics, summary as metrics_summary
+from .opcua_scheduler import get_scheduler
+from .opcua_sharding import get_coordinator, rendezvous_order, sharding_enabled
+from .opcua_write_buffer import get_write_buffer
 
 _logger = logging.getLogger(__name__)
 
+# A node has a history gap when nothing was stored for this many polling
+# intervals, and at least GAP_MIN_SECONDS
+GAP_FACTOR = 3
+GAP_MIN_SECONDS = 10
+
 class OpcuaDevice(models.Model):
     _name = 'opcua.device'
     _description = 'OPC UA Device'
@@ -27,30 +46,285 @@ class OpcuaDevice(models.Model):
     ], string='Connection Status', default='disconnected')
     
     node_ids = fields.One2many('opcua.node', 'device_id', string='Nodes')
+    alarm_event_ids = fields.One2many('opcua.alarm.event', 'device_id', string='Alarm Events')
     data_count = fields.Integer('Data Points', compute='_compute_data_count')
     is_polling = fields.Boolean('Is Polling', default=False, help='Indicates if the device is currently being polled')
     polling_interval = fields.Integer('Polling Interval (ms)', default=1000, help='Interval between data fetches in milliseconds')
+    fetch_timeout = fields.Integer('Fetch Timeout (s)', default=10,
+                                   help='Maximum time the scheduled collection waits for this device')
     api_port = fields.Integer(string='API Port', required=True, default=4001)
+    bridge_mode = fields.Selection([
+        ('port', 'API Port'),
+        ('pool', 'Bridge Pool')
+    ], string='API Server', default='port', required=True,
+        help='API Port uses the API server at the API Port; Bridge Pool spreads the devices over the '
+             'registered API servers and fails over to the next one while a server is unavailable')
     api_url = fields.Char(string='API URL', compute='_compute_api_url', store=True)
+    response_format = fields.Selection([
+        ('json', 'JSON'),
+        ('columnar', 'Columnar')
+    ], string='Response Format', default='json', required=True,
+        help='JSON returns the values keyed by node id on every poll. Columnar sends the node list to the '
+             'API server once, then exchanges only values, status and source timestamps as arrays in '
+             'that order, which is smaller and faster to parse for large node lists.')
+    acquisition_mode = fields.Selection([
+        ('polling', 'Polling'),
+        ('subscription', 'Subscription')
+    ], string='Acquisition Mode', default='polling', required=True,
+        help='Polling reads every node on a timer; subscription lets the OPC UA server report changes '
+             'which the API server pushes to Odoo. Polling is used as fallback when subscribing fails.')
+    sampling_interval = fields.Integer('Sampling Interval (ms)', default=250,
+                                       help='How often the OPC UA server samples monitored nodes')
+    queue_size = fields.Integer('Queue Size', default=10,
+                                help='Changes kept per node by the OPC UA server between two publications')
+    deadband_type = fields.Selection([
+        ('none', 'None'),
+        ('absolute', 'Absolute'),
+        ('percent', 'Percent')
+    ], string='Deadband', default='none', required=True,
+        help='Data-change filter applied by the OPC UA server to monitored nodes')
+    deadband_value = fields.Float('Deadband Value')
+    push_token = fields.Char('Push Token', copy=False, groups='base.group_system',
+                             help='Shared secret the API server sends along with pushed notifications')
+    bridge_state = fields.Selection([
+        ('closed', 'Available'),
+        ('open', 'Unavailable')
+    ], string='API Server', compute='_compute_bridge_state',
+        help='Circuit breaker of the OPC UA API server: while unavailable, calls fail immediately '
+             'and the server is probed in the background until it answers again')
+    bridge_error = fields.Char('API Server Error', compute='_compute_bridge_state')
+    retention_days = fields.Integer('History Retention (days)', default=0,
+                                    help='Delete historical data of this device older than this many days, '
+                                         '0 to only apply the global retention')
+    history_stored_count = fields.Integer('Stored Samples', compute='_compute_history_counters')
+    history_suppressed_count = fields.Integer('Suppressed Samples', compute='_compute_history_counters')
+    history_savings = fields.Float('Storage Savings (%)', compute='_compute_history_counters',
+                                   help='Share of samples kept out of history by the node storage filters '
+                                        'since this server process started')
+    poll_lag_ms = fields.Float('Polling Lag (ms)', compute='_compute_polling_stats',
+                               help='Delay between the scheduled deadline and the start of the last poll')
+    polling_worker_id = fields.Many2one('opcua.worker', string='Polling Worker', compute='_compute_polling_worker',
+                                        help='Odoo process holding the polling lease of the device, '
+                                             'when polling is sharded (opcua_connector.sharding, on by default '
+                                             'with --workers)')
+    poll_missed_deadlines = fields.Integer('Missed Deadlines', compute='_compute_polling_stats',
+                                           help='Polling ticks skipped because the previous poll overran its interval')
+    backfill_enabled = fields.Boolean('Backfill Gaps',
+                                      help='When the device comes back after an outage, read the values missed in '
+                                           'the meantime from the OPC UA server history (HistoryRead) into the '
+                                           'historical data. Only nodes storing every sample are backfilled.')
+    backfill_max_hours = fields.Integer('Backfill Window (h)', default=24,
+                                        help='How far back history gaps are looked for')
+    backfill_status = fields.Char('Backfill Status', compute='_compute_backfill_status')
+    metrics_summary = fields.Text('Poll Timings', compute='_compute_metrics_summary',
+                                  help='Duration of each poll stage over the last polls of this server process, '
+                                       'recorded while the opcua_connector.metrics system parameter is set')
+
+    def _register_hook(self):
+        """Resume polling of every device flagged ``is_polling`` on server start."""
+        super()._register_hook()
+        if odoo.tools.config.get('test_enable') or odoo.tools.config.get('stop_after_init'):
+            return
+        if sharding_enabled(self.env):
+            # Polled devices are spread over the processes by their leases
+            get_coordinator(self.env.cr.dbname).start()
+            return
+        # The resume thread blocks on the registry lock until loading is done
+        scheduler = get_scheduler(self.env.cr.dbname)
+        threading.Thread(target=scheduler.resume, name='opcua-scheduler-resume', daemon=True).start()
+
+    # ------------------------------------------------------------------
+    # Sample consumers
+    # ------------------------------------------------------------------
+    @api.model
+    def _get_consumer_models(self):
+        """Models receiving the samples of a device, mapped to their Reference
+        field pointing at the device: the models inheriting
+        ``opcua.consumer.mixin``, plus ``device.monitor``. Override to register
+        more consumers.
+
+        A consumer implements ``_process_plc_batch(values, timestamps)``, called
+        once per poll with ``{node_id: value}`` and ``{node_id: timestamp}`` of
+        the latest sample of each node, or the per-value
+        ``_process_plc_data(node_id, value)`` called for every sample.
+        """
+        consumer_models = {'device.monitor': 'device_id'}
+        for model_name in self.env.registry.descendants(['opcua.consumer.mixin'], '_inherit'):
+            model = self.env[model_name]
+            if not model._abstract:
+                consumer_models[model_name] = model._opcua_device_field
+        return consumer_models
+
+    def _get_consumer_ids(self, device_id):
+        """Return ``((model, ids), ...)`` of the consumers of a device.
+
+        The result is cached per version of the consumer tables, see
+        :meth:`_get_consumer_version`, so creating, relinking or deleting a
+        consumer is picked up by the next poll in every worker.
+        """
+        consumer_models = tuple(
+            (model_name, field_name) for model_name, field_name in self._get_consumer_models().items()
+            if model_name in self.env
+        )
+        if not consumer_models:
+            return ()
+        return self._get_cached_consumer_ids(device_id, consumer_models, self._get_consumer_version(consumer_models))
+
+    def _get_consumer_version(self, consumer_models):
+        """Return a cheap fingerprint of the consumer tables: their number of
+        rows, highest id and latest ``write_date``. Any create, write or
+        unlink changes it.
+        """
+        queries = []
+        for model_name, _field_name in consumer_models:
+            model = self.env[model_name]
+            model.flush_model()
+            write_date = 'max(write_date)' if model._log_access else 'NULL::timestamp'
+            queries.append(f'SELECT count(*), max(id), {write_date} FROM "{model._table}"')
+        self.env.cr.execute(' UNION ALL '.join(f'({query})' for query in queries))
+        return tuple(self.env.cr.fetchall())
+
+    @ormcache('device_id', 'consumer_models', 'version')
+    def _get_cached_consumer_ids(self, device_id, consumer_models, version):
+        consumers = []
+        for model_name, field_name in consumer_models:
+            ids = self.env[model_name].sudo().search([(field_name, '=', f'{self._name},{device_id}')]).ids
+            if ids:
+                consumers.append((model_name, tuple(ids)))
+        return tuple(consumers)
+
+    def _dispatch_to_consumers(self, samples):
+        """Hand one poll worth of ``(node_id, value, timestamp)`` samples to the consumers."""
+        self.ensure_one()
+        consumer_ids = self._get_consumer_ids(self.id)
+        if not consumer_ids:
+            return
+        latest = {}
+        for node_id, value, timestamp in samples:
+            if node_id not in latest or timestamp >= latest[node_id][1]:
+                latest[node_id] = (value, timestamp)
+        values = {node_id: value for node_id, (value, timestamp) in latest.items()}
+        timestamps = {node_id: timestamp for node_id, (value, timestamp) in latest.items()}
+        metrics = get_metrics(self.env)
+        for model_name, ids in consumer_ids:
+            consumers = self.env[model_name].browse(ids)
+            if hasattr(consumers, '_process_plc_batch'):
+                for consumer in consumers:
+                    try:
+                        consumer._process_plc_batch(values, timestamps)
+                    except Exception as e:
+                        metrics.error(self.id, 'monitor')
+                        _logger.error(f"Error processing data through {model_name} {consumer.display_name}: {e}")
+                continue
+            # Compatibility with consumers only implementing the per-value hook
+            for consumer in consumers:
+                for node_id, value, timestamp in samples:
+                    try:
+                        _logger.debug(f"Processing via {model_name} {consumer.display_name}: Node {node_id} = {value}")
+                        consumer._process_plc_data(node_id, value)
+                    except Exception as e:
+                        metrics.error(self.id, 'monitor')
+                        _logger.error(f"Error processing data through {model_name} {consumer.display_name}: {e}")
 
     @api.depends('node_ids')
     def _compute_data_count(self):
         for device in self:
             device.data_count = len(device.node_ids)
 
-    @api.depends('api_port')
+    def _compute_history_counters(self):
+        for device in self:
+            stored = sum(device.node_ids.mapped('history_stored_count'))
+            suppressed = sum(device.node_ids.mapped('history_suppressed_count'))
+            device.history_stored_count = stored
+            device.history_suppressed_count = suppressed
+            device.history_savings = 100.0 * suppressed / (stored + suppressed) if stored + suppressed else 0.0
+
+    def _compute_polling_stats(self):
+        scheduler = get_scheduler(self.env.cr.dbname)
+        for device in self:
+            stats = scheduler.stats(device.id) or {}
+            device.poll_lag_ms = stats.get('lag_ms', 0.0)
+            device.poll_missed_deadlines = stats.get('missed', 0)
+
+    def _compute_metrics_summary(self):
+        for device in self:
+            stages, errors = metrics_summary(self.env.cr.dbname, device.id)
+            lines = [f"{stage}: p50 {stats['p50']:.1f} ms, p95 {stats['p95']:.1f} ms, "
+                     f"max {stats['max']:.1f} ms ({stats['count']} polls)"
+                     for stage, stats in stages.items()]
+            if errors:
+                lines.append('errors: ' + ', '.join(f'{kind} {count}' for kind, count in sorted(errors.items())))
+            device.metrics_summary = '\n'.join(lines) or False
+
+    def _compute_backfill_status(self):
+        worker = get_backfill_worker(self.env.cr.dbname)
+        for device in self:
+            status = worker.status(device.id) or {}
+            state = status.get('state')
+            if state == 'queued':
+                device.backfill_status = 'Queued'
+            elif state == 'running':
+                device.backfill_status = f"Running, {status['values']} values stored so far"
+            elif state == 'done':
+                device.backfill_status = (f"{status['values']} values stored for {status['nodes']} nodes "
+                                          f"at {status['finished']}")
+            elif state == 'error':
+                device.backfill_status = f"Failed at {status['finished']}: {status['error']}"
+            else:
+                device.backfill_status = False
+
+    def _compute_polling_worker(self):
+        leases = self.env['opcua.device.lease'].sudo().search([('device_id', 'in', self.ids)])
+        worker_by_device = {lease.device_id.id: lease.worker_id for lease in leases}
+        for device in self:
+            device.polling_worker_id = worker_by_device.get(device.id, False)
+
+    @api.depends('api_port', 'bridge_mode')
     def _compute_api_url(self):
+        pool_urls = self.env['opcua.bridge']._get_pool_urls()
         for record in self:
-            record.api_url = f'http://host.docker.internal:{record.api_port}'
+            if record.bridge_mode == 'pool' and pool_urls:
+                record.api_url = rendezvous_order(record._origin.id or record.id, pool_urls)[0]
+            else:
+                record.api_url = f'http://host.docker.internal:{record.api_port}'
+
+    def _compute_bridge_state(self):
+        for device in self:
+            client = get_bridge_client(device.api_url) if device.api_url else None
+            device.bridge_state = client.state if client else 'closed'
+            device.bridge_error = client.last_error if client and client.state == 'open' else False
+
+    @api.model
+    def _get_read_max_age(self):
+        """Age in ms of the values the API server may answer from its last-value cache."""
+        return int(self.env['ir.config_parameter'].sudo().get_param('opcua_connector.read_max_age_ms', 0) or 0)
+
+    def _get_bridge_client(self):
+        """Shared pooled HTTP client of the device's OPC UA API server.
+
+        Devices of the bridge pool fail over to the next API server of their
+        rendezvous order while the circuit breaker of their own one is open.
+        """
+        self.ensure_one()
+        client = get_bridge_client(self.api_url)
+        if self.bridge_mode != 'pool' or client.state == 'closed':
+            return client
+        for url in rendezvous_order(self.id, self.env['opcua.bridge']._get_pool_urls()):
+            candidate = get_bridge_client(url)
+            if candidate.state == 'closed':
+                return candidate
+        return client
 
     def test_connection(self):
         self.ensure_one()
         try:
             _logger.info(f"Testing connection for device {self.name} at {self.endpoint}")
-            api_url = self.api_url + '/test'
+            # Report the API server actually asked, a pool device may have failed over
+            client = self._get_bridge_client()
+            api_url = client.base_url + '/test'
             
             # Use the /test endpoint with GET method
-            response = requests.get(api_url, params={'endpoint': self.endpoint}, timeout=10)
+            response = client.get('/test', params={'endpoint': self.endpoint})
             response.raise_for_status()
             data = response.json()
             
@@ -127,67 +401,29 @@ class OpcuaDevice(models.Model):
         
         self.ensure_one()
         try:
-            api_url = self.api_url + '/data'
-            node_ids = [node.node_id for node in self.node_ids]
+            client = self._get_bridge_client()
+            api_url = client.base_url + '/data'
+            node_ids = self.node_ids.mapped('node_id')
             # Prepare data to send in the request body
-            payload = {
-                'endpoint': self.endpoint,
-                'node_ids': node_ids
-            }
-            
+            payload = opcua_columnar.build_request(self.env.cr.dbname, self.id, self.endpoint, node_ids,
+                                                   self.response_format, self._get_read_max_age())
+
             # Use POST method and send data in the body
-            response = requests.post(api_url, json=payload, timeout=10) # Increased timeout slightly for POST
-            response.raise_for_status()
-            data = response.json()
-            _logger.info(f"Received data from API: {data}")
-            self.connection_status = data.get('connectionStatus', 'error')
+            metrics = get_metrics(self.env)
+            with metrics.stage(self.id, 'http'):
+                response = opcua_columnar.post_data(client, payload, node_ids, idempotent=True)
+            with metrics.stage(self.id, 'parse'):
+                data = opcua_columnar.decode_result(self.env.cr.dbname, self.id, node_ids, response.json())
             values = data.get('values', {})
-            if not isinstance(values, dict):
-                values = {}
-            _logger.info(f"Extracted values: {values}")
-            formatted_values = []
-            
-            # Find the linked monitor and process data for business logic
-            monitor = self.env['device.monitor'].search([('device_id', '=', f'{self._name},{self.id}')], limit=1)
-            
-            # Update node values and create historical data
-            for node_id, value in values.items():
-                # Process through device monitor if linked
-                if monitor:
-                    try:
-                        _logger.info(f"Processing via monitor {monitor.name}: Node {node_id} = {value}")
-                        monitor._process_plc_data(node_id, value)
-                    except Exception as e:
-                        _logger.error(f"Error processing data through monitor {monitor.name}: {e}")
-
-                # Find the corresponding node
-                node = self.node_ids.filtered(lambda n: n.node_id == node_id)
-                if node:
-                    # Update node's current value
-                    node.write({
-                        'value': value,
-                        'last_update': fields.Datetime.now(),
-                        'error_message': False
-                    })
-                    # Create historical data point
-                    self.env['opcua.data'].create({
-                        'device_id': self.id,
-                        'node_id': node_id,
-                        'timestamp': fields.Datetime.now(),
-                        'value': value,
-                        'error': data.get('error')
-                    })
-                    formatted_values.append(f'{node.name}: {value}')
+            formatted_values = self._apply_fetch_result(data)
 
             end_time = time.time()
             duration = end_time - start_time
             latency = duration * 1000
-            _logger.info(f"Time taken to fetch data: {latency} ms")
-            
-            _logger.info(f"Formatted values: {formatted_values}")
-            self.error_message = data.get('error')
+            metrics.observe(self.id, 'total', latency)
+            _logger.info(f"Time taken to fetch {len(values)} values from {self.name}: {latency} ms")
+
             if data.get('error'):
-                self.connection_status = 'error'
                 message = f'Error: {data.get("error")}'
                 message_type = 'danger'
             else:
@@ -197,7 +433,10 @@ class OpcuaDevice(models.Model):
                 else:
                     message = 'Data fetched successfully:\n' + '\n'.join(formatted_values)
                     message_type = 'success'
-            _logger.info(f"Final message: {message}")
+            # Formatting the whole poll is costly on large node lists, only do it when asked for
+            if _logger.isEnabledFor(logging.DEBUG):
+                _logger.debug(f"Received data from API: {data}")
+                _logger.debug(f"Final message: {message}")
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -212,6 +451,7 @@ class OpcuaDevice(models.Model):
             error_msg = f"Could not connect to OPC UA API at {api_url}. Please ensure the API server is running."
             self.connection_status = 'error'
             self.error_message = error_msg
+            get_metrics(self.env).error(self.id, 'connection')
             _logger.error(error_msg)
             return {
                 'type': 'ir.actions.client',
@@ -227,6 +467,7 @@ class OpcuaDevice(models.Model):
             error_msg = f"Error fetching data: {str(e)}"
             self.connection_status = 'error'
             self.error_message = error_msg
+            get_metrics(self.env).error(self.id, 'processing')
             _logger.error(f"Error fetching data from {self.endpoint}: {str(e)}")
             return {
                 'type': 'ir.actions.client',
@@ -239,6 +480,316 @@ class OpcuaDevice(models.Model):
                 }
             }
 
+    def _apply_fetch_result(self, data):
+        """Apply one ``/data`` result (or one ``/data/batch`` entry) to the device.
+
+        :param data: decoded result with ``values``, ``connectionStatus`` and ``error``
+        :return: list of formatted "name: value" strings for notifications
+        """
+        self.ensure_one()
+        previous_status = self.connection_status
+        # Back after an outage: the hole it left in the history ends with this
+        # poll, find it before the new values are stored
+        gaps = None
+        if self.backfill_enabled and previous_status == 'error' and not data.get('error'):
+            gaps = self._get_history_gaps()
+        self.connection_status = data.get('connectionStatus', 'error')
+        values = data.get('values', {})
+        if not isinstance(values, dict):
+            values = {}
+        # Values answered from the API server cache are as old as their read
+        timestamp = None
+        if data.get('cached') and data.get('read_at'):
+            timestamp = datetime.fromtimestamp(data['read_at'] / 1000, timezone.utc).replace(tzinfo=None)
+        formatted_values = self._ingest_values(values, error=data.get('error'), timestamp=timestamp)
+        self.error_message = data.get('error')
+        if data.get('error'):
+            self.connection_status = 'error'
+            get_metrics(self.env).error(self.id, 'bridge')
+        elif gaps:
+            self._schedule_backfill(gaps)
+        return formatted_values
+
+    @api.model
+    def _collect_by_bridge(self, devices=None):
+        """Fetch data for many devices with one ``/data/batch`` call per bridge.
+
+        Devices are grouped by API server; each group is read in a single
+        round trip and every device gets its own status and error back.
+
+        :param devices: devices to collect, defaults to all active devices with nodes
+        :return: number of devices that were fetched without error
+        """
+        if devices is None:
+            devices = self.search([('active', '=', True)])
+        devices = devices.filtered('node_ids')
+        device_ids_by_url = defaultdict(list)
+        for device in devices:
+            device_ids_by_url[device._get_bridge_client().base_url].append(device.id)
+        ok_count = 0
+        metrics = get_metrics(self.env)
+        for api_url, device_ids in device_ids_by_url.items():
+            group = self.browse(device_ids)
+            start_time = time.time()
+            node_ids_by_key = {device.id: device.node_ids.mapped('node_id') for device in group}
+            # max_age goes in each request so the retries below keep it
+            max_age = self._get_read_max_age()
+            payload = {
+                'requests': [dict(opcua_columnar.build_request(self.env.cr.dbname, device.id, device.endpoint,
+                                                               node_ids_by_key[device.id], device.response_format,
+                                                               max_age),
+                                  key=device.id) for device in group],
+            }
+            try:
+                client = get_bridge_client(api_url)
+                response = client.post('/data/batch', json=payload, idempotent=True)
+                response.raise_for_status()
+                results_by_key = {result.get('key'): result for result in response.json().get('results', [])}
+                # The API server lost some node indexes (e.g. it restarted): send those node lists again
+                retry = [dict(request, node_ids=node_ids_by_key[request['key']]) for request in payload['requests']
+                         if (results_by_key.get(request['key']) or {}).get('unknown_index')]
+                if retry:
+                    response = client.post('/data/batch', json={'requests': retry}, idempotent=True)
+                    response.raise_for_status()
+                    results_by_key.update((result.get('key'), result) for result in response.json().get('results', []))
+            except requests.exceptions.ConnectionError:
+                error_msg = f"Could not connect to OPC UA API at {api_url}. Please ensure the API server is running."
+                _logger.error(error_msg)
+                group.write({'connection_status': 'error', 'error_message': error_msg})
+                for device_id in device_ids:
+                    metrics.error(device_id, 'connection')
+                continue
+            except Exception as e:
+                error_msg = f"Error fetching data: {str(e)}"
+                _logger.error(f"Error fetching batch data from {api_url}: {str(e)}")
+                group.write({'connection_status': 'error', 'error_message': error_msg})
+                for device_id in device_ids:
+                    metrics.error(device_id, 'processing')
+                continue
+
+            http_ms = (time.time() - start_time) * 1000
+            for device in group:
+                metrics.observe(device.id, 'http', http_ms)
+                result = results_by_key.get(device.id)
+                if result is None:
+                    device.write({'connection_status': 'error',
+                                  'error_message': 'No result returned for device in batch response'})
+                    continue
+                try:
+                    result = opcua_columnar.decode_result(self.env.cr.dbname, device.id,
+                                                          node_ids_by_key[device.id], result)
+                    device._apply_fetch_result(result)
+                except Exception as e:
+                    metrics.error(device.id, 'processing')
+                    _logger.error(f"Error processing batch data for device {device.name}: {str(e)}")
+                    device.write({'connection_status': 'error', 'error_message': f"Error fetching data: {str(e)}"})
+                    continue
+                if not result.get('error'):
+                    ok_count += 1
+            latency = (time.time() - start_time) * 1000
+            _logger.info(f"Time taken to fetch batch of {len(group)} devices from {api_url}: {latency} ms")
+        return ok_count
+
+    def action_fetch_data_batch(self):
+        """Fetch the selected devices, one round trip per bridge."""
+        devices = self or self.search([('active', '=', True)])
+        ok_count = self._collect_by_bridge(devices)
+        total = len(devices.filtered('node_ids'))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'OPC UA Data',
+                'message': f'Fetched data for {ok_count} of {total} devices.',
+                'type': 'success' if ok_count == total else 'warning',
+                'sticky': False,
+            }
+        }
+
+    def _ingest_values(self, values, error=False, timestamp=None):
+        """Store one poll worth of values in bulk, stamped with the current time.
+
+        :param values: dict mapping OPC UA node ids to the values read
+        :param error: error message reported by the API, stored on history rows
+        :param timestamp: time the values were read, when not now
+        :return: list of formatted "name: value" strings for notifications
+        """
+        timestamp = timestamp or fields.Datetime.now()
+        return self._ingest_samples([(node_id, value, timestamp) for node_id, value in values.items()],
+                                    error=error)
+
+    def _ingest_samples(self, samples, error=False):
+        """Store a batch of samples in bulk.
+
+        The node_id -> record index is built once per batch, node values are
+        written in groups sharing the same value, alarms of all nodes are
+        evaluated in a single pass and all history rows are
+        inserted with a single multi-row create. Samples of the same node
+        falling in the same second are collapsed to the last one, as history
+        is unique per node and timestamp, and only the samples passing the
+        node's history storage filter are written to history. Booleans and
+        integers are stored as floats; a node sending any other value (text,
+        arrays, structures) gets an error message and its samples are
+        skipped, the rest of the batch is stored.
+
+        :param samples: list of ``(node_id, value, timestamp)`` tuples
+        :param error: error message reported by the API, stored on history rows
+        :return: list of formatted "name: value" strings for notifications
+        """
+        self.ensure_one()
+        formatted_values = []
+        if not samples:
+            return formatted_values
+        metrics = get_metrics(self.env)
+
+        # Hand the samples to the linked monitors for business logic
+        with metrics.stage(self.id, 'monitor'):
+            self._dispatch_to_consumers(samples)
+
+        node_index = {node.node_id: node for node in self.node_ids}
+        latest = {}
+        samples_by_node = defaultdict(dict)
+        rejected = {}
+        for node_id, value, timestamp in samples:
+            node = node_index.get(node_id)
+            if not node or node_id in rejected:
+                continue
+            if value is not None:
+                if not isinstance(value, (int, float)):
+                    rejected[node_id] = f"Unsupported value type {type(value).__name__}, only numbers are stored"
+                    continue
+                value = float(value)
+            timestamp = fields.Datetime.to_datetime(timestamp).replace(microsecond=0)
+            if node_id not in latest or timestamp >= latest[node_id][0]:
+                latest[node_id] = (timestamp, value)
+            samples_by_node[node_id][timestamp] = value
+        for node_id in rejected:
+            latest.pop(node_id, None)
+            samples_by_node.pop(node_id, None)
+
+        # Keep only the samples passing each node's history storage filter
+        history_vals = []
+        for node_id, node_samples in samples_by_node.items():
+            node = node_index[node_id]
+            for timestamp, value in node._filter_history(sorted(node_samples.items())):
+                history_vals.append({
+                    'device_id': self.id,
+                    'node_id': node_id,
+                    'opcua_node_id': node.id,
+                    'timestamp': timestamp,
+                    'value': value,
+                    'error': error,
+                })
+
+        # Update node's current value, one write per distinct value
+        node_ids_by_value = defaultdict(list)
+        for node_id, (timestamp, value) in latest.items():
+            node = node_index[node_id]
+            node_ids_by_value[(value, timestamp)].append(node.id)
+            formatted_values.append(f'{node.name}: {value}')
+        with metrics.stage(self.id, 'node_write'):
+            for (value, timestamp), ids in node_ids_by_value.items():
+                self.env['opcua.node'].browse(ids).write({
+                    'value': value,
+                    'last_update': timestamp,
+                    'error_message': False
+                })
+            node_ids_by_error = defaultdict(list)
+            for node_id, message in rejected.items():
+                node_ids_by_error[message].append(node_index[node_id].id)
+            for message, ids in node_ids_by_error.items():
+                self.env['opcua.node'].browse(ids).write({'error_message': message})
+            self.env['opcua.node'].flush_model()
+        # Raise and clear alarms, one pass over the nodes of this poll
+        with metrics.stage(self.id, 'alarm'):
+            latest_by_id = {node_index[node_id].id: sample for node_id, sample in latest.items()}
+            self.env['opcua.node'].browse(latest_by_id)._evaluate_alarms(latest_by_id)
+        # Create historical data points
+        with metrics.stage(self.id, 'history'):
+            self._create_history(history_vals)
+            self.env['opcua.data'].flush_model()
+        return formatted_values
+
+    def _create_history(self, vals_list):
+        """Insert history rows, skipping the ones already stored for the same second.
+
+        With write-behind enabled (``opcua_connector.write_behind``) the rows
+        are queued for the next bulk flush instead and nothing is returned.
+        """
+        if not vals_list:
+            return self.env['opcua.data']
+        Data = self.env['opcua.data']
+        buffer = get_write_buffer(self.env)
+        if buffer is not None:
+            buffer.add(vals_list)
+            return Data
+        try:
+            with self.env.cr.savepoint():
+                return Data.create(vals_list)
+        except IntegrityError:
+            # A previous poll or push already stored some of these samples
+            existing = Data.search_read([
+                ('device_id', 'in', list({vals['device_id'] for vals in vals_list})),
+                ('node_id', 'in', list({vals['node_id'] for vals in vals_list})),
+                ('timestamp', 'in', list({vals['timestamp'] for vals in vals_list})),
+            ], ['device_id', 'node_id', 'timestamp'])
+            seen = {(row['device_id'][0], row['node_id'], row['timestamp']) for row in existing}
+            vals_list = [vals for vals in vals_list
+                         if (vals['device_id'], vals['node_id'], vals['timestamp']) not in seen]
+            return Data.create(vals_list) if vals_list else Data
+
+    def _get_history_gaps(self, now=None):
+        """Find the nodes whose history stopped, from their last stored timestamp.
+
+        A node has a gap when its last sample of the last ``backfill_max_hours``
+        is older than ``GAP_FACTOR`` polling intervals. Nodes without any sample
+        in that window, and nodes whose history storage filter keeps only some
+        samples, are left alone.
+
+        :return: dict of node id to the ``(start, end)`` of its gap
+        """
+        self.ensure_one()
+        now = now or fields.Datetime.now()
+        nodes = self.node_ids.filtered(lambda node: node.history_mode == 'all')
+        if not nodes:
+            return {}
+        threshold = max(GAP_FACTOR * (self.polling_interval or 0) / 1000.0, GAP_MIN_SECONDS)
+        self.env['opcua.data'].flush_model()
+        self.env.cr.execute("""
+            SELECT node_id, max("timestamp") FROM opcua_data
+             WHERE device_id = %s AND node_id IN %s AND "timestamp" >= %s
+             GROUP BY node_id
+        """, (self.id, tuple(nodes.mapped('node_id')), now - timedelta(hours=self.backfill_max_hours or 24)))
+        return {node_id: (last, now) for node_id, last in self.env.cr.fetchall()
+                if (now - last).total_seconds() > threshold}
+
+    def _schedule_backfill(self, gaps=None):
+        """Queue a history backfill of the devices, once the transaction is committed.
+
+        :param gaps: gaps known to the caller, as returned by
+            ``_get_history_gaps``, read along with the ones found by the backfill
+        """
+        worker = get_backfill_worker(self.env.cr.dbname)
+        for device in self.filtered('backfill_enabled'):
+            self.env.cr.postcommit.add(functools.partial(worker.enqueue, device.id, gaps))
+
+    def action_backfill_history(self):
+        self.ensure_one()
+        if not self.backfill_enabled:
+            raise UserError("Enable Backfill Gaps on the device first.")
+        self._schedule_backfill()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'History Backfill',
+                'message': f'Looking for history gaps of {self.name} in the last {self.backfill_max_hours} hours, '
+                           f'missing values are read in the background.',
+                'type': 'info',
+                'sticky': False,
+            }
+        }
+
     def action_view_data(self):
         self.ensure_one()
         return {
@@ -252,7 +803,8 @@ class OpcuaDevice(models.Model):
 
     def action_clear_historical_data(self):
         self.ensure_one()
-        self.env['opcua.data'].search([('device_id', '=', self.id)]).unlink()
+        self.env['opcua.data']._delete_history(self.ids)
+        self.env['opcua.data.rollup']._delete_rollups(self.ids)
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
@@ -266,7 +818,8 @@ class OpcuaDevice(models.Model):
     
     def action_start_polling(self):
         self.ensure_one()
-        if self.is_polling:
+        if self.is_polling and self.acquisition_mode == 'polling' \
+                and get_scheduler(self.env.cr.dbname).is_scheduled(self.id):
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -278,68 +831,133 @@ class OpcuaDevice(models.Model):
                 }
             }
 
-        # Create a new cursor for the thread setup
+        # Create a new cursor so the flag is committed before the first poll
         with self.env.registry.cursor() as cr:
             env = api.Environment(cr, self.env.uid, self.env.context)
             device = env['opcua.device'].browse(self.id)
-            
-            # Ensure we're not polling and commit this change
-            device.write({'is_polling': False})
-            cr.commit()
-            
-            # Start new polling with fresh state
-            interval = max(1, int(self.polling_interval / 1000))
             device.write({'is_polling': True, 'connection_status': 'polling'})
             cr.commit()
 
-        def poller(device_id, interval):
-            db_name = self.env.cr.dbname
-            uid = self.env.uid
-            context = self.env.context
-            
-            while True:
-                try:
-                    with odoo.registry(db_name).cursor() as cr:
-                        env = api.Environment(cr, uid, context)
-                        device = env['opcua.device'].browse(device_id)
-                        
-                        # Check if polling should continue
-                        if not device.is_polling:
-                            _logger.info(f"Polling stopped for device {device_id}")
-                            break
-                            
-                        _logger.info(f"Polling device {device_id} at interval {interval}s")
-                        device.fetch_data()
-                        cr.commit()
-                        
-                        # Sleep outside the cursor context
-                        time.sleep(interval)
-                except Exception as e:
-                    _logger.error(f"Polling thread for device {device_id} crashed: {e}")
-                    # Ensure we clean up if there's an error
-                    with odoo.registry(db_name).cursor() as cr:
-                        env = api.Environment(cr, uid, context)
-                        device = env['opcua.device'].browse(device_id)
-                        device.write({'is_polling': False, 'connection_status': 'error'})
-                        cr.commit()
-                    break
-
-        thread = threading.Thread(target=poller, args=(self.id, interval), daemon=True)
-        thread.start()
-        
-        _logger.info(f"Started polling thread for device {self.id}")
-        
+        if sharding_enabled(self.env):
+            # The device is acquired by the worker its lease goes to, maybe another process
+            coordinator = get_coordinator(self.env.cr.dbname)
+            coordinator.start()
+            coordinator.rebalance()
+            self.invalidate_recordset(['polling_worker_id'])
+            worker = self.polling_worker_id.name
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': 'Polling Started',
+                    'message': f'Acquisition assigned to worker {worker}.' if worker else
+                               'Acquisition will be assigned to a worker at its next heartbeat.',
+                    'type': 'success',
+                    'sticky': False,
+                }
+            }
+
+        mode = self._start_acquisition()
+        if mode == 'subscription':
+            message = 'Subscription started, values are pushed on change.'
+            message_type = 'success'
+        elif self.acquisition_mode == 'subscription':
+            message = (f'Subscription could not be started ({self.error_message}), '
+                       f'falling back to auto fetch every {self.polling_interval} ms.')
+            message_type = 'warning'
+        else:
+            message = f'Auto fetch started every {self.polling_interval} ms.'
+            message_type = 'success'
+
         return {
             'type': 'ir.actions.client',
             'tag': 'display_notification',
             'params': {
                 'title': 'Polling Started',
-                'message': f'Auto fetch started every {self.polling_interval} ms.',
-                'type': 'success',
+                'message': message,
+                'type': message_type,
                 'sticky': False,
             }
         }
 
+    def _start_acquisition(self):
+        """Start the acquisition of the device in its configured mode.
+
+        Subscription devices fall back to polling when the bridge cannot
+        create the subscription.
+
+        :return: ``'subscription'`` or ``'polling'``, the mode actually started
+        """
+        self.ensure_one()
+        scheduler = get_scheduler(self.env.cr.dbname)
+        # Fill what was missed while the device was not acquired
+        self._schedule_backfill()
+        if self.acquisition_mode == 'subscription':
+            try:
+                self._subscribe()
+                scheduler.unschedule(self.id)
+                _logger.info(f"Started subscription for device {self.id}")
+                return 'subscription'
+            except Exception as e:
+                self.error_message = f"Subscription failed: {str(e)}"
+                _logger.warning(f"Subscription for device {self.id} failed, falling back to polling: {e}")
+        scheduler.schedule(self.id, self.polling_interval, uid=self.env.uid, context=self.env.context)
+        _logger.info(f"Started polling for device {self.id}")
+        return 'polling'
+
+    def _stop_acquisition(self):
+        self.ensure_one()
+        get_scheduler(self.env.cr.dbname).unschedule(self.id)
+        if self.acquisition_mode == 'subscription':
+            try:
+                self._unsubscribe()
+            except Exception as e:
+                _logger.warning(f"Could not remove subscription for device {self.id}: {e}")
+
+    def _get_subscription_key(self):
+        """Key of the device subscription on the API server, unique across databases."""
+        self.ensure_one()
+        return f'{self.env.cr.dbname}:{self.id}'
+
+    def _get_push_url(self):
+        """URL the bridge pushes change notifications to."""
+        base_url = self.env['ir.config_parameter'].sudo().get_param('opcua_connector.push_base_url') \
+            or self.env['ir.config_parameter'].sudo().get_param('web.base.url')
+        return f"{base_url.rstrip('/')}/opcua/push?db={self.env.cr.dbname}"
+
+    def _subscribe(self):
+        """Create (or replace) the bridge subscription of the device."""
+        self.ensure_one()
+        if not self.push_token:
+            self.sudo().push_token = secrets.token_urlsafe(32)
+        payload = {
+            'key': self._get_subscription_key(),
+            'db': self.env.cr.dbname,
+            'device_id': self.id,
+            'endpoint': self.endpoint,
+            'node_ids': self.node_ids.mapped('node_id'),
+            'publishing_interval': self.polling_interval,
+            'sampling_interval': self.sampling_interval,
+            'queue_size': self.queue_size,
+            'deadband_type': self.deadband_type,
+            'deadband_value': self.deadband_value,
+            'callback_url': self._get_push_url(),
+            'token': self.sudo().push_token,
+        }
+        response = self._get_bridge_client().post('/subscribe', json=payload, idempotent=True)
+        response.raise_for_status()
+        data = response.json()
+        if data.get('error'):
+            raise UserError(data['error'])
+        return data
+
+    def _unsubscribe(self):
+        self.ensure_one()
+        response = self._get_bridge_client().post('/unsubscribe', json={'key': self._get_subscription_key()},
+                                                  idempotent=True)
+        response.raise_for_status()
+        return response.json()
+
     def action_stop_polling(self):
         self.ensure_one()
         if self.is_polling:
@@ -349,7 +967,11 @@ class OpcuaDevice(models.Model):
                 device = env['opcua.device'].browse(self.id)
                 device.write({'is_polling': False, 'connection_status': 'connected'})
                 cr.commit()
-            
+
+            self._stop_acquisition()
+            if sharding_enabled(self.env):
+                # Release the lease now rather than at the next heartbeat
+                get_coordinator(self.env.cr.dbname).wake()
             _logger.info(f"Stopped polling for device {self.id}")
             return {
                 'type': 'ir.actions.client',
@@ -0,0 +1,48 @@
+from odoo import models, fields, api
+
+
+class OpcuaDeviceLease(models.Model):
+    _name = 'opcua.device.lease'
+    _description = 'OPC UA Device Lease'
+    _order = 'device_id'
+    _rec_name = 'device_id'
+
+    device_id = fields.Many2one('opcua.device', string='Device', required=True, ondelete='cascade', readonly=True)
+    worker_id = fields.Many2one('opcua.worker', string='Worker', required=True, ondelete='cascade', readonly=True)
+    expires_at = fields.Datetime('Expires', required=True, readonly=True)
+
+    _sql_constraints = [
+        ('device_uniq', 'unique(device_id)', 'A device can only be leased by one worker!')
+    ]
+
+    @api.model
+    def _claim(self, worker_name, device_ids, ttl):
+        """Claim or renew the leases of ``device_ids`` for a worker and release its other leases.
+
+        Leases held by another worker are only taken over once expired.
+
+        :return: set of the device ids leased by the worker
+        """
+        cr = self.env.cr
+        cr.execute("SELECT id FROM opcua_worker WHERE name = %s", (worker_name,))
+        worker_id = cr.fetchone()[0]
+        cr.execute("DELETE FROM opcua_device_lease WHERE worker_id = %s AND device_id != ALL(%s)",
+                   (worker_id, list(device_ids)))
+        owned = set()
+        if device_ids:
+            cr.execute("""
+                INSERT INTO opcua_device_lease (device_id, worker_id, expires_at,
+                                                create_uid, create_date, write_uid, write_date)
+                SELECT device_id, %(worker_id)s, now() at time zone 'UTC' + interval '1 second' * %(ttl)s,
+                       %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+                  FROM unnest(%(device_ids)s) AS device_id
+                ON CONFLICT (device_id) DO UPDATE
+                   SET worker_id = EXCLUDED.worker_id, expires_at = EXCLUDED.expires_at,
+                       write_date = EXCLUDED.write_date
+                 WHERE opcua_device_lease.worker_id = EXCLUDED.worker_id
+                    OR opcua_device_lease.expires_at < now() at time zone 'UTC'
+                RETURNING device_id
+            """, {'worker_id': worker_id, 'ttl': ttl, 'uid': self.env.uid, 'device_ids': list(device_ids)})
+            owned = {row[0] for row in cr.fetchall()}
+        self.invalidate_model()
+        return owned
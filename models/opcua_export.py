@@ -0,0 +1,144 @@
+import csv
+import io
+import logging
+
+import odoo
+from odoo import api
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+_logger = logging.getLogger(__name__)
+
+# Long-format rows fetched from the server-side cursor at a time
+EXPORT_FETCH_SIZE = 20000
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def parquet_available():
+    return pyarrow is not None
+
+
+def _fetch_wide(cr, device_id, node_ids, start, end):
+    """Yield lists of wide rows ``(timestamp, {node_id: value})`` in timestamp order.
+
+    The samples are read through a named server-side cursor, one batch of
+    ``EXPORT_FETCH_SIZE`` rows at a time, so memory stays bounded whatever
+    the size of the range. A timestamp split across two batches is carried
+    over to the next one.
+    """
+    cr.execute("""
+        DECLARE opcua_export NO SCROLL CURSOR FOR
+        SELECT "timestamp", node_id, value
+          FROM opcua_data
+         WHERE device_id = %s AND node_id = ANY(%s) AND "timestamp" >= %s AND "timestamp" < %s
+         ORDER BY "timestamp"
+    """, (device_id, list(node_ids), start, end))
+    pending = None
+    while True:
+        cr.execute(f"FETCH FORWARD {EXPORT_FETCH_SIZE} FROM opcua_export")
+        rows = cr.fetchall()
+        if not rows:
+            break
+        batch = []
+        for timestamp, node_id, value in rows:
+            if pending is None or pending[0] != timestamp:
+                if pending is not None:
+                    batch.append(pending)
+                pending = (timestamp, {})
+            pending[1][node_id] = value
+        if batch:
+            yield batch
+    cr.execute("CLOSE opcua_export")
+    if pending is not None:
+        yield [pending]
+
+
+def _csv_chunks(batches, node_ids, headers):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['timestamp'] + list(headers))
+    for batch in batches:
+        for timestamp, values in batch:
+            writer.writerow([timestamp.isoformat(sep=' ')] + [values.get(node_id, '') for node_id in node_ids])
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting what pyarrow writes, drained between row groups."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_chunks(batches, node_ids, headers):
+    """One row group per fetched batch: timestamp column plus one float column per node."""
+    schema = pyarrow.schema([pyarrow.field('timestamp', pyarrow.timestamp('us'))]
+                            + [pyarrow.field(header, pyarrow.float64()) for header in headers])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    for batch in batches:
+        columns = [pyarrow.array([timestamp for timestamp, _values in batch], pyarrow.timestamp('us'))]
+        columns += [pyarrow.array([values.get(node_id) for _timestamp, values in batch], pyarrow.float64())
+                    for node_id in node_ids]
+        writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(db_name, uid, device_id, node_ids, headers, start, end, file_format='csv'):
+    """Yield the history of ``node_ids`` of a device over ``[start, end)`` as file chunks.
+
+    The output is wide: one row per timestamp and one column per node, named
+    by ``headers``, empty where a node has no sample at that timestamp. The
+    generator uses its own cursor, so it can be consumed after the request
+    that created it returned; one chunk is produced per fetched batch.
+    """
+    if file_format == 'parquet' and pyarrow is None:
+        raise ValueError("Parquet export requires the pyarrow Python package")
+    registry = odoo.registry(db_name)
+    row_count = 0
+
+    def counted(batches):
+        nonlocal row_count
+        for batch in batches:
+            row_count += len(batch)
+            yield batch
+
+    with registry.cursor() as cr:
+        env = api.Environment(cr, uid, {})
+        env['opcua.data'].flush_model()
+        chunks = _parquet_chunks if file_format == 'parquet' else _csv_chunks
+        yield from chunks(counted(_fetch_wide(cr, device_id, node_ids, start, end)), node_ids, headers)
+    _logger.info(f"Exported {row_count} rows of {len(node_ids)} nodes of device {device_id} as {file_format}")
@@ -0,0 +1,164 @@
+import collections
+import contextlib
+import threading
+import time
+
+# Histogram bucket upper bounds, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Recent durations kept per device and stage for the percentiles shown on the form
+WINDOW = 256
+# Stages in the order they happen during a poll
+STAGES = ('http', 'parse', 'monitor', 'node_write', 'alarm', 'history', 'total')
+
+# In-memory metrics, per process, keyed by (database name, device id, stage or error kind)
+_lock = threading.Lock()
+_histograms = {}
+_errors = collections.Counter()
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'sum', 'count', 'window')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.window = collections.deque(maxlen=WINDOW)
+
+    def observe(self, duration_ms):
+        index = 0
+        while index < len(BUCKETS_MS) and duration_ms > BUCKETS_MS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.sum += duration_ms
+        self.count += 1
+        self.window.append(duration_ms)
+
+
+class StageMetrics:
+    """Per-device stage timings and error counters of one database."""
+
+    enabled = True
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+
+    @contextlib.contextmanager
+    def stage(self, device_id, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(device_id, stage, (time.perf_counter() - start) * 1000)
+
+    def observe(self, device_id, stage, duration_ms):
+        key = (self.db_name, device_id, stage)
+        with _lock:
+            histogram = _histograms.get(key)
+            if histogram is None:
+                histogram = _histograms[key] = _Histogram()
+            histogram.observe(duration_ms)
+
+    def error(self, device_id, kind):
+        with _lock:
+            _errors[(self.db_name, device_id, kind)] += 1
+
+
+class _NullMetrics:
+    """Stand-in used while metrics are disabled: every call is a no-op."""
+
+    enabled = False
+    _null_stage = contextlib.nullcontext()
+
+    def stage(self, device_id, stage):
+        return self._null_stage
+
+    def observe(self, device_id, stage, duration_ms):
+        pass
+
+    def error(self, device_id, kind):
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+
+def get_metrics(env):
+    """Return the metrics recorder of the database.
+
+    Unless the ``opcua_connector.metrics`` system parameter is set a shared
+    no-op recorder is returned, so disabled instrumentation only costs the
+    (cached) parameter lookup.
+    """
+    if not env['ir.config_parameter'].sudo().get_param('opcua_connector.metrics'):
+        return NULL_METRICS
+    return StageMetrics(env.cr.dbname)
+
+
+def _percentile(ordered, pct):
+    return ordered[max(0, -(-len(ordered) * pct // 100) - 1)]
+
+
+def summary(db_name, device_id):
+    """Return ``({stage: {count, p50, p95, max}}, {error kind: count})`` of a device.
+
+    Percentiles and max are in milliseconds, over the last ``WINDOW`` polls.
+    """
+    stages = {}
+    with _lock:
+        for stage in STAGES:
+            histogram = _histograms.get((db_name, device_id, stage))
+            if not histogram or not histogram.window:
+                continue
+            ordered = sorted(histogram.window)
+            stages[stage] = {
+                'count': histogram.count,
+                'p50': _percentile(ordered, 50),
+                'p95': _percentile(ordered, 95),
+                'max': ordered[-1],
+            }
+        errors = {kind: count for (db, device, kind), count in _errors.items()
+                  if db == db_name and device == device_id}
+    return stages, errors
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def render_prometheus(db_name, device_names, gauges=()):
+    """Render the metrics of a database in the Prometheus text exposition format.
+
+    :param device_names: dict of device id to name, used as label
+    :param gauges: iterable of ``(name, help, {device_id: value})`` extra gauges
+    """
+    lines = [
+        '# HELP opcua_stage_duration_seconds Duration of the stages of a poll.',
+        '# TYPE opcua_stage_duration_seconds histogram',
+    ]
+    with _lock:
+        histograms = sorted((key, (list(h.buckets), h.sum, h.count))
+                            for key, h in _histograms.items() if key[0] == db_name)
+        errors = sorted((key, count) for key, count in _errors.items() if key[0] == db_name)
+    for (_db, device_id, stage), (buckets, total, count) in histograms:
+        labels = {'device': device_id, 'name': device_names.get(device_id, ''), 'stage': stage}
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS_MS + ('+Inf',), buckets):
+            cumulative += bucket_count
+            le = bound if bound == '+Inf' else repr(bound / 1000)
+            lines.append(f'opcua_stage_duration_seconds_bucket{_labels(**labels, le=le)} {cumulative}')
+        lines.append(f'opcua_stage_duration_seconds_sum{_labels(**labels)} {total / 1000}')
+        lines.append(f'opcua_stage_duration_seconds_count{_labels(**labels)} {count}')
+    lines += [
+        '# HELP opcua_errors_total Poll errors by kind.',
+        '# TYPE opcua_errors_total counter',
+    ]
+    for (_db, device_id, kind), count in errors:
+        lines.append(f'opcua_errors_total{_labels(device=device_id, name=device_names.get(device_id, ""), kind=kind)} {count}')
+    for name, help_text, values in gauges:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge']
+        for device_id, value in sorted(values.items()):
+            lines.append(f'{name}{_labels(device=device_id, name=device_names.get(device_id, ""))} {value}')
+    return '\n'.join(lines) + '\n'
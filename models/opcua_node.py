@@ -1,7 +1,15 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from collections import defaultdict
+from numbers import Number
 import logging
 
+from . import opcua_storage_filter
+from .opcua_alarm_event import ALARM_STATES
+
+# Alarm states by increasing severity
+ALARM_SEVERITY = {state: severity for severity, (state, _label) in enumerate(ALARM_STATES)}
+
 _logger = logging.getLogger(__name__)
 
 class OpcuaNode(models.Model):
@@ -34,36 +42,157 @@ class OpcuaNode(models.Model):
     max_value = fields.Float(string='Maximum Value')
     warning_threshold = fields.Float(string='Warning Threshold')
     critical_threshold = fields.Float(string='Critical Threshold')
-    state = fields.Selection([
-        ('normal', 'Normal'),
-        ('warning', 'Warning'),
-        ('critical', 'Critical')
-    ], string='State', default='normal', compute='_compute_state', store=True)
+    state = fields.Selection(ALARM_STATES, string='State', default='normal', readonly=True,
+                             help='Alarm state, updated by the alarm evaluation of each poll')
+    alarm_deadband = fields.Float(string='Alarm Hysteresis', digits=(16, 4),
+                                  help='How far the value must come back past a threshold (or inside the '
+                                       'Minimum/Maximum range) before the alarm clears')
+    alarm_on_delay = fields.Integer(string='Alarm On Delay (s)', default=0,
+                                    help='Time a more severe condition must last before the alarm is raised')
+    alarm_off_delay = fields.Integer(string='Alarm Off Delay (s)', default=0,
+                                     help='Time a less severe condition must last before the alarm is lowered')
+    alarm_pending_state = fields.Selection(ALARM_STATES, string='Pending Alarm State', readonly=True,
+                                           help='State waiting for its on/off delay to elapse')
+    alarm_pending_since = fields.Datetime(string='Pending Since', readonly=True)
+    alarm_event_ids = fields.One2many('opcua.alarm.event', 'opcua_node_id', string='Alarm Events')
+
+    history_mode = fields.Selection([
+        ('all', 'Every Sample'),
+        ('absolute', 'Absolute Deadband'),
+        ('percent', 'Percent Deadband'),
+        ('swinging_door', 'Swinging Door')
+    ], string='History Storage', default='all', required=True,
+        help='Which samples are written to the historical data. Deadbands store a sample only when it moved '
+             'further than the deadband from the last stored one; swinging door stores the points needed '
+             'to rebuild the signal within the deadband by linear interpolation.')
+    history_deadband = fields.Float(string='History Deadband', digits=(16, 4),
+                                    help='Absolute deviation, or percent of the Minimum/Maximum range '
+                                         '(of the last stored value when no range is set)')
+    history_max_silence = fields.Integer(string='Max Silence (s)', default=0,
+                                         help='Force a stored sample after this many seconds without one, 0 to disable')
+    history_stored_count = fields.Integer(string='Stored Samples', compute='_compute_history_counters',
+                                          help='Samples written to history by this server process since it started')
+    history_suppressed_count = fields.Integer(string='Suppressed Samples', compute='_compute_history_counters',
+                                              help='Samples filtered out by the history storage settings')
 
     _sql_constraints = [
         ('node_id_device_uniq', 'unique(node_id, device_id)',
          'Node ID must be unique per device!')
     ] 
 
-    @api.depends('value', 'warning_threshold', 'critical_threshold')
-    def _compute_state(self):
+    def _classify_alarm(self, value):
+        """Return the alarm state a value calls for, given the current state.
+
+        Range checks apply when Maximum > Minimum and thresholds when they are
+        set. A state already reached only clears once the value is back past
+        its limit by more than the hysteresis.
+        """
+        self.ensure_one()
+        severity = ALARM_SEVERITY[self.state or 'normal']
+        deadband = abs(self.alarm_deadband)
+        if self.max_value > self.min_value:
+            margin = deadband if severity >= ALARM_SEVERITY['out_of_range'] else 0.0
+            if value < self.min_value + margin or value > self.max_value - margin:
+                return 'out_of_range'
+        for state, threshold in (('critical', self.critical_threshold), ('warning', self.warning_threshold)):
+            margin = deadband if severity >= ALARM_SEVERITY[state] else 0.0
+            if threshold and value >= threshold - margin:
+                return state
+        return 'normal'
+
+    def _evaluate_alarms(self, latest):
+        """Evaluate the alarms of these nodes in one pass.
+
+        State, pending state and alarm events are only written when something
+        changes, and nodes receiving the same values are written together.
+
+        :param latest: dict mapping node ids to the ``(timestamp, value)`` of
+            their latest sample
+        :return: the alarm events created
+        """
+        vals_by_change = defaultdict(list)
+        events = []
         for node in self:
-            if node.critical_threshold and node.value >= node.critical_threshold:
-                node.state = 'critical'
-            elif node.warning_threshold and node.value >= node.warning_threshold:
-                node.state = 'warning'
+            timestamp, value = latest.get(node.id, (None, None))
+            if timestamp is None or not isinstance(value, Number):
+                continue
+            state = node._classify_alarm(value)
+            if state == node.state:
+                if node.alarm_pending_state:
+                    vals_by_change[(('alarm_pending_state', False), ('alarm_pending_since', False))].append(node.id)
+                continue
+            raising = ALARM_SEVERITY[state] > ALARM_SEVERITY[node.state or 'normal']
+            delay = node.alarm_on_delay if raising else node.alarm_off_delay
+            if node.alarm_pending_state != state:
+                pending_since = timestamp
+                if delay > 0:
+                    vals_by_change[(('alarm_pending_state', state), ('alarm_pending_since', timestamp))].append(node.id)
+                    continue
             else:
-                node.state = 'normal'
+                pending_since = node.alarm_pending_since
+                if (timestamp - pending_since).total_seconds() < delay:
+                    continue
+            vals_by_change[(('state', state), ('alarm_pending_state', False),
+                            ('alarm_pending_since', False))].append(node.id)
+            events.append({
+                'timestamp': timestamp,
+                'device_id': node.device_id.id,
+                'opcua_node_id': node.id,
+                'previous_state': node.state or 'normal',
+                'state': state,
+                'value': value,
+                'message': f"{node.name}: {dict(ALARM_STATES)[node.state or 'normal']} -> "
+                           f"{dict(ALARM_STATES)[state]} at {value}{' ' + node.unit if node.unit else ''}",
+            })
+            _logger.debug(f"Alarm on node {node.name} ({node.id}): {node.state} -> {state} "
+                          f"(value {value}, pending since {pending_since})")
+        for change, ids in vals_by_change.items():
+            self.browse(ids).write(dict(change))
+        # Events are system records, whoever triggered the poll
+        return self.env['opcua.alarm.event'].sudo().create(events)
+
+    def _compute_history_counters(self):
+        for node in self:
+            stored, suppressed = opcua_storage_filter.get_counters(self.env.cr.dbname, node.id)
+            node.history_stored_count = stored
+            node.history_suppressed_count = suppressed
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'history_mode', 'history_deadband', 'history_max_silence', 'min_value', 'max_value'} & set(vals):
+            opcua_storage_filter.reset(self.env.cr.dbname, self.ids)
+        return res
+
+    def _filter_history(self, samples):
+        """Apply the history storage settings to samples of this node.
+
+        :param samples: list of ``(timestamp, value)`` sorted by timestamp
+        :return: list of ``(timestamp, value)`` to write to history
+        """
+        self.ensure_one()
+        config = {
+            'mode': self.history_mode,
+            'deadband': self.history_deadband,
+            'span': self.max_value - self.min_value if self.max_value > self.min_value else 0.0,
+            'max_silence': self.history_max_silence,
+        }
+        return opcua_storage_filter.filter_samples(self.env.cr.dbname, self.id, config, samples)
 
     @api.constrains('node_id', 'device_id')
     def _check_unique_node_id(self):
-        for record in self:
-            if self.search_count([
-                ('node_id', '=', record.node_id),
-                ('device_id', '=', record.device_id.id),
-                ('id', '!=', record.id)
-            ]) > 0:
-                raise ValidationError('Node ID must be unique per device')
+        # One query for the whole batch, so bulk creates do not search per record
+        self.flush_model(['node_id', 'device_id'])
+        self.env.cr.execute("""
+            SELECT node.node_id
+              FROM opcua_node node
+              JOIN opcua_node other
+                ON other.device_id = node.device_id AND other.node_id = node.node_id AND other.id != node.id
+             WHERE node.id IN %s
+             LIMIT 1
+        """, (tuple(self.ids),))
+        duplicate = self.env.cr.fetchone()
+        if duplicate:
+            raise ValidationError(f'Node ID must be unique per device ({duplicate[0]})')
 
     @api.constrains('min_value', 'max_value')
     def _check_value_range(self):
@@ -0,0 +1,186 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import odoo
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+# Smallest interval the scheduler accepts, in milliseconds
+MIN_INTERVAL_MS = 10
+
+
+class PollingScheduler:
+    """Single polling scheduler per Odoo process and database.
+
+    Due devices are kept in a heap ordered by their next deadline. A single
+    timer thread pops due entries and dispatches them to a bounded worker
+    pool. Deadlines advance at a fixed rate (``due + interval``) so the fetch
+    time never accumulates as drift; when a poll overruns its period the
+    skipped ticks are counted as missed deadlines instead of being queued.
+    """
+
+    def __init__(self, db_name, max_workers=4):
+        self.db_name = db_name
+        self.max_workers = max_workers
+        self._heap = []
+        self._entries = {}
+        self._in_flight = set()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix=f'opcua-poll-{db_name}')
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def schedule(self, device_id, interval_ms, uid=SUPERUSER_ID, context=None):
+        """Add or reschedule a device; its first poll is due immediately."""
+        interval = max(MIN_INTERVAL_MS, int(interval_ms or 0)) / 1000.0
+        with self._cond:
+            entry = {
+                'device_id': device_id,
+                'interval': interval,
+                'uid': uid,
+                'context': dict(context or {}),
+                'due': time.monotonic(),
+                'generation': next(self._seq),
+                'missed': 0,
+                'lag': 0.0,
+                'last_duration': 0.0,
+            }
+            self._entries[device_id] = entry
+            heapq.heappush(self._heap, (entry['due'], entry['generation'], device_id))
+            self._ensure_thread()
+            self._cond.notify()
+        _logger.info(f"Scheduled polling for device {device_id} every {interval * 1000:.0f} ms")
+
+    def unschedule(self, device_id):
+        with self._cond:
+            # Stale heap entries are discarded lazily when popped
+            self._entries.pop(device_id, None)
+            self._cond.notify()
+
+    def is_scheduled(self, device_id):
+        return device_id in self._entries
+
+    def stats(self, device_id):
+        """Return ``{'missed': int, 'lag_ms': float, 'duration_ms': float}`` or None."""
+        entry = self._entries.get(device_id)
+        if not entry:
+            return None
+        return {
+            'missed': entry['missed'],
+            'lag_ms': entry['lag'] * 1000,
+            'duration_ms': entry['last_duration'] * 1000,
+        }
+
+    def resume(self):
+        """Restart acquisition of every device flagged ``is_polling`` in the database."""
+        with odoo.registry(self.db_name).cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            devices = env['opcua.device'].search([('is_polling', '=', True)])
+            for device in devices:
+                if not self.is_scheduled(device.id):
+                    device._start_acquisition()
+            cr.commit()
+        if devices:
+            _logger.info(f"Resumed polling for {len(devices)} OPC UA device(s) on {self.db_name}")
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _ensure_thread(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name=f'opcua-scheduler-{self.db_name}', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    due, generation, device_id = self._heap[0]
+                    entry = self._entries.get(device_id)
+                    if not entry or entry['generation'] != generation:
+                        heapq.heappop(self._heap)
+                        continue
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        self._cond.wait(delay)
+                        continue
+                    heapq.heappop(self._heap)
+                    break
+
+                now = time.monotonic()
+                entry['lag'] = now - due
+                # Fixed-rate: next deadline derives from the previous one,
+                # skipping (and counting) ticks that already passed.
+                next_due = due + entry['interval']
+                if next_due <= now:
+                    skipped = int((now - next_due) // entry['interval']) + 1
+                    entry['missed'] += skipped
+                    next_due += skipped * entry['interval']
+                entry['due'] = next_due
+                entry['generation'] = next(self._seq)
+                heapq.heappush(self._heap, (next_due, entry['generation'], device_id))
+
+                if device_id in self._in_flight:
+                    # Previous poll still running: this tick is lost
+                    entry['missed'] += 1
+                    _logger.warning(f"Polling device {device_id} missed its deadline "
+                                    f"(lag {entry['lag'] * 1000:.0f} ms, {entry['missed']} missed so far)")
+                    continue
+                self._in_flight.add(device_id)
+            self._executor.submit(self._poll, device_id, entry['uid'], entry['context'])
+
+    def _poll(self, device_id, uid, context):
+        start = time.monotonic()
+        try:
+            with odoo.registry(self.db_name).cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                device = env['opcua.device'].browse(device_id)
+                if not device.exists() or not device.is_polling:
+                    _logger.info(f"Polling stopped for device {device_id}")
+                    self.unschedule(device_id)
+                    return
+                device.fetch_data()
+                cr.commit()
+        except Exception as e:
+            _logger.error(f"Polling for device {device_id} crashed: {e}")
+            self.unschedule(device_id)
+            try:
+                with odoo.registry(self.db_name).cursor() as cr:
+                    env = api.Environment(cr, uid, context)
+                    env['opcua.device'].browse(device_id).write({'is_polling': False, 'connection_status': 'error'})
+                    cr.commit()
+            except Exception as e2:
+                _logger.error(f"Could not flag device {device_id} as stopped: {e2}")
+        finally:
+            with self._cond:
+                self._in_flight.discard(device_id)
+                entry = self._entries.get(device_id)
+                if entry:
+                    entry['last_duration'] = time.monotonic() - start
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(db_name):
+    """Return the process-wide scheduler for ``db_name``, creating it on first use."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(db_name)
+        if scheduler is None:
+            max_workers = int(odoo.tools.config.get('opcua_poll_workers', 4) or 4)
+            scheduler = _schedulers[db_name] = PollingScheduler(db_name, max_workers=max_workers)
+        return scheduler
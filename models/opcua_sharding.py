@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import os
+import socket
+import threading
+import uuid
+
+import odoo
+from odoo import api, SUPERUSER_ID
+
+from .opcua_scheduler import get_scheduler
+
+_logger = logging.getLogger(__name__)
+
+# Seconds between two heartbeats; leases and workers expire after LEASE_TTL_FACTOR heartbeats
+DEFAULT_HEARTBEAT = 10
+LEASE_TTL_FACTOR = 3
+# Workers silent for this many leases are deleted
+WORKER_PURGE_FACTOR = 10
+
+
+def rendezvous_order(key, candidates):
+    """Order ``candidates`` by their rendezvous (highest random weight) score for ``key``.
+
+    Every caller computes the same order from the same candidates, and
+    removing a candidate only moves the keys it was first for.
+    """
+    def score(candidate):
+        return hashlib.sha1(f'{candidate}:{key}'.encode('utf-8')).digest()
+    return sorted(candidates, key=score, reverse=True)
+
+
+def sharding_enabled(env):
+    """Whether polled devices are spread over the processes by leases.
+
+    Set by the ``opcua_connector.sharding`` system parameter (``0`` turns it
+    off); unset, it is on in multi-process mode (``--workers``), where every
+    worker would otherwise resume and poll every device.
+    """
+    value = env['ir.config_parameter'].sudo().get_param('opcua_connector.sharding')
+    if not value:
+        return bool(odoo.tools.config.get('workers'))
+    return value.strip().lower() not in ('0', 'false', 'no')
+
+
+class LeaseCoordinator:
+    """Spreads the polled devices of a database over the live Odoo processes.
+
+    Every process heartbeats in ``opcua_worker`` and, each heartbeat, assigns
+    every device flagged ``is_polling`` to one of the live workers by
+    rendezvous hashing. It claims (or renews) the leases of its own devices in
+    ``opcua_device_lease``; a lease held by another worker is only taken over
+    once it expired, i.e. its worker stopped heartbeating. Devices whose lease
+    is held are acquired locally through the polling scheduler, the others are
+    released, so a new worker gets its share at the next heartbeat and the
+    devices of a dead worker move after ``LEASE_TTL_FACTOR`` heartbeats.
+    """
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.worker_name = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.owned = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name=f'opcua-lease-{self.db_name}', daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """Rebalance now instead of at the next heartbeat."""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            heartbeat = DEFAULT_HEARTBEAT
+            try:
+                heartbeat = self.rebalance()
+            except Exception as e:
+                # Typically a concurrent update of the same lease, retried next heartbeat
+                _logger.warning(f"Device lease rebalance of {self.db_name} failed: {e}")
+            self._wakeup.wait(heartbeat)
+            self._wakeup.clear()
+
+    def rebalance(self):
+        """Heartbeat, claim and release leases, then start or stop local acquisition.
+
+        :return: heartbeat interval in seconds
+        """
+        with self._lock:
+            registry = odoo.registry(self.db_name)
+            with registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                heartbeat = int(env['ir.config_parameter'].get_param('opcua_connector.lease_heartbeat',
+                                                                     DEFAULT_HEARTBEAT) or DEFAULT_HEARTBEAT)
+                ttl = heartbeat * LEASE_TTL_FACTOR
+                workers = env['opcua.worker']._heartbeat(self.worker_name, ttl, purge_after=heartbeat * WORKER_PURGE_FACTOR)
+                device_ids = env['opcua.device'].search([('is_polling', '=', True)]).ids
+                wanted = [device_id for device_id in device_ids
+                          if rendezvous_order(device_id, workers)[0] == self.worker_name]
+                owned = env['opcua.device.lease']._claim(self.worker_name, wanted, ttl)
+                cr.commit()
+
+            started = owned - self.owned
+            stopped = self.owned - owned
+            scheduler = get_scheduler(self.db_name)
+            for device_id in stopped:
+                scheduler.unschedule(device_id)
+            if stopped:
+                _logger.info(f"Worker {self.worker_name} released {len(stopped)} OPC UA device(s)")
+            if started:
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, SUPERUSER_ID, {})
+                    for device in env['opcua.device'].browse(sorted(started)).exists():
+                        device._start_acquisition()
+                    cr.commit()
+                _logger.info(f"Worker {self.worker_name} took over {len(started)} OPC UA device(s)")
+            self.owned = owned
+            return heartbeat
+
+
+_coordinators = {}
+_coordinators_lock = threading.Lock()
+
+
+def get_coordinator(db_name):
+    """Return the process-wide lease coordinator for ``db_name``, creating it on first use."""
+    with _coordinators_lock:
+        coordinator = _coordinators.get(db_name)
+        if coordinator is None:
+            coordinator = _coordinators[db_name] = LeaseCoordinator(db_name)
+        return coordinator
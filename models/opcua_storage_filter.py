@@ -0,0 +1,104 @@
+import threading
+from numbers import Number
+
+# In-memory filter state and counters, keyed by (database name, opcua.node id).
+# State is per process: after a restart the first sample of every node is stored.
+_lock = threading.Lock()
+_states = {}
+_counters = {}
+
+
+def reset(db_name, node_ids):
+    """Forget the filter state of nodes, e.g. after their filter settings changed."""
+    with _lock:
+        for node_id in node_ids:
+            _states.pop((db_name, node_id), None)
+
+
+def get_counters(db_name, node_id):
+    """Return ``(stored, suppressed)`` sample counts of a node since process start."""
+    stored, suppressed = _counters.get((db_name, node_id), (0, 0))
+    return stored, suppressed
+
+
+def filter_samples(db_name, node_id, config, samples):
+    """Select the samples of one node that must be written to history.
+
+    :param config: dict with ``mode`` (``all``, ``absolute``, ``percent`` or
+        ``swinging_door``), ``deadband``, ``span`` (value range used by the
+        percent deadband) and ``max_silence`` (seconds, 0 to disable)
+    :param samples: list of ``(timestamp, value)`` sorted by timestamp
+    :return: list of ``(timestamp, value)`` to store; with swinging door this
+        may include a sample held back from a previous batch
+    """
+    key = (db_name, node_id)
+    to_store = []
+    with _lock:
+        state = _states.setdefault(key, {'last': None, 'held': None, 'upper': None, 'lower': None})
+        stored, suppressed = _counters.get(key, (0, 0))
+        for timestamp, value in samples:
+            before = len(to_store)
+            _accept(state, config, timestamp, value, to_store)
+            added = len(to_store) - before
+            # Released samples were already counted as suppressed on arrival
+            stored += added
+            suppressed += 1 - added
+        _counters[key] = (stored, suppressed)
+    return to_store
+
+
+def _archive(state, timestamp, value, to_store):
+    state['last'] = (timestamp, value)
+    state['held'] = None
+    state['upper'] = state['lower'] = None
+    to_store.append((timestamp, value))
+
+
+def _accept(state, config, timestamp, value, to_store):
+    """Process one sample, appending to ``to_store`` what must be archived.
+
+    :return: number of previously held samples released to ``to_store``
+    """
+    last = state['last']
+    if last is None or not isinstance(value, Number) or not isinstance(last[1], Number):
+        _archive(state, timestamp, value, to_store)
+        return 0
+    last_timestamp, last_value = last
+    if timestamp <= last_timestamp:
+        return 0
+
+    mode = config.get('mode') or 'all'
+    max_silence = config.get('max_silence') or 0
+    if mode == 'all' or (max_silence and (timestamp - last_timestamp).total_seconds() >= max_silence):
+        _archive(state, timestamp, value, to_store)
+        return 0
+
+    deadband = abs(config.get('deadband') or 0.0)
+    if mode == 'absolute':
+        if abs(value - last_value) > deadband:
+            _archive(state, timestamp, value, to_store)
+        return 0
+    if mode == 'percent':
+        span = config.get('span') or abs(last_value)
+        if abs(value - last_value) > deadband / 100.0 * span:
+            _archive(state, timestamp, value, to_store)
+        return 0
+
+    # Swinging door: keep the door opened by the deviation around the last
+    # archived point; once it closes, archive the last sample inside it.
+    released = 0
+    anchor_timestamp, anchor_value = state['last']
+    elapsed = (timestamp - anchor_timestamp).total_seconds()
+    upper = (value + deadband - anchor_value) / elapsed
+    lower = (value - deadband - anchor_value) / elapsed
+    state['upper'] = upper if state['upper'] is None else min(state['upper'], upper)
+    state['lower'] = lower if state['lower'] is None else max(state['lower'], lower)
+    if state['lower'] > state['upper'] and state['held']:
+        held_timestamp, held_value = state['held']
+        _archive(state, held_timestamp, held_value, to_store)
+        released = 1
+        elapsed = (timestamp - held_timestamp).total_seconds()
+        state['upper'] = (value + deadband - held_value) / elapsed
+        state['lower'] = (value - deadband - held_value) / elapsed
+    state['held'] = (timestamp, value)
+    return released
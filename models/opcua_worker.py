@@ -0,0 +1,57 @@
+from odoo import models, fields, api
+from datetime import timedelta
+
+from .opcua_sharding import DEFAULT_HEARTBEAT, LEASE_TTL_FACTOR
+
+
+class OpcuaWorker(models.Model):
+    _name = 'opcua.worker'
+    _description = 'OPC UA Polling Worker'
+    _order = 'name'
+
+    name = fields.Char('Worker', required=True, readonly=True, help='host:pid:id of the Odoo process')
+    heartbeat = fields.Datetime('Last Heartbeat', readonly=True)
+    alive = fields.Boolean('Alive', compute='_compute_alive')
+    lease_ids = fields.One2many('opcua.device.lease', 'worker_id', string='Leases', readonly=True)
+    device_count = fields.Integer('Devices', compute='_compute_device_count')
+
+    _sql_constraints = [
+        ('name_uniq', 'unique(name)', 'Worker names must be unique!')
+    ]
+
+    def _compute_alive(self):
+        deadline = fields.Datetime.now() - timedelta(seconds=self._get_ttl())
+        for worker in self:
+            worker.alive = bool(worker.heartbeat and worker.heartbeat > deadline)
+
+    def _compute_device_count(self):
+        counts = dict(self.env['opcua.device.lease']._read_group(
+            [('worker_id', 'in', self.ids)], ['worker_id'], ['__count']))
+        for worker in self:
+            worker.device_count = counts.get(worker, 0)
+
+    @api.model
+    def _get_ttl(self):
+        heartbeat = int(self.env['ir.config_parameter'].sudo().get_param('opcua_connector.lease_heartbeat',
+                                                                         DEFAULT_HEARTBEAT) or DEFAULT_HEARTBEAT)
+        return heartbeat * LEASE_TTL_FACTOR
+
+    @api.model
+    def _heartbeat(self, name, ttl, purge_after):
+        """Record a heartbeat of the worker ``name`` and return the names of the live workers.
+
+        Workers silent for ``purge_after`` seconds are deleted, with their leases.
+        """
+        cr = self.env.cr
+        cr.execute("""
+            INSERT INTO opcua_worker (name, heartbeat, create_uid, create_date, write_uid, write_date)
+            VALUES (%(name)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC')
+            ON CONFLICT (name) DO UPDATE SET heartbeat = EXCLUDED.heartbeat, write_date = EXCLUDED.write_date
+        """, {'name': name, 'uid': self.env.uid})
+        cr.execute("DELETE FROM opcua_worker WHERE heartbeat < now() at time zone 'UTC' - interval '1 second' * %s",
+                   (purge_after,))
+        cr.execute("SELECT name FROM opcua_worker WHERE heartbeat > now() at time zone 'UTC' - interval '1 second' * %s",
+                   (ttl,))
+        workers = [row[0] for row in cr.fetchall()]
+        self.invalidate_model()
+        return workers
@@ -0,0 +1,247 @@
+import atexit
+import collections
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import time
+
+import psycopg2
+
+import odoo
+from odoo import fields
+
+_logger = logging.getLogger(__name__)
+
+COLUMNS = ('device_id', 'node_id', 'opcua_node_id', 'timestamp', 'value', 'error')
+POLICIES = ('block', 'drop_oldest', 'spill')
+# Errors a retry cannot fix: the rows causing them are isolated and dropped
+PERMANENT_ERRORS = (psycopg2.IntegrityError, psycopg2.DataError, ValueError, TypeError)
+
+
+class SampleBuffer:
+    """Bounded in-process buffer of history rows, flushed in bulk.
+
+    Pollers append rows instead of inserting them in their own transaction.
+    A flusher thread writes the buffer every ``flush_ms`` milliseconds, or
+    as soon as ``flush_rows`` rows are queued, with ``COPY`` into a
+    temporary table followed by one ``INSERT ... ON CONFLICT DO NOTHING``
+    so rows already stored for the same node and second are skipped
+    (``timestamp_node_uniq``).
+
+    When ``max_rows`` rows are waiting, ``policy`` decides: ``block`` makes
+    producers wait for the next flush, ``drop_oldest`` discards the oldest
+    rows and ``spill`` appends new rows to ``spill_path``, which is read back
+    once the buffer has drained.
+
+    Rows of devices or nodes deleted in the meantime are dropped, as are
+    rows the database rejects for good (found by splitting the failing
+    batch); both count in ``dropped``. Other failures, such as a lost
+    connection, put the rows back for the next flush.
+    """
+
+    def __init__(self, db_name, flush_ms=500, flush_rows=5000, max_rows=100000, policy='block', spill_path=None):
+        self.db_name = db_name
+        self.flush_interval = max(flush_ms, 10) / 1000.0
+        self.flush_rows = flush_rows
+        self.max_rows = max(max_rows, flush_rows)
+        self.policy = policy if policy in POLICIES else 'block'
+        self.spill_path = spill_path or os.path.join(odoo.tools.config['data_dir'], f'opcua_spill_{db_name}.jsonl')
+        self.dropped = 0
+        self.spilled = 0
+        self._rows = collections.deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name=f'opcua-write-behind-{db_name}', daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, vals_list):
+        """Queue history rows (dicts with the keys of ``COLUMNS``)."""
+        rows = [tuple(vals.get(column) for column in COLUMNS) for vals in vals_list]
+        with self._cond:
+            for row in rows:
+                if len(self._rows) >= self.max_rows:
+                    if self.policy == 'drop_oldest':
+                        self._rows.popleft()
+                        self.dropped += 1
+                    elif self.policy == 'spill':
+                        self._spill([row])
+                        continue
+                    else:
+                        self._cond.notify_all()
+                        while len(self._rows) >= self.max_rows and not self._stopped:
+                            self._cond.wait(self.flush_interval)
+                self._rows.append(row)
+            if len(self._rows) >= self.flush_rows:
+                self._cond.notify_all()
+
+    def flush(self):
+        """Write every queued row now; returns the number of rows sent."""
+        with self._flush_lock:
+            with self._cond:
+                rows = list(self._rows)
+                self._rows.clear()
+                self._cond.notify_all()
+            rows += self._unspill(self.max_rows - len(rows))
+            if not rows:
+                return 0
+            try:
+                dropped = self._write(rows)
+            except Exception as e:
+                _logger.error(f"Write-behind flush of {len(rows)} rows failed: {e}")
+                with self._cond:
+                    # Put the rows back in front, the next flush retries them
+                    self._rows.extendleft(reversed(rows[:self.max_rows]))
+                    overflow = rows[self.max_rows:]
+                    if overflow and self.policy == 'spill':
+                        self._spill(overflow)
+                    else:
+                        self.dropped += len(overflow)
+                return 0
+            if dropped:
+                with self._cond:
+                    self.dropped += dropped
+            return len(rows) - dropped
+
+    def stop(self):
+        """Flush what is left and stop the flusher thread."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped:
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopped or len(self._rows) >= self.flush_rows,
+                                    timeout=self.flush_interval)
+            if not self._stopped:
+                self.flush()
+
+    def _write(self, rows):
+        """Store rows, bisecting batches that fail for good; return the number of rows dropped."""
+        try:
+            return self._copy(rows)
+        except PERMANENT_ERRORS as e:
+            if len(rows) == 1:
+                _logger.warning(f"Write-behind dropped a history row that cannot be stored {rows[0]}: {e}")
+                return 1
+            middle = len(rows) // 2
+            return self._write(rows[:middle]) + self._write(rows[middle:])
+
+    def _copy(self, rows):
+        """Insert rows in one transaction; return the number of orphan rows skipped."""
+        start = time.time()
+        data = io.StringIO()
+        writer = csv.writer(data)
+        for device_id, node_id, opcua_node_id, timestamp, value, error in rows:
+            writer.writerow([
+                device_id,
+                node_id,
+                opcua_node_id if opcua_node_id else r'\N',
+                fields.Datetime.to_string(timestamp),
+                r'\N' if value is None else float(value),
+                error or r'\N',
+            ])
+        data.seek(0)
+        with odoo.registry(self.db_name).cursor() as cr:
+            cr.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS opcua_data_buffer (
+                    device_id integer, node_id varchar, opcua_node_id integer,
+                    "timestamp" timestamp, value numeric, error text
+                ) ON COMMIT DELETE ROWS
+            """)
+            cr._obj.copy_expert(r"COPY opcua_data_buffer FROM STDIN WITH (FORMAT csv, NULL '\N')", data)
+            # Rows of devices or nodes deleted since they were queued
+            cr.execute("""
+                DELETE FROM opcua_data_buffer b
+                 WHERE NOT EXISTS (SELECT 1 FROM opcua_device WHERE id = b.device_id)
+                    OR (b.opcua_node_id IS NOT NULL
+                        AND NOT EXISTS (SELECT 1 FROM opcua_node WHERE id = b.opcua_node_id))
+            """)
+            orphans = cr.rowcount
+            cr.execute("""
+                INSERT INTO opcua_data (device_id, node_id, opcua_node_id, "timestamp", value, error,
+                                        create_uid, create_date, write_uid, write_date)
+                SELECT DISTINCT ON (device_id, node_id, "timestamp")
+                       device_id, node_id, opcua_node_id, "timestamp", value, error,
+                       %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+                  FROM opcua_data_buffer
+                ON CONFLICT ON CONSTRAINT opcua_data_timestamp_node_uniq DO NOTHING
+            """, {'uid': odoo.SUPERUSER_ID})
+            inserted = cr.rowcount
+            # ON COMMIT empties it too, unless the commit is a test-mode savepoint
+            cr.execute("TRUNCATE opcua_data_buffer")
+            cr.commit()
+        _logger.debug(f"Write-behind flushed {inserted}/{len(rows)} rows in {(time.time() - start) * 1000:.1f} ms")
+        if orphans:
+            _logger.warning(f"Write-behind dropped {orphans} rows of deleted devices or nodes")
+        return orphans
+
+    def _spill(self, rows):
+        with open(self.spill_path, 'a') as spill:
+            for row in rows:
+                device_id, node_id, opcua_node_id, timestamp, value, error = row
+                spill.write(json.dumps([device_id, node_id, opcua_node_id,
+                                        fields.Datetime.to_string(timestamp), value, error]) + '\n')
+        self.spilled += len(rows)
+
+    def _unspill(self, limit):
+        """Read back up to ``limit`` spilled rows, keeping the remainder on disk."""
+        if limit <= 0 or not os.path.exists(self.spill_path):
+            return []
+        with self._cond:
+            with open(self.spill_path) as spill:
+                lines = spill.readlines()
+            rows = [json.loads(line) for line in lines[:limit]]
+            if len(lines) > limit:
+                with open(self.spill_path, 'w') as spill:
+                    spill.writelines(lines[limit:])
+            else:
+                os.unlink(self.spill_path)
+        return [(device_id, node_id, opcua_node_id, fields.Datetime.to_datetime(timestamp), value, error)
+                for device_id, node_id, opcua_node_id, timestamp, value, error in rows]
+
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def get_write_buffer(env):
+    """Return the write-behind buffer of the database, or None when disabled.
+
+    Enabled by the ``opcua_connector.write_behind`` system parameter; the
+    ``opcua_connector.write_behind_*`` parameters are read when the buffer is
+    created (first use after a restart).
+    """
+    params = env['ir.config_parameter'].sudo()
+    if not params.get_param('opcua_connector.write_behind'):
+        return None
+    db_name = env.cr.dbname
+    with _buffers_lock:
+        buffer = _buffers.get(db_name)
+        if buffer is None:
+            buffer = _buffers[db_name] = SampleBuffer(
+                db_name,
+                flush_ms=int(params.get_param('opcua_connector.write_behind_flush_ms', 500)),
+                flush_rows=int(params.get_param('opcua_connector.write_behind_flush_rows', 5000)),
+                max_rows=int(params.get_param('opcua_connector.write_behind_max_rows', 100000)),
+                policy=params.get_param('opcua_connector.write_behind_policy', 'block'),
+                spill_path=params.get_param('opcua_connector.write_behind_spill_path'),
+            )
+        return buffer
+
+
+@atexit.register
+def _flush_on_shutdown():
+    for buffer in list(_buffers.values()):
+        try:
+            buffer.stop()
+        except Exception as e:
+            _logger.error(f"Could not flush write-behind buffer of {buffer.db_name} on shutdown: {e}")
@@ -1,17 +1,140 @@
 const express = require('express');
-const { OPCUAClient, AttributeIds, DataType } = require('node-opcua');
+const {
+    OPCUAClient,
+    AttributeIds,
+    DataType,
+    TimestampsToReturn,
+    DataChangeFilter,
+    DataChangeTrigger,
+    DeadbandType,
+    BrowseDirection,
+    NodeClass,
+    NodeClassMask,
+    VariableIds,
+    HistoryReadRequest,
+    ReadRawModifiedDetails,
+    resolveNodeId
+} = require('node-opcua');
+const { performance } = require('perf_hooks');
+const crypto = require('crypto');
+const util = require('util');
+const zlib = require('zlib');
 require('dotenv').config();
 
 const app = express();
 app.use(express.json()); // For parsing application/json
 const port = process.env.API_PORT || 4001;
 
-// Simple connection pool
+// Session pool settings
+const POOL_MAX_CONCURRENCY = parseInt(process.env.POOL_MAX_CONCURRENCY || '4', 10);
+const POOL_IDLE_TIMEOUT_MS = parseInt(process.env.POOL_IDLE_TIMEOUT_MS || '300000', 10);
+const POOL_BACKOFF_INITIAL_MS = parseInt(process.env.POOL_BACKOFF_INITIAL_MS || '1000', 10);
+const POOL_BACKOFF_MAX_MS = parseInt(process.env.POOL_BACKOFF_MAX_MS || '30000', 10);
+const POOL_KEEPALIVE_MS = parseInt(process.env.POOL_KEEPALIVE_MS || '10000', 10);
+
+// Read settings
+const READ_CHUNK_SIZE = parseInt(process.env.READ_CHUNK_SIZE || '0', 10);
+const READ_CHUNK_CONCURRENCY = parseInt(process.env.READ_CHUNK_CONCURRENCY || '4', 10);
+const READ_REGISTER_NODES = !/^(0|false|no)$/i.test(process.env.READ_REGISTER_NODES || '1');
+const READ_PLAN_CACHE_SIZE = parseInt(process.env.READ_PLAN_CACHE_SIZE || '100', 10);
+
+// Metrics: per-endpoint stage histograms and error counters, exposed on GET /metrics
+const METRICS_ENABLED = /^(1|true|yes)$/i.test(process.env.METRICS_ENABLED || '');
+const METRIC_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000];
+const stageHistograms = new Map();
+const errorCounters = new Map();
+
+// Record the duration of a stage started at `start` (a performance.now() value)
+const observeStage = METRICS_ENABLED ? (endpoint, stage, start) => {
+    const durationMs = performance.now() - start;
+    const key = JSON.stringify([endpoint, stage]);
+    let histogram = stageHistograms.get(key);
+    if (!histogram) {
+        histogram = { buckets: new Array(METRIC_BUCKETS_MS.length + 1).fill(0), sum: 0, count: 0 };
+        stageHistograms.set(key, histogram);
+    }
+    let index = 0;
+    while (index < METRIC_BUCKETS_MS.length && durationMs > METRIC_BUCKETS_MS[index]) {
+        index += 1;
+    }
+    histogram.buckets[index] += 1;
+    histogram.sum += durationMs;
+    histogram.count += 1;
+} : () => {};
+
+const countError = METRICS_ENABLED ? (endpoint, kind, count = 1) => {
+    const key = JSON.stringify([endpoint, kind]);
+    errorCounters.set(key, (errorCounters.get(key) || 0) + count);
+} : () => {};
+
+const metricLabels = (labels) => '{' + Object.entries(labels)
+    .map(([name, value]) => `${name}="${String(value).replace(/\\/g, '\\\\').replace(/"/g, '\\"').replace(/\n/g, '\\n')}"`)
+    .join(',') + '}';
+
+const renderMetrics = () => {
+    const lines = [
+        '# HELP opcua_bridge_stage_duration_seconds Duration of bridge stages per OPC UA endpoint.',
+        '# TYPE opcua_bridge_stage_duration_seconds histogram'
+    ];
+    for (const [key, histogram] of stageHistograms) {
+        const [endpoint, stage] = JSON.parse(key);
+        let cumulative = 0;
+        histogram.buckets.forEach((count, index) => {
+            cumulative += count;
+            const le = index < METRIC_BUCKETS_MS.length ? String(METRIC_BUCKETS_MS[index] / 1000) : '+Inf';
+            lines.push(`opcua_bridge_stage_duration_seconds_bucket${metricLabels({ endpoint, stage, le })} ${cumulative}`);
+        });
+        lines.push(`opcua_bridge_stage_duration_seconds_sum${metricLabels({ endpoint, stage })} ${histogram.sum / 1000}`);
+        lines.push(`opcua_bridge_stage_duration_seconds_count${metricLabels({ endpoint, stage })} ${histogram.count}`);
+    }
+    lines.push('# HELP opcua_bridge_errors_total Bridge errors per OPC UA endpoint and kind.');
+    lines.push('# TYPE opcua_bridge_errors_total counter');
+    for (const [key, count] of errorCounters) {
+        const [endpoint, kind] = JSON.parse(key);
+        lines.push(`opcua_bridge_errors_total${metricLabels({ endpoint, kind })} ${count}`);
+    }
+    lines.push('# HELP opcua_bridge_read_requests_total /data reads per OPC UA endpoint, by outcome: hit (last-value cache), coalesced (joined an identical read in progress) or miss (read from the server).');
+    lines.push('# TYPE opcua_bridge_read_requests_total counter');
+    for (const [key, count] of readCounters) {
+        const [endpoint, outcome] = JSON.parse(key);
+        lines.push(`opcua_bridge_read_requests_total${metricLabels({ endpoint, outcome })} ${count}`);
+    }
+    lines.push('# HELP opcua_bridge_cached_values Node values held in the last-value cache.');
+    lines.push('# TYPE opcua_bridge_cached_values gauge');
+    lines.push(`opcua_bridge_cached_values ${[...lastValues.values()].reduce((total, cache) => total + cache.size, 0)}`);
+    lines.push('# HELP opcua_bridge_sessions Open OPC UA sessions in the pool.');
+    lines.push('# TYPE opcua_bridge_sessions gauge');
+    lines.push(`opcua_bridge_sessions ${[...connectionPool.values()].filter(entry => entry.session).length}`);
+    lines.push('# HELP opcua_bridge_subscriptions Active subscriptions.');
+    lines.push('# TYPE opcua_bridge_subscriptions gauge');
+    lines.push(`opcua_bridge_subscriptions ${subscriptions.size}`);
+    return lines.join('\n') + '\n';
+};
+
+// Persistent session pool, one entry per OPC UA server
 const connectionPool = new Map();
 
 // Function to get a unique key for each OPC UA server
 const getServerKey = (endpoint) => endpoint;
 
+// Status codes meaning the session (not just a node) is unusable
+const SESSION_ERRORS = [
+    'BadSessionIdInvalid',
+    'BadSessionClosed',
+    'BadSessionNotActivated',
+    'BadConnectionClosed',
+    'BadSecureChannelClosed',
+    'BadSecureChannelIdInvalid',
+    'BadCommunicationError',
+    'BadNotConnected',
+    'BadTimeout'
+];
+
+const isSessionError = (error) => {
+    const message = (error && error.message) || '';
+    return SESSION_ERRORS.some(code => message.includes(code)) || /premature|disconnected|socket/i.test(message);
+};
+
 // Function to safely disconnect a client
 const safeDisconnect = async (client) => {
     if (client) {
@@ -23,120 +146,1149 @@ const safeDisconnect = async (client) => {
     }
 };
 
-// Simple function to get or create an OPC UA client and session
-const getOpcuaClient = async (endpoint) => {
+const getPoolEntry = (endpoint) => {
     const key = getServerKey(endpoint);
+    let entry = connectionPool.get(key);
+    if (!entry) {
+        entry = {
+            endpoint,
+            client: null,
+            session: null,
+            connecting: null,   // shared in-flight connect promise
+            active: 0,          // requests currently using the session
+            waiters: [],        // requests waiting for a concurrency slot
+            lastUsed: Date.now(),
+            failures: 0,
+            nextRetryAt: 0,
+            lastError: null,
+            readPlans: new Map(),    // node list signature -> read plan, valid for the current session
+            operationLimits: null    // server operation limits, read once per session
+        };
+        connectionPool.set(key, entry);
+    }
+    return entry;
+};
 
-    // Clean up existing connection if it exists
-    if (connectionPool.has(key)) {
-        const existingEntry = connectionPool.get(key);
-        if (existingEntry.client) {
-            await safeDisconnect(existingEntry.client);
+// Drop the session of an entry; the next request reconnects
+const invalidateEntry = async (entry, reason) => {
+    const { client } = entry;
+    if (!client) {
+        return;
+    }
+    console.warn(`[${new Date().toISOString()}] Dropping session for ${entry.endpoint}: ${reason}`);
+    entry.client = null;
+    entry.session = null;
+    // Registered node handles and limits belong to the session
+    entry.readPlans = new Map();
+    entry.operationLimits = null;
+    // Cached values of the server are no longer current
+    const serverKey = getServerKey(entry.endpoint);
+    for (const endpoint of lastValues.keys()) {
+        if (getServerKey(endpoint) === serverKey) {
+            lastValues.delete(endpoint);
         }
-        connectionPool.delete(key);
     }
+    await safeDisconnect(client);
+};
 
+const connectEntry = async (entry) => {
+    const { endpoint } = entry;
     console.log(`[${new Date().toISOString()}] Creating new client instance for ${endpoint}`);
     const client = OPCUAClient.create({
-        endpointMustExist: false
+        endpointMustExist: false,
+        keepSessionAlive: true,
+        keepAliveInterval: POOL_KEEPALIVE_MS,
+        // Initial connect fails fast; our own backoff governs retries
+        connectionStrategy: {
+            maxRetry: 0,
+            initialDelay: POOL_BACKOFF_INITIAL_MS,
+            maxDelay: POOL_BACKOFF_MAX_MS
+        }
     });
 
     try {
         // Connect to the server
         console.log(`[${new Date().toISOString()}] Attempting to connect to ${endpoint}...`);
+        let stageStart = performance.now();
         await client.connect(endpoint);
+        observeStage(endpoint, 'connect', stageStart);
         console.log(`✅ Client connected to ${endpoint}.`);
 
         // Create session
         console.log(`[${new Date().toISOString()}] Creating session for ${endpoint}...`);
+        stageStart = performance.now();
         const session = await client.createSession();
+        observeStage(endpoint, 'session', stageStart);
         console.log(`✅ Session created for ${endpoint}.`);
 
-        // Store in connection pool
-        connectionPool.set(key, { client, session });
-        return { client, session };
+        client.on('connection_lost', () => {
+            if (entry.client === client) {
+                invalidateEntry(entry, 'connection lost');
+            }
+        });
+        session.on('keepalive_failure', () => {
+            if (entry.client === client) {
+                invalidateEntry(entry, 'keepalive failure');
+            }
+        });
+        session.on('session_closed', () => {
+            if (entry.client === client) {
+                invalidateEntry(entry, 'session closed');
+            }
+        });
+
+        entry.client = client;
+        entry.session = session;
+        entry.readPlans = new Map();
+        entry.operationLimits = null;
+        entry.failures = 0;
+        entry.nextRetryAt = 0;
+        entry.lastError = null;
+        return session;
     } catch (error) {
         console.error(`❌ Connection error for ${endpoint}: ${error.message}`);
+        countError(endpoint, 'connect');
         await safeDisconnect(client);
+        entry.failures += 1;
+        const backoff = Math.min(POOL_BACKOFF_MAX_MS, POOL_BACKOFF_INITIAL_MS * 2 ** (entry.failures - 1));
+        entry.nextRetryAt = Date.now() + backoff * (0.5 + Math.random() / 2);
+        entry.lastError = error.message;
         throw error;
     }
 };
 
-// Enhanced data endpoint with better error handling and batch operations
-app.post('/data', async (req, res) => {
+// Get the pooled session of an endpoint, connecting at most once concurrently
+const getSession = async (entry) => {
+    if (entry.session) {
+        return entry.session;
+    }
+    if (!entry.connecting) {
+        if (Date.now() < entry.nextRetryAt) {
+            throw new Error(`Reconnect to ${entry.endpoint} backing off after error: ${entry.lastError}`);
+        }
+        entry.connecting = connectEntry(entry).finally(() => {
+            entry.connecting = null;
+        });
+    }
+    return entry.connecting;
+};
 
-    const start_time = Date.now();
+const acquireSlot = (entry) => {
+    if (entry.active < POOL_MAX_CONCURRENCY) {
+        entry.active += 1;
+        return Promise.resolve();
+    }
+    return new Promise(resolve => entry.waiters.push(resolve));
+};
+
+const releaseSlot = (entry) => {
+    entry.lastUsed = Date.now();
+    const next = entry.waiters.shift();
+    if (next) {
+        next();
+    } else {
+        entry.active -= 1;
+    }
+};
+
+// Run fn(session) on the pooled session of an endpoint
+const withSession = async (endpoint, fn) => {
+    const entry = getPoolEntry(endpoint);
+    const queuedAt = performance.now();
+    await acquireSlot(entry);
+    observeStage(endpoint, 'queue', queuedAt);
+    try {
+        const session = await getSession(entry);
+        try {
+            return await fn(session);
+        } catch (error) {
+            if (isSessionError(error)) {
+                await invalidateEntry(entry, error.message);
+            }
+            throw error;
+        }
+    } finally {
+        releaseSlot(entry);
+    }
+};
 
-    let nodeIds = req.body.node_ids;
-    // Allow single node_id or list of node_ids
+// Check session health without tearing down a live session
+const checkHealth = async (endpoint) => withSession(endpoint, async (session) => {
+    const dataValue = await session.read({
+        nodeId: 'ns=0;i=2259', // Server_ServerStatus_State
+        attributeId: AttributeIds.Value
+    });
+    if (!dataValue.statusCode.isGood()) {
+        throw new Error(`Server status unreadable: ${dataValue.statusCode.toString()}`);
+    }
+    return dataValue.value.value;
+});
+
+// Evict sessions that have been idle for too long
+setInterval(() => {
+    const now = Date.now();
+    for (const [key, entry] of connectionPool.entries()) {
+        const subscribed = [...subscriptions.values()].some(spec => spec.endpoint === entry.endpoint);
+        if (entry.active === 0 && !entry.connecting && !subscribed && now - entry.lastUsed > POOL_IDLE_TIMEOUT_MS) {
+            connectionPool.delete(key);
+            invalidateEntry(entry, 'idle timeout');
+        }
+    }
+}, Math.min(POOL_IDLE_TIMEOUT_MS, 60000)).unref();
+
+// Allow single node_id or list of node_ids
+const normalizeNodeIds = (nodeIds) => {
     if (typeof nodeIds === 'string') {
-        nodeIds = [nodeIds];
-    } else if (!Array.isArray(nodeIds)) {
-        nodeIds = [];
+        return [nodeIds];
     }
-    const endpoint = req.body.endpoint;
+    return Array.isArray(nodeIds) ? nodeIds : [];
+};
 
-    if (!endpoint || !nodeIds || nodeIds.length === 0) {
-        return res.status(400).json({
-            error: "Invalid request",
-            message: "Missing required parameters (endpoint and node_ids in body)",
-            connectionStatus: 'error'
-        });
+// Run fn over items with at most `limit` calls in flight, keeping the order of results
+const mapLimit = async (items, limit, fn) => {
+    const results = new Array(items.length);
+    let next = 0;
+    const worker = async () => {
+        while (next < items.length) {
+            const index = next++;
+            results[index] = await fn(items[index]);
+        }
+    };
+    await Promise.all(Array.from({ length: Math.min(limit, items.length) }, worker));
+    return results;
+};
+
+// Split items into chunks of at most `size` items (0: no limit)
+const chunked = (items, size) => {
+    if (!size || items.length <= size) {
+        return [items];
+    }
+    const chunks = [];
+    for (let i = 0; i < items.length; i += size) {
+        chunks.push(items.slice(i, i + size));
     }
+    return chunks;
+};
 
+// Read the MaxNodesPerRead / MaxNodesPerRegisterNodes operation limits of the server once per session
+const getOperationLimits = (entry, session) => {
+    if (!entry.operationLimits) {
+        entry.operationLimits = session.read([
+            VariableIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerRead,
+            VariableIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerRegisterNodes
+        ].map(id => ({ nodeId: `i=${id}`, attributeId: AttributeIds.Value }))).then(dataValues => {
+            const [maxRead, maxRegister] = dataValues.map(dataValue =>
+                (dataValue.statusCode.isGood() && Number(dataValue.value.value)) || 0);
+            // Smallest of the server limit and READ_CHUNK_SIZE, 0 (no limit) when neither is set
+            const limit = (serverLimit) => {
+                const positives = [serverLimit, READ_CHUNK_SIZE].filter(n => n > 0);
+                return positives.length ? Math.min(...positives) : 0;
+            };
+            return { maxNodesPerRead: limit(maxRead), maxNodesPerRegisterNodes: limit(maxRegister) };
+        }).catch(() => ({ maxNodesPerRead: READ_CHUNK_SIZE, maxNodesPerRegisterNodes: READ_CHUNK_SIZE }));
+    }
+    return entry.operationLimits;
+};
+
+// Parse, register and chunk a node list once per session; later polls reuse the plan
+const buildReadPlan = async (entry, session, nodeIds) => {
+    const positions = [];
+    const handles = [];
+    const invalid = [];
+    nodeIds.forEach((nodeId, position) => {
+        try {
+            handles.push(resolveNodeId(nodeId));
+            positions.push(position);
+        } catch (error) {
+            invalid.push([position, `Invalid NodeId: ${error.message}`]);
+        }
+    });
+    const limits = await getOperationLimits(entry, session);
+    let registered = false;
+    if (READ_REGISTER_NODES && handles.length > 0) {
+        try {
+            const registeredChunks = await mapLimit(chunked(handles, limits.maxNodesPerRegisterNodes),
+                READ_CHUNK_CONCURRENCY, chunk => session.registerNodes(chunk));
+            handles.splice(0, handles.length, ...registeredChunks.flat());
+            registered = true;
+        } catch (error) {
+            // Servers without RegisterNodes support are read with the parsed ids
+            console.warn(`[${new Date().toISOString()}] RegisterNodes failed on ${entry.endpoint}: ${error.message}`);
+        }
+    }
+    const nodesToRead = handles.map(nodeId => ({ nodeId, attributeId: AttributeIds.Value }));
+    const readChunks = chunked(nodesToRead, limits.maxNodesPerRead);
+    console.log(`[${new Date().toISOString()}] Read plan for ${entry.endpoint}: ${nodesToRead.length} nodes in ` +
+        `${readChunks.length} chunks of at most ${Math.max(...readChunks.map(chunk => chunk.length))} nodes`);
+    return {
+        invalid,
+        registered,
+        handles,
+        // Position in the requested node list of every node read
+        positionChunks: chunked(positions, limits.maxNodesPerRead),
+        readChunks
+    };
+};
+
+const getReadPlan = (entry, session, nodeIds) => {
+    const signature = nodeIds.join('\n');
+    let plan = entry.readPlans.get(signature);
+    if (plan) {
+        // Keep the most recently used plans at the end of the map
+        entry.readPlans.delete(signature);
+    } else {
+        plan = buildReadPlan(entry, session, nodeIds);
+        plan.catch(() => entry.readPlans.delete(signature));
+    }
+    entry.readPlans.set(signature, plan);
+    if (entry.readPlans.size > READ_PLAN_CACHE_SIZE) {
+        const [oldestSignature, oldestPlan] = entry.readPlans.entries().next().value;
+        entry.readPlans.delete(oldestSignature);
+        oldestPlan.then(evicted => {
+            if (evicted.registered && entry.session === session) {
+                session.unregisterNodes(evicted.handles).catch(() => {});
+            }
+        }).catch(() => {});
+    }
+    return plan;
+};
+
+// Last-value cache and read coalescing
+const VALUE_CACHE_TTL_MS = parseInt(process.env.VALUE_CACHE_TTL_MS || '60000', 10);
+const READ_COALESCE = !/^(0|false|no)$/i.test(process.env.READ_COALESCE || '1');
+
+// Last value, status and source timestamp read of every node, per endpoint:
+// endpoint -> nodeId -> {value, status, sourceTimestamp, readAt}
+const lastValues = new Map();
+// Reads in progress by endpoint and node list, joined by identical requests
+const inflightReads = new Map();
+// /data requests per endpoint and outcome: hit (cache), coalesced (joined a read in progress), miss (read)
+const readCounters = new Map();
+
+const countRead = (endpoint, outcome) => {
+    const key = JSON.stringify([endpoint, outcome]);
+    readCounters.set(key, (readCounters.get(key) || 0) + 1);
+};
+
+const cacheValues = (endpoint, nodeIds, columns, readAt) => {
+    if (VALUE_CACHE_TTL_MS <= 0) {
+        return;
+    }
+    let cache = lastValues.get(endpoint);
+    if (!cache) {
+        cache = new Map();
+        lastValues.set(endpoint, cache);
+    }
+    nodeIds.forEach((nodeId, position) => cache.set(nodeId, {
+        value: columns.values[position],
+        status: columns.status[position],
+        sourceTimestamp: columns.sourceTimestamps[position],
+        readAt
+    }));
+};
+
+// Columns of a node list from the cache when the endpoint session is up and every node
+// was read at most maxAge ms ago, null otherwise. read_at is when the oldest value was read.
+const readFromCache = (endpoint, nodeIds, maxAge) => {
+    const cache = lastValues.get(endpoint);
+    const poolEntry = connectionPool.get(getServerKey(endpoint));
+    if (!cache || !poolEntry || !poolEntry.session) {
+        return null;
+    }
+    const oldest = Date.now() - Math.min(maxAge, VALUE_CACHE_TTL_MS);
+    const cached = [];
+    let readAt = Date.now();
+    for (const nodeId of nodeIds) {
+        const entry = cache.get(nodeId);
+        if (!entry || entry.readAt < oldest) {
+            return null;
+        }
+        cached.push(entry);
+        readAt = Math.min(readAt, entry.readAt);
+    }
+    return {
+        result: { connectionStatus: 'connected', timestamp: new Date().toISOString(), cached: true, read_at: readAt },
+        columns: {
+            values: cached.map(entry => entry.value),
+            status: cached.map(entry => entry.status),
+            sourceTimestamps: cached.map(entry => entry.sourceTimestamp)
+        }
+    };
+};
+
+setInterval(() => {
+    const oldest = Date.now() - VALUE_CACHE_TTL_MS;
+    for (const [endpoint, cache] of lastValues) {
+        for (const [nodeId, entry] of cache) {
+            if (entry.readAt < oldest) {
+                cache.delete(nodeId);
+            }
+        }
+        if (cache.size === 0) {
+            lastValues.delete(endpoint);
+        }
+    }
+}, Math.max(1000, VALUE_CACHE_TTL_MS)).unref();
+
+// Read a list of nodes from one endpoint: {result, columns}, columns null when the read failed.
+// status is 0 for good values, the error message otherwise.
+const readColumns = async (endpoint, nodeIds) => {
     let result = {
-        values: {},
-        errors: {},
         connectionStatus: 'disconnected',
         timestamp: new Date().toISOString()
     };
+    let columns = null;
 
-    let clientEntry = null;
     try {
-        clientEntry = await getOpcuaClient(endpoint);
-        const { client, session } = clientEntry;
+        await withSession(endpoint, async (session) => {
+            result.connectionStatus = 'connected';
+            console.log(`[${new Date().toISOString()}] Attempting to read nodes from ${endpoint}.`);
 
-        result.connectionStatus = 'connected';
-        console.log(`[${new Date().toISOString()}] Attempting to read nodes from ${endpoint}.`);
+            try {
+                // Parsed (and registered) node ids are reused across polls of the same node list
+                const plan = await getReadPlan(getPoolEntry(endpoint), session, nodeIds);
 
-        // Batch read nodes for better performance
-        const nodesToRead = nodeIds.map(nodeId => ({
-            nodeId: nodeId,
-            attributeId: AttributeIds.Value
-        }));
+                // Chunks of at most MaxNodesPerRead nodes, read in parallel
+                const readAt = Date.now();
+                const readStart = performance.now();
+                const chunkValues = await mapLimit(plan.readChunks, READ_CHUNK_CONCURRENCY,
+                    chunk => chunk.length ? session.read(chunk) : []);
+                observeStage(endpoint, 'read', readStart);
 
-        try {
-            const dataValues = await session.read(nodesToRead);
-            
-            dataValues.forEach((dataValue, index) => {
-                const nodeId = nodeIds[index];
-                if (dataValue && dataValue.statusCode && dataValue.statusCode.isGood()) {
-                    result.values[nodeId] = dataValue.value.value;
-                    console.log(`[${new Date().toISOString()}] Read node ${nodeId}:`, dataValue.value.value);
-                } else {
-                    const status = dataValue && dataValue.statusCode ? dataValue.statusCode.toString() : 'Bad StatusCode';
-                    console.warn(`[${new Date().toISOString()}] Failed to read node ${nodeId}: Bad StatusCode - ${status}`);
-                    result.values[nodeId] = null;
-                    result.errors[nodeId] = `Bad StatusCode: ${status}`;
+                columns = {
+                    values: new Array(nodeIds.length).fill(null),
+                    status: new Array(nodeIds.length).fill(0),
+                    sourceTimestamps: new Array(nodeIds.length).fill(null)
+                };
+                for (const [position, message] of plan.invalid) {
+                    columns.status[position] = message;
+                    countError(endpoint, 'bad_status');
                 }
-            });
-        } catch (readError) {
-            console.error(`[${new Date().toISOString()}] Batch read error: ${readError.message}`);
-            result.error = `Batch read error: ${readError.message}`;
-        }
+                plan.positionChunks.forEach((positions, chunkIndex) => positions.forEach((position, index) => {
+                    const dataValue = chunkValues[chunkIndex][index];
+                    if (dataValue && dataValue.statusCode && dataValue.statusCode.isGood()) {
+                        columns.values[position] = dataValue.value.value;
+                        const sourceTimestamp = dataValue.sourceTimestamp || dataValue.serverTimestamp;
+                        columns.sourceTimestamps[position] = sourceTimestamp ? sourceTimestamp.getTime() : null;
+                    } else {
+                        const status = dataValue && dataValue.statusCode ? dataValue.statusCode.toString() : 'Bad StatusCode';
+                        console.warn(`[${new Date().toISOString()}] Failed to read node ${nodeIds[position]}: Bad StatusCode - ${status}`);
+                        columns.status[position] = `Bad StatusCode: ${status}`;
+                        countError(endpoint, 'bad_status');
+                    }
+                }));
+                cacheValues(endpoint, nodeIds, columns, readAt);
+            } catch (readError) {
+                console.error(`[${new Date().toISOString()}] Batch read error: ${readError.message}`);
+                countError(endpoint, 'read');
+                result.error = `Batch read error: ${readError.message}`;
+                columns = null;
+                // Let the pool drop the session when the error is session-level
+                if (isSessionError(readError)) {
+                    throw readError;
+                }
+            }
+        });
     } catch (error) {
-        result.error = error.message;
+        if (!result.error) {
+            result.error = error.message;
+        }
         result.connectionStatus = 'error';
         console.error(`[${new Date().toISOString()}] OPC UA data fetch error:`, error.message);
     }
+    return { result, columns };
+};
 
-    res.json(result);
+// Read a list of nodes, sharing the read in progress of an identical request
+const coalescedRead = (endpoint, nodeIds) => {
+    const key = JSON.stringify([endpoint, nodeIds]);
+    let pending = READ_COALESCE ? inflightReads.get(key) : null;
+    if (pending) {
+        countRead(endpoint, 'coalesced');
+        return pending;
+    }
+    countRead(endpoint, 'miss');
+    pending = readColumns(endpoint, nodeIds);
+    if (READ_COALESCE) {
+        inflightReads.set(key, pending);
+        pending.finally(() => inflightReads.delete(key));
+    }
+    return pending;
+};
+
+// Read a list of nodes from one endpoint and build the /data result, keyed by node id
+// or, with the columnar format, as arrays in the order of the node list. Values read
+// at most maxAge ms ago are answered from the last-value cache.
+const readNodes = async (endpoint, nodeIds, format = 'json', index = null, maxAge = 0) => {
+    let read = maxAge > 0 ? readFromCache(endpoint, nodeIds, maxAge) : null;
+    if (read) {
+        countRead(endpoint, 'hit');
+    } else {
+        read = await coalescedRead(endpoint, nodeIds);
+    }
+    const { result, columns } = read;
+
+    if (format === 'columnar') {
+        return {
+            format,
+            index,
+            values: columns ? columns.values : [],
+            status: columns ? columns.status : [],
+            source_timestamps: columns ? columns.sourceTimestamps : [],
+            ...result
+        };
+    }
+    const values = {};
+    const errors = {};
+    if (columns) {
+        nodeIds.forEach((nodeId, position) => {
+            values[nodeId] = columns.values[position];
+            if (columns.status[position] !== 0) {
+                errors[nodeId] = columns.status[position];
+            }
+        });
+    }
+    return { values, errors, ...result };
+};
+
+// Compact response settings
+const NODE_INDEX_CACHE_SIZE = parseInt(process.env.NODE_INDEX_CACHE_SIZE || '1000', 10);
+const GZIP_MIN_BYTES = parseInt(process.env.GZIP_MIN_BYTES || '1024', 10);
+
+// Node lists of the columnar format by index id (SHA-1 of the list), least recently used first
+const nodeIndexes = new Map();
+const gzip = util.promisify(zlib.gzip);
+
+const nodeIndexId = (nodeIds) => crypto.createHash('sha1').update(nodeIds.join('\n')).digest('hex');
+
+// Resolve the node list of a /data request. Columnar requests may send only the
+// index id of a node list sent before; unknownIndex tells the client to send it again.
+const resolveNodeList = (body) => {
+    const nodeIds = normalizeNodeIds(body && body.node_ids);
+    if (!body || body.format !== 'columnar') {
+        return { nodeIds, format: 'json', index: null };
+    }
+    if (nodeIds.length > 0) {
+        const index = nodeIndexId(nodeIds);
+        nodeIndexes.delete(index);
+        nodeIndexes.set(index, nodeIds);
+        if (nodeIndexes.size > NODE_INDEX_CACHE_SIZE) {
+            nodeIndexes.delete(nodeIndexes.keys().next().value);
+        }
+        return { nodeIds, format: 'columnar', index };
+    }
+    const index = body.index || null;
+    const cached = index && nodeIndexes.get(index);
+    if (cached) {
+        nodeIndexes.delete(index);
+        nodeIndexes.set(index, cached);
+        return { nodeIds: cached, format: 'columnar', index };
+    }
+    return { nodeIds: [], format: 'columnar', index, unknownIndex: Boolean(index) };
+};
+
+const parseMaxAge = (value) => Math.max(0, parseInt(value, 10) || 0);
+
+const unknownIndexResult = (index) => ({
+    format: 'columnar',
+    index,
+    unknown_index: true,
+    values: [],
+    status: [],
+    source_timestamps: [],
+    error: 'Unknown node index, send node_ids again',
+    connectionStatus: 'error',
+    timestamp: new Date().toISOString()
+});
+
+// Send a JSON body, gzip compressed when it is large enough and the client accepts it
+const sendJson = async (req, res, body) => {
+    const json = JSON.stringify(body);
+    res.type('application/json');
+    if (GZIP_MIN_BYTES > 0 && json.length >= GZIP_MIN_BYTES && req.acceptsEncodings('gzip') === 'gzip') {
+        res.set({ 'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding' });
+        return res.send(await gzip(json));
+    }
+    return res.send(json);
+};
+
+// Enhanced data endpoint with better error handling and batch operations
+app.post('/data', async (req, res) => {
+
+    const start_time = Date.now();
+
+    const { nodeIds, format, index, unknownIndex } = resolveNodeList(req.body);
+    const endpoint = req.body.endpoint;
+
+    if (unknownIndex) {
+        return res.status(409).json(unknownIndexResult(index));
+    }
+    if (!endpoint || !nodeIds || nodeIds.length === 0) {
+        return res.status(400).json({
+            error: "Invalid request",
+            message: "Missing required parameters (endpoint and node_ids in body)",
+            connectionStatus: 'error'
+        });
+    }
+
+    const result = await readNodes(endpoint, nodeIds, format, index, parseMaxAge(req.body.max_age));
+
+    const serializeStart = performance.now();
+    await sendJson(req, res, result);
+    observeStage(endpoint, 'serialize', serializeStart);
     const end_time = Date.now();
     const duration = end_time - start_time;
     const latency = duration;
     console.log(`[${new Date().toISOString()}] Time taken to fetch data: ${latency} ms`);
 });
 
+// Batch data endpoint: read many {endpoint, node_ids} groups concurrently
+app.post('/data/batch', async (req, res) => {
+
+    const start_time = Date.now();
+
+    const groups = req.body.requests;
+    if (!Array.isArray(groups) || groups.length === 0) {
+        return res.status(400).json({
+            error: "Invalid request",
+            message: "Missing required parameter (requests list in body)",
+            connectionStatus: 'error'
+        });
+    }
+
+    // Each group succeeds or fails on its own, results keep the request order
+    const results = await Promise.all(groups.map(async (group) => {
+        const { nodeIds, format, index, unknownIndex } = resolveNodeList(group);
+        const endpoint = group && group.endpoint;
+        const key = group && group.key !== undefined ? group.key : null;
+        if (unknownIndex) {
+            return { key, ...unknownIndexResult(index) };
+        }
+        if (!endpoint || nodeIds.length === 0) {
+            return {
+                key,
+                values: {},
+                errors: {},
+                error: "Missing required parameters (endpoint and node_ids)",
+                connectionStatus: 'error',
+                timestamp: new Date().toISOString()
+            };
+        }
+        const maxAge = parseMaxAge(group.max_age !== undefined ? group.max_age : req.body.max_age);
+        return { key, ...(await readNodes(endpoint, nodeIds, format, index, maxAge)) };
+    }));
+
+    const serializeStart = performance.now();
+    await sendJson(req, res, { results });
+    observeStage('batch', 'serialize', serializeStart);
+    const latency = Date.now() - start_time;
+    console.log(`[${new Date().toISOString()}] Time taken to fetch batch of ${groups.length} groups: ${latency} ms`);
+});
+
+// Address space browsing settings
+const BROWSE_BATCH_SIZE = parseInt(process.env.BROWSE_BATCH_SIZE || '50', 10);
+const BROWSE_CONCURRENCY = parseInt(process.env.BROWSE_CONCURRENCY || '4', 10);
+const BROWSE_MAX_REFERENCES = parseInt(process.env.BROWSE_MAX_REFERENCES || '1000', 10);
+const BROWSE_CACHE_TTL_MS = parseInt(process.env.BROWSE_CACHE_TTL_MS || '300000', 10);
+// Variables returned per /browse response; clients page with offset/next
+const BROWSE_PAGE_SIZE = parseInt(process.env.BROWSE_PAGE_SIZE || '1000', 10);
+
+// Browse results per endpoint and walk parameters: {expiresAt, promise}
+const browseCache = new Map();
+
+// Map OPC UA built-in data types (ns=0) to the Odoo node data types
+const ODOO_DATA_TYPES = {
+    1: 'boolean',
+    2: 'integer', 3: 'integer', 4: 'integer', 5: 'integer',
+    6: 'integer', 7: 'integer', 8: 'integer', 9: 'integer',
+    10: 'float', 11: 'float',
+    12: 'string'
+};
+
+// Browse nodes and follow continuation points until every reference is returned
+const browseAll = async (session, nodeIds) => {
+    const results = await session.browse(nodeIds.map(nodeId => ({
+        nodeId,
+        browseDirection: BrowseDirection.Forward,
+        referenceTypeId: 'HierarchicalReferences',
+        includeSubtypes: true,
+        nodeClassMask: NodeClassMask.Object | NodeClassMask.Variable,
+        resultMask: 63
+    })));
+    return Promise.all(results.map(async (result) => {
+        const references = [...(result.references || [])];
+        let continuationPoint = result.continuationPoint;
+        while (continuationPoint && continuationPoint.length) {
+            const nextResult = await session.browseNext(continuationPoint, false);
+            references.push(...(nextResult.references || []));
+            continuationPoint = nextResult.continuationPoint;
+        }
+        return references;
+    }));
+};
+
+// Walk the address space below rootNodeId breadth first and list its variables
+const walkAddressSpace = async (endpoint, rootNodeId, maxDepth, maxNodes, includeNs0) => withSession(endpoint, async (session) => {
+    session.requestedMaxReferencesPerNode = BROWSE_MAX_REFERENCES;
+    const visited = new Set([rootNodeId]);
+    const variables = [];
+    let frontier = [{ nodeId: rootNodeId, path: '' }];
+    let truncated = false;
+    for (let depth = 0; depth < maxDepth && frontier.length > 0 && !truncated; depth++) {
+        const batches = [];
+        for (let i = 0; i < frontier.length; i += BROWSE_BATCH_SIZE) {
+            batches.push(frontier.slice(i, i + BROWSE_BATCH_SIZE));
+        }
+        const browsed = await mapLimit(batches, BROWSE_CONCURRENCY,
+            batch => browseAll(session, batch.map(item => item.nodeId)));
+        const nextFrontier = [];
+        batches.forEach((batch, batchIndex) => {
+            batch.forEach((parent, index) => {
+                for (const reference of browsed[batchIndex][index]) {
+                    const nodeId = reference.nodeId.toString();
+                    if (visited.has(nodeId) || (!includeNs0 && reference.nodeId.namespace === 0)) {
+                        continue;
+                    }
+                    visited.add(nodeId);
+                    const name = (reference.displayName && reference.displayName.text) || reference.browseName.name;
+                    const path = parent.path ? `${parent.path}/${name}` : name;
+                    if (reference.nodeClass === NodeClass.Variable) {
+                        if (variables.length >= maxNodes) {
+                            truncated = true;
+                            continue;
+                        }
+                        variables.push({ node_id: nodeId, name, browse_name: reference.browseName.toString(), path });
+                    }
+                    nextFrontier.push({ nodeId, path });
+                }
+            });
+        });
+        frontier = nextFrontier;
+    }
+
+    // Read the data type and value rank (-1: scalar) of every variable, in chunks
+    for (let i = 0; i < variables.length; i += BROWSE_BATCH_SIZE * 10) {
+        const chunk = variables.slice(i, i + BROWSE_BATCH_SIZE * 10);
+        const dataValues = await session.read(chunk.flatMap(variable => [
+            { nodeId: variable.node_id, attributeId: AttributeIds.DataType },
+            { nodeId: variable.node_id, attributeId: AttributeIds.ValueRank }
+        ]));
+        chunk.forEach((variable, index) => {
+            const [typeValue, rankValue] = [dataValues[2 * index], dataValues[2 * index + 1]];
+            const dataType = typeValue.statusCode.isGood() ? typeValue.value.value : null;
+            variable.data_type = dataType && dataType.namespace === 0 ? (ODOO_DATA_TYPES[dataType.value] || null) : null;
+            variable.value_rank = rankValue.statusCode.isGood() ? rankValue.value.value : null;
+        });
+    }
+    return { nodes: variables, truncated };
+});
+
+// Browse endpoint: list the variables of an endpoint's address space, cached per endpoint
+app.post('/browse', async (req, res) => {
+    const { endpoint } = req.body;
+    const rootNodeId = req.body.node_id || 'i=85'; // Objects folder
+    const maxDepth = Math.max(1, parseInt(req.body.max_depth || '10', 10));
+    const maxNodes = Math.max(1, parseInt(req.body.max_nodes || '10000', 10));
+    const includeNs0 = Boolean(req.body.include_ns0);
+    const offset = Math.max(0, parseInt(req.body.offset || '0', 10));
+    const limit = Math.min(BROWSE_PAGE_SIZE, Math.max(1, parseInt(req.body.limit || BROWSE_PAGE_SIZE, 10)));
+
+    if (!endpoint) {
+        return res.status(400).json({
+            error: "Invalid request",
+            message: "Missing required parameter (endpoint in body)",
+            connectionStatus: 'error'
+        });
+    }
+
+    const start_time = Date.now();
+    const key = JSON.stringify([endpoint, rootNodeId, maxDepth, maxNodes, includeNs0]);
+    let cached = browseCache.get(key);
+    // Only the first page may refresh, later pages must slice the same walk
+    if (!cached || cached.expiresAt < Date.now() || (req.body.refresh && offset === 0)) {
+        // Concurrent identical requests share one walk
+        cached = { expiresAt: Date.now() + BROWSE_CACHE_TTL_MS, promise: walkAddressSpace(endpoint, rootNodeId, maxDepth, maxNodes, includeNs0) };
+        browseCache.set(key, cached);
+        cached.promise.catch(() => browseCache.delete(key));
+    }
+    try {
+        const result = await cached.promise;
+        const total = result.nodes.length;
+        await sendJson(req, res, {
+            nodes: result.nodes.slice(offset, offset + limit),
+            total,
+            next: offset + limit < total ? offset + limit : null,
+            truncated: result.truncated,
+            error: null,
+            connectionStatus: 'connected'
+        });
+        console.log(`[${new Date().toISOString()}] Browsed ${total} variables on ${endpoint}, sent ${offset}-${Math.min(total, offset + limit)} in ${Date.now() - start_time} ms`);
+    } catch (error) {
+        console.error(`[${new Date().toISOString()}] Browse error for ${endpoint}:`, error.message);
+        res.json({ nodes: [], total: 0, next: null, truncated: false, error: error.message, connectionStatus: 'error' });
+    }
+});
+
+// Drop expired browse results
+setInterval(() => {
+    const now = Date.now();
+    for (const [key, cached] of browseCache.entries()) {
+        if (cached.expiresAt < now) {
+            browseCache.delete(key);
+        }
+    }
+}, 60000).unref();
+
+// History (HistoryRead) settings
+const HISTORY_MAX_VALUES = parseInt(process.env.HISTORY_MAX_VALUES || '10000', 10);
+const HISTORY_MAX_CONCURRENCY = parseInt(process.env.HISTORY_MAX_CONCURRENCY || '1', 10);
+const HISTORY_PAGE_SIZE = parseInt(process.env.HISTORY_PAGE_SIZE || '1000', 10);
+
+// History reads queue for one of HISTORY_MAX_CONCURRENCY slots, so backfills never
+// take the session pool over from live reads
+let historyActive = 0;
+const historyWaiters = [];
+
+const withHistorySlot = async (fn) => {
+    if (historyActive < HISTORY_MAX_CONCURRENCY) {
+        historyActive++;
+    } else {
+        // The slot is handed over by the request releasing it
+        await new Promise(resolve => historyWaiters.push(resolve));
+    }
+    try {
+        return await fn();
+    } finally {
+        const next = historyWaiters.shift();
+        if (next) {
+            next();
+        } else {
+            historyActive--;
+        }
+    }
+};
+
+const historyReadRaw = (session, nodesToRead, start, end, numValuesPerNode, release = false) => session.historyRead(new HistoryReadRequest({
+    historyReadDetails: new ReadRawModifiedDetails({
+        isReadModified: false,
+        startTime: start,
+        endTime: end,
+        numValuesPerNode,
+        returnBounds: false
+    }),
+    timestampsToReturn: TimestampsToReturn.Both,
+    releaseContinuationPoints: release,
+    nodesToRead
+}));
+
+// Read the raw history of nodes over [start, end] in pages of HISTORY_PAGE_SIZE values,
+// following continuation points until every node is complete or has maxValues values
+const readHistory = (endpoint, nodeIds, start, end, maxValues) => withSession(endpoint, async (session) => {
+    const nodes = {};
+    let pending = [];
+    for (const nodeId of nodeIds) {
+        nodes[nodeId] = { timestamps: [], values: [], more: false, error: null };
+        try {
+            pending.push({ nodeId, handle: resolveNodeId(nodeId), continuationPoint: null });
+        } catch (error) {
+            nodes[nodeId].error = `Invalid NodeId: ${error.message}`;
+        }
+    }
+
+    const toRelease = [];
+    while (pending.length > 0) {
+        const readStart = performance.now();
+        const response = await historyReadRaw(session, pending.map(item => ({
+            nodeId: item.handle,
+            continuationPoint: item.continuationPoint
+        })), start, end, Math.min(maxValues, HISTORY_PAGE_SIZE));
+        observeStage(endpoint, 'history', readStart);
+        const next = [];
+        (response.results || []).forEach((result, index) => {
+            const item = pending[index];
+            const node = nodes[item.nodeId];
+            if (!result.statusCode.isGoodish()) {
+                node.error = `Bad StatusCode: ${result.statusCode.toString()}`;
+                countError(endpoint, 'history');
+                return;
+            }
+            const dataValues = (result.historyData && result.historyData.dataValues) || [];
+            for (const dataValue of dataValues) {
+                const timestamp = dataValue.sourceTimestamp || dataValue.serverTimestamp;
+                if (!timestamp || (dataValue.statusCode && !dataValue.statusCode.isGoodish())) {
+                    continue;
+                }
+                node.timestamps.push(timestamp.getTime());
+                node.values.push(dataValue.value.value);
+            }
+            const continuationPoint = result.continuationPoint && result.continuationPoint.length ? result.continuationPoint : null;
+            if (!continuationPoint) {
+                return;
+            }
+            if (node.timestamps.length >= maxValues) {
+                // The client continues from the last timestamp in its next request
+                node.more = true;
+                toRelease.push({ nodeId: item.handle, continuationPoint });
+            } else {
+                next.push({ ...item, continuationPoint });
+            }
+        });
+        pending = next;
+    }
+    if (toRelease.length > 0) {
+        await historyReadRaw(session, toRelease, start, end, 0, true).catch(() => {});
+    }
+    return nodes;
+});
+
+// History endpoint: raw values of nodes over a time range, for gap backfill
+app.post('/history', async (req, res) => {
+    const nodeIds = normalizeNodeIds(req.body.node_ids);
+    const endpoint = req.body.endpoint;
+    const start = new Date(req.body.start);
+    const end = new Date(req.body.end);
+    const maxValues = Math.max(1, Math.min(parseInt(req.body.max_values || HISTORY_MAX_VALUES, 10), HISTORY_MAX_VALUES));
+
+    if (!endpoint || nodeIds.length === 0 || isNaN(start) || isNaN(end)) {
+        return res.status(400).json({
+            error: "Invalid request",
+            message: "Missing required parameters (endpoint, node_ids, start and end in body)",
+            connectionStatus: 'error'
+        });
+    }
+
+    const start_time = Date.now();
+    try {
+        const nodes = await withHistorySlot(() => readHistory(endpoint, nodeIds, start, end, maxValues));
+        const serializeStart = performance.now();
+        await sendJson(req, res, { nodes, error: null, connectionStatus: 'connected' });
+        observeStage(endpoint, 'serialize', serializeStart);
+        const count = Object.values(nodes).reduce((total, node) => total + node.timestamps.length, 0);
+        console.log(`[${new Date().toISOString()}] Read ${count} history values of ${nodeIds.length} nodes from ${endpoint} in ${Date.now() - start_time} ms`);
+    } catch (error) {
+        console.error(`[${new Date().toISOString()}] History read error for ${endpoint}:`, error.message);
+        res.json({ nodes: {}, error: error.message, connectionStatus: 'error' });
+    }
+});
+
+// Subscription (report-by-exception) settings
+const PUSH_INTERVAL_MS = parseInt(process.env.PUSH_INTERVAL_MS || '250', 10);
+const PUSH_MAX_BATCH = parseInt(process.env.PUSH_MAX_BATCH || '1000', 10);
+const PUSH_MAX_BUFFER = parseInt(process.env.PUSH_MAX_BUFFER || '10000', 10);
+const SUBSCRIPTION_WATCHDOG_MS = parseInt(process.env.SUBSCRIPTION_WATCHDOG_MS || '5000', 10);
+
+// Active subscriptions, keyed by the Odoo device id
+const subscriptions = new Map();
+
+const buildDataChangeFilter = (spec) => {
+    if (!spec.deadband_type || spec.deadband_type === 'none') {
+        return null;
+    }
+    return new DataChangeFilter({
+        trigger: DataChangeTrigger.StatusValue,
+        deadbandType: spec.deadband_type === 'percent' ? DeadbandType.Percent : DeadbandType.Absolute,
+        deadbandValue: Number(spec.deadband_value) || 0
+    });
+};
+
+// Send buffered notifications of a subscription to Odoo
+const flushNotifications = async (spec) => {
+    if (spec.flushing || (spec.samples.length === 0 && !spec.errorsChanged)) {
+        return;
+    }
+    spec.flushing = true;
+    const samples = spec.samples.splice(0, PUSH_MAX_BATCH);
+    spec.errorsChanged = false;
+    const pushStart = performance.now();
+    try {
+        const response = await fetch(spec.callback_url, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                db: spec.db,
+                device_id: spec.device_id !== undefined ? spec.device_id : spec.key,
+                token: spec.token,
+                samples,
+                errors: spec.errors
+            })
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        observeStage(spec.endpoint, 'push', pushStart);
+    } catch (error) {
+        console.error(`[${new Date().toISOString()}] Push to Odoo failed for device ${spec.key}: ${error.message}`);
+        countError(spec.endpoint, 'push');
+        // The node errors were not delivered either: send them again with the next flush
+        spec.errorsChanged = true;
+        // Keep the samples for the next flush, dropping the oldest beyond the buffer limit
+        spec.samples.unshift(...samples);
+        if (spec.samples.length > PUSH_MAX_BUFFER) {
+            spec.samples.splice(0, spec.samples.length - PUSH_MAX_BUFFER);
+        }
+    } finally {
+        spec.flushing = false;
+    }
+};
+
+const queueNotification = (spec, nodeId, dataValue) => {
+    if (dataValue.statusCode && dataValue.statusCode.isGood()) {
+        spec.samples.push({
+            node_id: nodeId,
+            value: dataValue.value.value,
+            source_timestamp: (dataValue.sourceTimestamp || dataValue.serverTimestamp || new Date()).toISOString()
+        });
+        if (spec.errors[nodeId]) {
+            delete spec.errors[nodeId];
+            spec.errorsChanged = true;
+        }
+    } else {
+        spec.errors[nodeId] = `Bad StatusCode: ${dataValue.statusCode.toString()}`;
+        spec.errorsChanged = true;
+    }
+    if (spec.samples.length >= PUSH_MAX_BATCH) {
+        flushNotifications(spec);
+    }
+};
+
+// Create the OPC UA subscription and monitored items of a spec on the pooled session
+const startSubscription = async (spec) => {
+    const entry = getPoolEntry(spec.endpoint);
+    const session = await getSession(entry);
+    const subscription = await session.createSubscription2({
+        requestedPublishingInterval: Math.max(50, Number(spec.publishing_interval) || 1000),
+        requestedLifetimeCount: 100,
+        requestedMaxKeepAliveCount: 10,
+        maxNotificationsPerPublish: 0,
+        publishingEnabled: true,
+        priority: 10
+    });
+    const itemsToMonitor = spec.node_ids.map(nodeId => ({
+        nodeId: nodeId,
+        attributeId: AttributeIds.Value
+    }));
+    const group = await subscription.monitorItems(itemsToMonitor, {
+        samplingInterval: Math.max(0, Number(spec.sampling_interval) || 0),
+        discardOldest: true,
+        queueSize: Math.max(1, Number(spec.queue_size) || 1),
+        filter: buildDataChangeFilter(spec)
+    }, TimestampsToReturn.Both);
+
+    group.on('changed', (monitoredItem, dataValue, index) => queueNotification(spec, spec.node_ids[index], dataValue));
+    subscription.on('terminated', () => {
+        if (spec.subscription === subscription) {
+            spec.subscription = null;
+        }
+    });
+
+    spec.errors = {};
+    group.monitoredItems.forEach((item, index) => {
+        if (item.statusCode && !item.statusCode.isGood()) {
+            spec.errors[spec.node_ids[index]] = `Bad StatusCode: ${item.statusCode.toString()}`;
+        }
+    });
+    spec.errorsChanged = Object.keys(spec.errors).length > 0;
+    spec.subscription = subscription;
+    spec.session = session;
+    console.log(`✅ Subscription created for device ${spec.key} on ${spec.endpoint} (${spec.node_ids.length} nodes).`);
+};
+
+const stopSubscription = async (spec) => {
+    clearInterval(spec.timer);
+    const subscription = spec.subscription;
+    spec.subscription = null;
+    await flushNotifications(spec);
+    if (subscription) {
+        try {
+            await subscription.terminate();
+        } catch (e) {
+            console.error(`Error terminating subscription for device ${spec.key}: ${e.message}`);
+        }
+    }
+};
+
+// Subscribe endpoint: monitor nodes and push changes to Odoo
+app.post('/subscribe', async (req, res) => {
+    const nodeIds = normalizeNodeIds(req.body.node_ids);
+    const { key, endpoint, callback_url, token } = req.body;
+
+    if (key === undefined || !endpoint || nodeIds.length === 0 || !callback_url) {
+        return res.status(400).json({
+            error: "Invalid request",
+            message: "Missing required parameters (key, endpoint, node_ids and callback_url in body)",
+            connectionStatus: 'error'
+        });
+    }
+
+    // Replace any previous subscription of the same device
+    if (subscriptions.has(key)) {
+        await stopSubscription(subscriptions.get(key));
+        subscriptions.delete(key);
+    }
+
+    const spec = {
+        ...req.body,
+        node_ids: nodeIds,
+        samples: [],
+        errors: {},
+        errorsChanged: false,
+        flushing: false,
+        subscription: null,
+        session: null,
+        restoring: false,
+        timer: null
+    };
+    try {
+        await startSubscription(spec);
+    } catch (error) {
+        console.error(`[${new Date().toISOString()}] Subscription error for device ${key}:`, error.message);
+        return res.json({ error: error.message, connectionStatus: 'error' });
+    }
+    spec.timer = setInterval(() => flushNotifications(spec), PUSH_INTERVAL_MS);
+    subscriptions.set(key, spec);
+    res.json({ error: null, errors: spec.errors, connectionStatus: 'connected' });
+});
+
+// Unsubscribe endpoint
+app.post('/unsubscribe', async (req, res) => {
+    const key = req.body.key;
+    const spec = subscriptions.get(key);
+    if (spec) {
+        subscriptions.delete(key);
+        await stopSubscription(spec);
+    }
+    res.json({ error: null, removed: Boolean(spec) });
+});
+
+// Recreate subscriptions whose session was lost
+setInterval(async () => {
+    for (const spec of subscriptions.values()) {
+        const entry = getPoolEntry(spec.endpoint);
+        if (spec.restoring || (spec.subscription && entry.session === spec.session)) {
+            continue;
+        }
+        spec.subscription = null;
+        spec.restoring = true;
+        try {
+            await startSubscription(spec);
+        } catch (error) {
+            console.error(`[${new Date().toISOString()}] Could not restore subscription for device ${spec.key}: ${error.message}`);
+        } finally {
+            spec.restoring = false;
+        }
+    }
+}, SUBSCRIPTION_WATCHDOG_MS).unref();
+
+// Health endpoint: liveness of the API server itself, used by Odoo's circuit breaker
+app.get('/health', (req, res) => {
+    res.json({ status: 'ok', sessions: connectionPool.size, subscriptions: subscriptions.size });
+});
+
+// Metrics endpoint: Prometheus text format, stage histograms only with METRICS_ENABLED=1
+app.get('/metrics', (req, res) => {
+    res.type('text/plain; version=0.0.4').send(renderMetrics());
+});
+
 // Test endpoint: Test connection to OPC UA server
 app.get('/test', async (req, res) => {
     const endpoint = req.query.endpoint;
@@ -155,7 +1307,7 @@ app.get('/test', async (req, res) => {
     };
     
     try {
-        await getOpcuaClient(endpoint);
+        await checkHealth(endpoint);
         result.connectionStatus = 'connected';
         console.log(`[${new Date().toISOString()}] Connection test successful for ${endpoint}.`);
     } catch (error) {
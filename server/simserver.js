@@ -0,0 +1,63 @@
+// Local OPC UA test server with a handful of changing variables.
+// Used to exercise polling and subscriptions without a real PLC.
+const { OPCUAServer, Variant, DataType } = require('node-opcua');
+
+const port = parseInt(process.env.SIM_PORT || '4840', 10);
+const tagCount = parseInt(process.env.SIM_TAGS || '10', 10);
+const changeMs = parseInt(process.env.SIM_CHANGE_MS || '1000', 10);
+const history = /^(1|true|yes)$/i.test(process.env.SIM_HISTORY || '');
+// MaxNodesPerRead / MaxNodesPerRegisterNodes advertised and enforced by the server (0: no limit)
+const maxNodesPerRead = parseInt(process.env.SIM_MAX_NODES_PER_READ || '0', 10);
+
+(async () => {
+    const server = new OPCUAServer({
+        port,
+        resourcePath: '/UA/Sim',
+        buildInfo: { productName: 'OPC UA Connector Simulator' },
+        serverCapabilities: {
+            operationLimits: { maxNodesPerRead, maxNodesPerRegisterNodes: maxNodesPerRead }
+        }
+    });
+    await server.initialize();
+
+    const addressSpace = server.engine.addressSpace;
+    const namespace = addressSpace.getOwnNamespace();
+    const device = namespace.addObject({
+        organizedBy: addressSpace.rootFolder.objects,
+        browseName: 'MyObject'
+    });
+
+    const values = new Array(tagCount).fill(0);
+    const variables = [];
+    for (let i = 0; i < tagCount; i++) {
+        // The historian records value changes, so historized tags hold their value instead of a getter
+        const variable = namespace.addVariable({
+            componentOf: device,
+            browseName: `Tag${i}`,
+            nodeId: `s=MyObject.Tag${i}`,
+            dataType: 'Double',
+            minimumSamplingInterval: 100,
+            value: history ? new Variant({ dataType: DataType.Double, value: values[i] }) : {
+                get: () => new Variant({ dataType: DataType.Double, value: values[i] })
+            }
+        });
+        if (history) {
+            addressSpace.installHistoricalDataNode(variable, { maxOnlineValues: 100000 });
+        }
+        variables.push(variable);
+    }
+
+    // Odd tags follow a sine wave, even tags stay static to exercise change-only paths
+    setInterval(() => {
+        const t = Date.now() / 1000;
+        for (let i = 1; i < tagCount; i += 2) {
+            values[i] = Math.round(Math.sin(t / 10 + i) * 10000) / 100;
+            if (history) {
+                variables[i].setValueFromSource({ dataType: DataType.Double, value: values[i] });
+            }
+        }
+    }, changeMs);
+
+    await server.start();
+    console.log(`🏭 OPC UA simulator running at ${server.getEndpointUrl()} with ${tagCount} tags (ns=1;s=MyObject.Tag0..${tagCount - 1})`);
+})();
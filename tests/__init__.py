@@ -0,0 +1,12 @@
+from . import test_ingest
+from . import test_push
+from . import test_read_series
+from . import test_write_buffer
+from . import test_node_import
+from . import test_backfill
+from . import test_sharding
+from . import test_rollup
+from . import test_partitions
+from . import test_bridge_client
+from . import test_metrics
+from . import test_consumers
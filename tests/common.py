@@ -0,0 +1,61 @@
+from unittest.mock import patch
+import requests
+
+from odoo.tests.common import TransactionCase
+
+from ..models.opcua_bridge_client import BridgeClient
+
+
+class FakeResponse:
+    """Stand-in for the ``requests`` response of an API server call."""
+
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f'HTTP {self.status_code}')
+
+
+class OpcuaTestCase(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.device = cls.env['opcua.device'].create({
+            'name': 'Test PLC',
+            'endpoint': 'opc.tcp://localhost:4840',
+        })
+
+    @classmethod
+    def create_nodes(cls, count, device=None, **vals):
+        device = device or cls.device
+        return cls.env['opcua.node'].create([dict({
+            'device_id': device.id,
+            'name': f'Tag {index}',
+            'node_id': f'ns=1;s=Tag{index}',
+        }, **vals) for index in range(count)])
+
+    def use_test_cursors(self):
+        """Make new registry cursors (threads, write-behind, leases) share the test transaction."""
+        if self.registry.test_cr is None:
+            self.registry.enter_test_mode(self.cr)
+            self.addCleanup(self.registry.leave_test_mode)
+
+    def patch_bridge(self, handler):
+        """Answer the API server POSTs with ``handler(path, body)``.
+
+        :return: list of the ``(path, body)`` of the calls made
+        """
+        calls = []
+
+        def post(client, path, json=None, **kwargs):
+            calls.append((path, json))
+            return FakeResponse(handler(path, json))
+
+        self.startPatcher(patch.object(BridgeClient, 'post', post))
+        return calls
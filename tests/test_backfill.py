@@ -0,0 +1,62 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from freezegun import freeze_time
+
+from odoo.tests import tagged
+
+from ..models.opcua_backfill import BackfillWorker, get_backfill_worker
+from .common import OpcuaTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestBackfill(OpcuaTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.device.write({'backfill_enabled': True, 'polling_interval': 1000})
+        cls.node = cls.create_nodes(1)
+        cls.last_sample = datetime(2026, 1, 1, 11, 50)
+        cls.env['opcua.data'].create({
+            'device_id': cls.device.id,
+            'node_id': cls.node.node_id,
+            'opcua_node_id': cls.node.id,
+            'timestamp': cls.last_sample,
+            'value': 1.0,
+        })
+
+    def setUp(self):
+        super().setUp()
+        # Backfills are run by the test, not by the worker thread
+        self.startPatcher(patch.object(BackfillWorker, '_ensure_thread', lambda worker: None))
+        self.worker = get_backfill_worker(self.env.cr.dbname)
+        self.addCleanup(self.worker._queue.pop, self.device.id, None)
+
+    @freeze_time('2026-01-01 12:00:00')
+    def test_outage_window_is_backfilled(self):
+        self.device._apply_fetch_result({'connectionStatus': 'error', 'error': 'Connection lost', 'values': {}})
+        self.device._apply_fetch_result({'connectionStatus': 'connected', 'error': None,
+                                         'values': {self.node.node_id: 2.0}})
+        self.assertEqual(self.device.connection_status, 'connected')
+        self.env.cr.postcommit.run()
+        self.assertIn(self.device.id, self.worker._queue)
+
+        calls = self.patch_bridge(lambda path, body: {'nodes': {}})
+        self.use_test_cursors()
+        self.env.flush_all()
+        self.worker._backfill(self.device.id, self.worker._queue.pop(self.device.id))
+        self.assertEqual(calls, [('/history', {
+            'endpoint': self.device.endpoint,
+            'node_ids': [self.node.node_id],
+            'start': '2026-01-01T11:50:00.000Z',
+            'end': '2026-01-01T12:00:00.000Z',
+            'max_values': 10000,
+        })])
+
+    @freeze_time('2026-01-01 12:00:00')
+    def test_no_backfill_without_outage(self):
+        self.device._apply_fetch_result({'connectionStatus': 'connected', 'error': None,
+                                         'values': {self.node.node_id: 2.0}})
+        self.env.cr.postcommit.run()
+        self.assertNotIn(self.device.id, self.worker._queue)
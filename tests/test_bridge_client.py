@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+import requests
+
+from odoo.tests import BaseCase, tagged
+
+from ..models.opcua_bridge_client import MAX_RETRIES, BridgeClient, get_bridge_client
+from .common import OpcuaTestCase
+
+
+class TestBridgeClientRetries(BaseCase):
+
+    def _request(self, error):
+        client = BridgeClient('http://bridge.invalid:3000')
+        with patch.object(client.session, 'request', side_effect=error) as request, \
+                patch('time.sleep'), patch(f'{BridgeClient.__module__}.FAILURE_THRESHOLD', MAX_RETRIES + 2), \
+                self.assertRaises(type(error)):
+            client.post('/data', json={}, idempotent=True)
+        return request.call_count
+
+    def test_connection_errors_are_retried(self):
+        self.assertEqual(self._request(requests.exceptions.ConnectionError('refused')), MAX_RETRIES + 1)
+
+    def test_read_timeouts_are_not_retried(self):
+        self.assertEqual(self._request(requests.exceptions.ReadTimeout('hung')), 1)
+
+
+@tagged('post_install', '-at_install')
+class TestBridgeFailover(OpcuaTestCase):
+
+    def test_connection_error_names_the_failover_bridge(self):
+        self.env['opcua.bridge'].create([
+            {'name': 'A', 'url': 'http://bridge-a.invalid:4001'},
+            {'name': 'B', 'url': 'http://bridge-b.invalid:4001'},
+        ])
+        self.device.bridge_mode = 'pool'
+        primary = get_bridge_client(self.device.api_url)
+        primary._opened_at = 1
+        self.addCleanup(setattr, primary, '_opened_at', None)
+        failover = self.device._get_bridge_client()
+        self.assertNotEqual(failover, primary)
+
+        def get(client, path, **kwargs):
+            raise requests.exceptions.ConnectionError('refused')
+
+        self.startPatcher(patch.object(BridgeClient, 'get', get))
+        self.device.test_connection()
+        self.assertIn(failover.base_url, self.device.error_message)
+        self.assertNotIn(primary.base_url, self.device.error_message)
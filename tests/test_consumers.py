@@ -0,0 +1,21 @@
+from odoo.tests import tagged
+
+from .common import OpcuaTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestConsumerVersion(OpcuaTestCase):
+
+    def test_version_follows_consumer_changes(self):
+        # Any table works for the fingerprint, opcua.node stands in for a consumer
+        consumer_models = (('opcua.node', 'device_id'),)
+        Device = self.env['opcua.device']
+        version = Device._get_consumer_version(consumer_models)
+        self.assertEqual(Device._get_consumer_version(consumer_models), version)
+
+        node = self.create_nodes(1)
+        created = Device._get_consumer_version(consumer_models)
+        self.assertNotEqual(created, version)
+
+        node.unlink()
+        self.assertNotEqual(Device._get_consumer_version(consumer_models), created)
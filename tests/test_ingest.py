@@ -0,0 +1,90 @@
+from freezegun import freeze_time
+
+from odoo.tests import tagged
+
+from .common import OpcuaTestCase
+
+NODE_COUNT = 1000
+
+
+@tagged('post_install', '-at_install')
+class TestIngestion(OpcuaTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.nodes = cls.create_nodes(NODE_COUNT)
+
+    def _data_response(self, path, body):
+        # Ten distinct values, as on a PLC where most tags share a few states
+        return {
+            'values': {node_id: float(index % 10) for index, node_id in enumerate(body['node_ids'])},
+            'errors': {},
+            'connectionStatus': 'connected',
+            'error': None,
+        }
+
+    def test_fetch_data_query_count(self):
+        """A poll costs queries per distinct value and per history batch, not per node."""
+        calls = self.patch_bridge(self._data_response)
+        self.env.invalidate_all()
+        with self.assertQueryCount(50):
+            self.device.fetch_data()
+        self.assertEqual([path for path, _body in calls], ['/data'])
+
+        self.assertEqual(self.device.connection_status, 'connected')
+        self.assertFalse(self.device.error_message)
+        self.assertEqual(self.nodes[7].value, 7.0)
+        self.assertTrue(all(self.nodes.mapped('last_update')))
+        history = self.env['opcua.data'].search([('device_id', '=', self.device.id)])
+        self.assertEqual(len(history), NODE_COUNT)
+        self.assertEqual(set(history.mapped('opcua_node_id')), set(self.nodes))
+
+    @freeze_time('2026-01-01 12:00:00')
+    def test_same_second_is_stored_once(self):
+        self.patch_bridge(self._data_response)
+        self.device.fetch_data()
+        self.device.fetch_data()
+        count = self.env['opcua.data'].search_count([('device_id', '=', self.device.id)])
+        self.assertEqual(count, NODE_COUNT)
+
+    def test_batch_retry_keeps_max_age(self):
+        self.env['ir.config_parameter'].sudo().set_param('opcua_connector.read_max_age_ms', 500)
+        self.device.response_format = 'columnar'
+
+        def handler(path, body):
+            if len(calls) == 1:
+                return {'results': [{'key': self.device.id, 'unknown_index': True}]}
+            return {'results': []}
+
+        calls = self.patch_bridge(handler)
+        self.env['opcua.device']._collect_by_bridge(self.device)
+        self.assertEqual(len(calls), 2)
+        for _path, body in calls:
+            self.assertEqual([request['max_age'] for request in body['requests']], [500])
+        self.assertEqual(len(calls[1][1]['requests'][0]['node_ids']), NODE_COUNT)
+
+    def test_unsupported_values_are_rejected_per_node(self):
+        timestamp = '2026-01-01 12:00:00'
+        self.device._ingest_samples([
+            ('ns=1;s=Tag0', 1.5, timestamp),
+            ('ns=1;s=Tag1', True, timestamp),
+            ('ns=1;s=Tag2', 'running', timestamp),
+            ('ns=1;s=Tag3', [1.0, 2.0], timestamp),
+            ('ns=1;s=Tag4', 7, timestamp),
+        ])
+        self.assertEqual(self.nodes[:5].mapped('value'), [1.5, 1.0, 0.0, 0.0, 7.0])
+        self.assertFalse(self.nodes[0].error_message)
+        self.assertIn('str', self.nodes[2].error_message)
+        self.assertIn('list', self.nodes[3].error_message)
+        history = self.env['opcua.data'].search([('device_id', '=', self.device.id)])
+        self.assertEqual(set(history.mapped('node_id')), {'ns=1;s=Tag0', 'ns=1;s=Tag1', 'ns=1;s=Tag4'})
+
+    @freeze_time('2026-01-01 12:00:10')
+    def test_cached_values_keep_their_read_time(self):
+        read_at = 1767268800000  # 2026-01-01 12:00:00 UTC
+        self.device._apply_fetch_result({'connectionStatus': 'connected', 'error': None, 'cached': True,
+                                         'read_at': read_at, 'values': {'ns=1;s=Tag0': 3.0}})
+        history = self.env['opcua.data'].search([('device_id', '=', self.device.id)])
+        self.assertEqual(str(history.timestamp), '2026-01-01 12:00:00')
+        self.assertEqual(str(self.nodes[0].last_update), '2026-01-01 12:00:00')
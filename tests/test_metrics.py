@@ -0,0 +1,26 @@
+from odoo.tests import HttpCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestMetrics(HttpCase):
+
+    def setUp(self):
+        super().setUp()
+        self.params = self.env['ir.config_parameter'].sudo()
+        self.params.set_param('opcua_connector.metrics', '1')
+        self.params.set_param('opcua_connector.metrics_token', False)
+
+    def _scrape(self, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return self.url_open(f'/opcua/metrics?db={self.env.cr.dbname}', headers=headers)
+
+    def test_anonymous_scrape_needs_a_token(self):
+        self.assertEqual(self._scrape().status_code, 403)
+        self.params.set_param('opcua_connector.metrics_token', 'secret')
+        self.assertEqual(self._scrape().status_code, 403)
+        self.assertEqual(self._scrape('wrong').status_code, 403)
+        self.assertEqual(self._scrape('secret').status_code, 200)
+
+    def test_administrator_without_token(self):
+        self.authenticate('admin', 'admin')
+        self.assertEqual(self._scrape().status_code, 200)
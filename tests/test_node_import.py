@@ -0,0 +1,43 @@
+from odoo.tests import tagged
+
+from .common import OpcuaTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestNodeImport(OpcuaTestCase):
+
+    def _browse_response(self, path, body):
+        return {'nodes': [
+            {'node_id': 'ns=1;s=Temp', 'name': 'Temp', 'path': 'PLC/Temp', 'data_type': 'float', 'value_rank': -1},
+            {'node_id': 'ns=1;s=Count', 'name': 'Count', 'path': 'PLC/Count', 'data_type': 'integer'},
+            {'node_id': 'ns=1;s=Run', 'name': 'Run', 'path': 'PLC/Run', 'data_type': 'boolean', 'value_rank': -1},
+            {'node_id': 'ns=1;s=Recipe', 'name': 'Recipe', 'path': 'PLC/Recipe', 'data_type': 'string',
+             'value_rank': -1},
+            {'node_id': 'ns=1;s=Blob', 'name': 'Blob', 'path': 'PLC/Blob', 'data_type': None, 'value_rank': -1},
+            {'node_id': 'ns=1;s=Curve', 'name': 'Curve', 'path': 'PLC/Curve', 'data_type': 'float',
+             'value_rank': 1},
+        ], 'truncated': False, 'error': None}
+
+    def test_import_skips_non_numeric_variables(self):
+        self.patch_bridge(self._browse_response)
+        wizard = self.env['opcua.node.import'].create({'device_id': self.device.id})
+        wizard.action_browse()
+        self.assertIn('3 new variables are skipped', wizard.preview)
+        wizard.action_import()
+        self.assertEqual(sorted(self.device.node_ids.mapped('node_id')),
+                         ['ns=1;s=Count', 'ns=1;s=Run', 'ns=1;s=Temp'])
+
+    def test_browse_follows_pages(self):
+        nodes = self._browse_response('/browse', {})['nodes']
+
+        def paged_response(path, body):
+            offset = body['offset']
+            return {'nodes': nodes[offset:offset + 2], 'next': offset + 2 if offset + 2 < len(nodes) else None,
+                    'total': len(nodes), 'truncated': False, 'error': None}
+
+        calls = self.patch_bridge(paged_response)
+        wizard = self.env['opcua.node.import'].create({'device_id': self.device.id, 'refresh': True})
+        found, _truncated = wizard._browse()
+        self.assertEqual([node['node_id'] for node in found], [node['node_id'] for node in nodes])
+        self.assertEqual([(body['offset'], body['refresh']) for _path, body in calls],
+                         [(0, True), (2, False), (4, False)])
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from odoo.tests import BaseCase
+
+from ..models.opcua_data import _uncovered_ranges
+
+
+class TestUncoveredRanges(BaseCase):
+
+    def test_switch_from_days_to_months(self):
+        month = (datetime(2026, 3, 1), datetime(2026, 4, 1))
+        covered = [
+            (datetime(2026, 2, 28), datetime(2026, 3, 1)),
+            (datetime(2026, 3, 1), datetime(2026, 3, 2)),
+            (datetime(2026, 3, 2), datetime(2026, 3, 3)),
+        ]
+        self.assertEqual(_uncovered_ranges(*month, covered), [(datetime(2026, 3, 3), datetime(2026, 4, 1))])
+
+    def test_switch_from_months_to_days(self):
+        covered = [(datetime(2026, 3, 1), datetime(2026, 4, 1))]
+        self.assertEqual(_uncovered_ranges(datetime(2026, 3, 5), datetime(2026, 3, 6), covered), [])
+        self.assertEqual(
+            _uncovered_ranges(datetime(2026, 4, 1), datetime(2026, 4, 2), covered),
+            [(datetime(2026, 4, 1), datetime(2026, 4, 2))],
+        )
+
+    def test_gap_between_partitions(self):
+        covered = [
+            (datetime(2026, 3, 1), datetime(2026, 3, 2)),
+            (datetime(2026, 3, 4), datetime(2026, 3, 5)),
+        ]
+        self.assertEqual(_uncovered_ranges(datetime(2026, 3, 1), datetime(2026, 3, 6), covered), [
+            (datetime(2026, 3, 2), datetime(2026, 3, 4)),
+            (datetime(2026, 3, 5), datetime(2026, 3, 6)),
+        ])
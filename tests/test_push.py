@@ -0,0 +1,57 @@
+import json
+
+from odoo.tests import HttpCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestPush(HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.device = cls.env['opcua.device'].create({
+            'name': 'Push PLC',
+            'endpoint': 'opc.tcp://localhost:4840',
+            'push_token': 'secret',
+        })
+        cls.node = cls.env['opcua.node'].create({
+            'device_id': cls.device.id,
+            'name': 'Temperature',
+            'node_id': 'ns=1;s=Temp',
+        })
+
+    def _push(self, **payload):
+        payload = dict({
+            'db': self.env.cr.dbname,
+            'device_id': self.device.id,
+            'token': 'secret',
+            'samples': [{'node_id': 'ns=1;s=Temp', 'value': 21.5,
+                         'source_timestamp': '2026-01-01T12:00:00.000Z'}],
+        }, **payload)
+        response = self.url_open('/opcua/push', data=json.dumps(payload),
+                                 headers={'Content-Type': 'application/json'})
+        self.env.invalidate_all()
+        return response
+
+    def test_push_stores_samples(self):
+        response = self._push()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'stored': 1})
+        self.assertEqual(self.node.value, 21.5)
+        history = self.env['opcua.data'].search([('device_id', '=', self.device.id)])
+        self.assertEqual(history.mapped('value'), [21.5])
+        self.assertEqual(str(history.timestamp), '2026-01-01 12:00:00')
+
+    def test_push_node_errors(self):
+        response = self._push(samples=[], errors={'ns=1;s=Temp': 'BadNodeIdUnknown'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.device.error_message, 'ns=1;s=Temp: BadNodeIdUnknown')
+
+    def test_push_rejects_bad_token(self):
+        response = self._push(token='wrong')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(self.env['opcua.data'].search([('device_id', '=', self.device.id)]))
+
+    def test_push_rejects_unknown_database(self):
+        response = self._push(db='no-such-database')
+        self.assertEqual(response.status_code, 404)
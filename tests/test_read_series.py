@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from odoo.tests import tagged
+
+from ..models.opcua_data_rollup import ROLLUP_RESOLUTIONS
+from .common import OpcuaTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestReadSeries(OpcuaTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.node = cls.create_nodes(1)
+        cls.start = datetime(2026, 1, 1)
+        # Three hours every 10 seconds, a sawtooth from 0 to 99 with one spike
+        cls.env['opcua.data'].create([{
+            'device_id': cls.device.id,
+            'node_id': cls.node.node_id,
+            'timestamp': cls.start + timedelta(seconds=10 * index),
+            'value': 500.0 if index == 700 else float(index % 100),
+        } for index in range(1080)])
+
+    def _roll_up(self):
+        self.env['opcua.data'].flush_model()
+        self.env.cr.execute("SELECT max(id) FROM opcua_data")
+        upper = self.env.cr.fetchone()[0]
+        for resolution, _length in ROLLUP_RESOLUTIONS:
+            self.env['opcua.data.rollup']._merge_rollups(resolution, 0, upper)
+
+    def test_short_buckets_read_raw(self):
+        series = self.env['opcua.data'].read_series(self.node, self.start, self.start + timedelta(hours=1),
+                                                    max_points=200)
+        self.assertEqual(series['resolution'], 'raw')
+        self.assertEqual(max(series['values']), 99.0)
+
+    def test_long_buckets_read_rollups(self):
+        self._roll_up()
+        end = self.start + timedelta(hours=3)
+        series = self.env['opcua.data'].read_series(self.node, self.start, end, max_points=20)
+        self.assertEqual(series['resolution'], 'hour')
+        self.assertEqual(series['method'], 'minmax')
+        self.assertEqual(min(series['values']), 0.0)
+        self.assertEqual(max(series['values']), 500.0, "spikes survive the aggregates")
+        self.assertEqual(series['timestamps'], sorted(series['timestamps']))
+
+    def test_without_rollups_falls_back_to_raw(self):
+        end = self.start + timedelta(hours=3)
+        series = self.env['opcua.data'].read_series(self.node, self.start, end, max_points=20)
+        self.assertEqual(series['resolution'], 'raw')
+        self.assertEqual(max(series['values']), 500.0)
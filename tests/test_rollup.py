@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from odoo.tests import tagged
+
+from ..models.opcua_data_rollup import MARK_PARAM, WATERMARK_PARAM
+from .common import OpcuaTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestRollupWatermark(OpcuaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.node = self.create_nodes(1)
+        self.params = self.env['ir.config_parameter'].sudo()
+        self.params.set_param(MARK_PARAM, False)
+        self.env['opcua.data'].flush_model()
+        self.env.cr.execute("SELECT coalesce(max(id), 0) FROM opcua_data")
+        self.params.set_param(WATERMARK_PARAM, self.env.cr.fetchone()[0])
+
+    def _add_sample(self, minute):
+        return self.env['opcua.data'].create({
+            'device_id': self.device.id,
+            'node_id': self.node.node_id,
+            'timestamp': datetime(2026, 1, 1, 12, minute),
+            'value': float(minute),
+        })
+
+    def _rollup_count(self):
+        return self.env['opcua.data.rollup'].search_count([('device_id', '=', self.device.id)])
+
+    def test_rows_of_running_transactions_wait(self):
+        Rollup = self.env['opcua.data.rollup']
+        sample = self._add_sample(0)
+        self.env['opcua.data'].flush_model()
+        watermark = int(self.params.get_param(WATERMARK_PARAM))
+        # First run only marks the ids allocated so far
+        self.assertEqual(Rollup._get_settled_id(watermark), watermark)
+        mark_id, _mark_txid = self.params.get_param(MARK_PARAM).split(',')
+        self.assertGreaterEqual(int(mark_id), sample.id)
+        # The test transaction that inserted the row is still running
+        self.assertEqual(Rollup._get_settled_id(watermark), watermark)
+        Rollup._cron_update_rollups()
+        self.assertEqual(self._rollup_count(), 0)
+
+        # Once every transaction older than the mark ended, its ids are processed
+        self.params.set_param(MARK_PARAM, f'{mark_id},1')
+        later = self._add_sample(1)
+        self.env['opcua.data'].flush_model()
+        self.assertEqual(Rollup._get_settled_id(watermark), int(mark_id))
+        new_mark_id, _new_mark_txid = self.params.get_param(MARK_PARAM).split(',')
+        self.assertGreaterEqual(int(new_mark_id), later.id, "the next mark covers the rows added since")
@@ -0,0 +1,115 @@
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.tools import config
+
+from ..models import opcua_sharding
+from ..models.opcua_sharding import LeaseCoordinator, rendezvous_order, sharding_enabled
+from .common import OpcuaTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestRendezvous(OpcuaTestCase):
+
+    def test_order_is_deterministic(self):
+        candidates = ['http://a:4000', 'http://b:4000', 'http://c:4000']
+        self.assertEqual(rendezvous_order(42, candidates), rendezvous_order(42, list(reversed(candidates))))
+        self.assertEqual(sorted(rendezvous_order(42, candidates)), sorted(candidates))
+
+    def test_sharding_defaults_to_on_with_workers(self):
+        params = self.env['ir.config_parameter'].sudo()
+        params.set_param('opcua_connector.sharding', False)
+        with patch.dict(config.options, {'workers': 4}):
+            self.assertTrue(sharding_enabled(self.env))
+            params.set_param('opcua_connector.sharding', '0')
+            self.assertFalse(sharding_enabled(self.env), "explicitly turned off")
+        with patch.dict(config.options, {'workers': 0}):
+            self.assertFalse(sharding_enabled(self.env))
+            params.set_param('opcua_connector.sharding', '1')
+            self.assertTrue(sharding_enabled(self.env))
+
+    def test_removing_a_candidate_only_moves_its_keys(self):
+        candidates = ['w1', 'w2', 'w3', 'w4']
+        before = {key: rendezvous_order(key, candidates)[0] for key in range(1000)}
+        after = {key: rendezvous_order(key, candidates[:-1])[0] for key in range(1000)}
+        moved = {key for key in before if before[key] != after[key]}
+        self.assertEqual(moved, {key for key, owner in before.items() if owner == 'w4'})
+        self.assertTrue(all(len([key for key in before if before[key] == worker]) > 150 for worker in candidates),
+                        "keys are spread over all candidates")
+
+
+@tagged('post_install', '-at_install')
+class TestLeases(OpcuaTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.devices = cls.device | cls.env['opcua.device'].create([{
+            'name': f'PLC {index}',
+            'endpoint': f'opc.tcp://plc{index}:4840',
+            'is_polling': True,
+        } for index in range(5)])
+        cls.device.is_polling = True
+
+    def _expire(self, worker_name):
+        self.env.cr.execute("""
+            UPDATE opcua_worker SET heartbeat = now() at time zone 'UTC' - interval '1 hour' WHERE name = %s
+        """, (worker_name,))
+        self.env.cr.execute("""
+            UPDATE opcua_device_lease SET expires_at = now() at time zone 'UTC' - interval '1 second'
+             WHERE worker_id = (SELECT id FROM opcua_worker WHERE name = %s)
+        """, (worker_name,))
+
+    def _owners(self):
+        self.env.cr.execute("""
+            SELECT l.device_id, w.name FROM opcua_device_lease l JOIN opcua_worker w ON w.id = l.worker_id
+        """)
+        return dict(self.env.cr.fetchall())
+
+    def test_claim_respects_unexpired_leases(self):
+        Worker, Lease = self.env['opcua.worker'], self.env['opcua.device.lease']
+        Worker._heartbeat('w1', 30, 300)
+        Worker._heartbeat('w2', 30, 300)
+        first, second = self.devices[:2].ids
+        self.assertEqual(Lease._claim('w1', [first, second], 30), {first, second})
+        self.assertEqual(Lease._claim('w2', [first], 30), set(), "the lease of w1 has not expired")
+        self.assertEqual(Lease._claim('w1', [first, second], 30), {first, second}, "renewed")
+
+        self._expire('w1')
+        self.assertEqual(Lease._claim('w2', [first], 30), {first}, "expired leases are taken over")
+        self.assertEqual(Lease._claim('w1', [], 30), set())
+        self.assertEqual(self._owners(), {first: 'w2'}, "a worker releases the devices it no longer wants")
+
+    def test_heartbeat_lists_live_workers(self):
+        Worker = self.env['opcua.worker']
+        Worker._heartbeat('w1', 30, 300)
+        self.assertEqual(Worker._heartbeat('w2', 30, 300), ['w1', 'w2'])
+        self._expire('w1')
+        self.assertEqual(Worker._heartbeat('w2', 30, 300), ['w2'])
+
+    def test_coordinators_split_the_devices(self):
+        self.use_test_cursors()
+        self.env.flush_all()
+        started = []
+        self.startPatcher(patch.object(opcua_sharding, 'get_scheduler'))
+        self.startPatcher(patch.object(self.registry['opcua.device'], '_start_acquisition',
+                                       lambda device: started.append(device.id)))
+        first, second = LeaseCoordinator(self.env.cr.dbname), LeaseCoordinator(self.env.cr.dbname)
+
+        first.rebalance()
+        self.assertEqual(first.owned, set(self.devices.ids), "a single worker polls every device")
+        # The second worker gets its share once the first one released it
+        second.rebalance()
+        first.rebalance()
+        second.rebalance()
+        self.assertFalse(first.owned & second.owned)
+        self.assertEqual(first.owned | second.owned, set(self.devices.ids))
+        workers = [first.worker_name, second.worker_name]
+        for device_id, owner in self._owners().items():
+            self.assertEqual(owner, rendezvous_order(device_id, workers)[0])
+
+        # The devices of a dead worker move to the survivors
+        self._expire(first.worker_name)
+        second.rebalance()
+        self.assertEqual(second.owned, set(self.devices.ids))
+        self.assertEqual(set(started), set(self.devices.ids), "claimed devices are acquired locally")
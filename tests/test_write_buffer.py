@@ -0,0 +1,134 @@
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import psycopg2
+
+from odoo.tests import tagged
+
+from ..models.opcua_write_buffer import SampleBuffer
+from .common import OpcuaTestCase
+
+
+@tagged('post_install', '-at_install')
+class TestWriteBuffer(OpcuaTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.nodes = cls.create_nodes(2)
+
+    def setUp(self):
+        super().setUp()
+        # Flush explicitly, no background flusher
+        self.startPatcher(patch.object(SampleBuffer, '_run', lambda buffer: None))
+        self.use_test_cursors()
+
+    def _buffer(self, **kwargs):
+        kwargs.setdefault('spill_path', os.path.join(tempfile.mkdtemp(), 'spill.jsonl'))
+        return SampleBuffer(self.env.cr.dbname, **kwargs)
+
+    def _rows(self, count, node=None, value=1.0):
+        node = node or self.nodes[0]
+        start = datetime(2026, 1, 1)
+        return [{
+            'device_id': self.device.id,
+            'node_id': node.node_id,
+            'opcua_node_id': node.id,
+            'timestamp': start + timedelta(seconds=index),
+            'value': value,
+        } for index in range(count)]
+
+    def _history(self):
+        self.env.invalidate_all()
+        return self.env['opcua.data'].search([('device_id', '=', self.device.id)], order='timestamp')
+
+    def test_flush_stores_rows(self):
+        buffer = self._buffer()
+        buffer.add(self._rows(3) + self._rows(1))
+        self.assertEqual(buffer.flush(), 4)
+        self.assertEqual(len(self._history()), 3, "same node and second is stored once")
+        self.assertEqual(len(buffer), 0)
+
+    def test_false_is_zero_not_null(self):
+        buffer = self._buffer()
+        buffer.add(self._rows(1, value=False) + self._rows(1, node=self.nodes[1], value=None))
+        buffer.flush()
+        history = self._history()
+        self.assertEqual(history.filtered(lambda row: row.opcua_node_id == self.nodes[0]).value, 0.0)
+        self.env.cr.execute("SELECT value FROM opcua_data WHERE opcua_node_id = %s", (self.nodes[1].id,))
+        self.assertEqual(self.env.cr.fetchall(), [(None,)])
+
+    def test_rows_of_deleted_node_are_dropped(self):
+        buffer = self._buffer()
+        buffer.add(self._rows(2) + self._rows(3, node=self.nodes[1]))
+        self.nodes[1].unlink()
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(buffer.dropped, 3)
+        self.assertEqual(len(buffer), 0, "orphan rows are not retried")
+        self.assertEqual(len(self._history()), 2)
+
+    def test_permanent_failure_isolates_bad_rows(self):
+        copied = []
+
+        def copy(buffer, rows):
+            if any(row[4] == 666.0 for row in rows):
+                raise psycopg2.IntegrityError('bad row')
+            copied.extend(rows)
+            return 0
+
+        self.startPatcher(patch.object(SampleBuffer, '_copy', copy))
+        buffer = self._buffer()
+        rows = self._rows(8)
+        rows[5]['value'] = 666.0
+        buffer.add(rows)
+        self.assertEqual(buffer.flush(), 7)
+        self.assertEqual(len(copied), 7)
+        self.assertEqual(buffer.dropped, 1)
+        self.assertEqual(len(buffer), 0)
+
+    def test_transient_failure_requeues(self):
+        buffer = self._buffer()
+        buffer.add(self._rows(4))
+        with patch.object(SampleBuffer, '_copy', side_effect=psycopg2.OperationalError('connection lost')):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(buffer), 4)
+        self.assertEqual(buffer.dropped, 0)
+        self.assertEqual(buffer.flush(), 4)
+        self.assertEqual(len(self._history()), 4)
+
+    def test_drop_oldest(self):
+        buffer = self._buffer(flush_rows=2, max_rows=3, policy='drop_oldest')
+        rows = self._rows(5)
+        buffer.add(rows)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.dropped, 2)
+        buffer.flush()
+        self.assertEqual(self._history().mapped('timestamp'), [row['timestamp'] for row in rows[2:]])
+
+    def test_spill(self):
+        buffer = self._buffer(flush_rows=2, max_rows=3, policy='spill')
+        buffer.add(self._rows(5))
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.spilled, 2)
+        self.assertTrue(os.path.exists(buffer.spill_path))
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(buffer.flush(), 2, "spilled rows are read back once the buffer drained")
+        self.assertFalse(os.path.exists(buffer.spill_path))
+        self.assertEqual(len(self._history()), 5)
+
+    def test_block(self):
+        self.startPatcher(patch.object(SampleBuffer, '_copy', lambda buffer, rows: 0))
+        buffer = self._buffer(flush_rows=2, max_rows=3, policy='block', flush_ms=10)
+        producer = threading.Thread(target=buffer.add, args=(self._rows(5),))
+        producer.start()
+        producer.join(0.5)
+        self.assertTrue(producer.is_alive(), "the producer waits for room in the buffer")
+        self.assertEqual(len(buffer), 3)
+        buffer.flush()
+        producer.join(5)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(buffer.dropped, 0)
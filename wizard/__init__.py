@@ -0,0 +1,2 @@
+from . import opcua_node_import
+from . import opcua_data_export
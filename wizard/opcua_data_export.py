@@ -0,0 +1,46 @@
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from datetime import timedelta
+from werkzeug.urls import url_encode
+
+from ..models.opcua_export import parquet_available
+
+
+class OpcuaDataExport(models.TransientModel):
+    _name = 'opcua.data.export'
+    _description = 'Export OPC UA Historical Data'
+
+    device_id = fields.Many2one('opcua.device', string='Device', required=True, ondelete='cascade')
+    node_ids = fields.Many2many('opcua.node', string='Nodes', domain="[('device_id', '=', device_id)]",
+                                help='Nodes to export, one column each; all the nodes of the device when empty')
+    start = fields.Datetime('From', required=True, default=lambda self: fields.Datetime.now() - timedelta(days=1))
+    end = fields.Datetime('To', required=True, default=fields.Datetime.now)
+    file_format = fields.Selection([
+        ('csv', 'CSV'),
+        ('parquet', 'Parquet')
+    ], string='Format', required=True, default='csv')
+
+    @api.onchange('device_id')
+    def _onchange_device_id(self):
+        self.node_ids = self.node_ids.filtered(lambda node: node.device_id == self.device_id)
+
+    def action_export(self):
+        """Download the selection, streamed by the ``/opcua/export`` route."""
+        self.ensure_one()
+        if self.start >= self.end:
+            raise UserError("The export range must end after it starts.")
+        if self.file_format == 'parquet' and not parquet_available():
+            raise UserError("Parquet export requires the pyarrow Python package on the Odoo server.")
+        params = {
+            'device_id': self.device_id.id,
+            'start': fields.Datetime.to_string(self.start),
+            'end': fields.Datetime.to_string(self.end),
+            'file_format': self.file_format,
+        }
+        if self.node_ids:
+            params['node_ids'] = ','.join(str(node_id) for node_id in self.node_ids.ids)
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/opcua/export?{url_encode(params)}',
+            'target': 'self',
+        }
@@ -0,0 +1,136 @@
+from odoo import models, fields
+from odoo.exceptions import UserError
+import logging
+import requests
+
+_logger = logging.getLogger(__name__)
+
+# Nodes created per create() call
+IMPORT_BATCH_SIZE = 1000
+# Data types whose values fit the numeric value and history fields
+NUMERIC_DATA_TYPES = ('float', 'integer', 'boolean')
+
+
+def is_importable(node):
+    """Only numeric scalar variables are imported: text, byte strings,
+    arrays and structures cannot be stored as a float."""
+    return node.get('data_type') in NUMERIC_DATA_TYPES and node.get('value_rank', -1) in (None, -1)
+
+
+class OpcuaNodeImport(models.TransientModel):
+    _name = 'opcua.node.import'
+    _description = 'Import OPC UA Nodes'
+
+    device_id = fields.Many2one('opcua.device', string='Device', required=True, ondelete='cascade')
+    root_node_id = fields.Char('Browse From', required=True, default='i=85',
+                               help='Node to browse below; i=85 is the Objects folder')
+    max_depth = fields.Integer('Max Depth', default=10)
+    max_nodes = fields.Integer('Max Nodes', default=10000)
+    path_filter = fields.Char('Path Contains',
+                              help='Only import variables whose browse path contains this text (case insensitive)')
+    include_ns0 = fields.Boolean('Include Namespace 0',
+                                 help='Also import the standard server nodes (namespace 0)')
+    refresh = fields.Boolean('Bypass Cache', help='Browse again instead of using the API server cached result')
+    preview = fields.Text('Preview', readonly=True)
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('browsed', 'Browsed')
+    ], default='draft')
+
+    def _browse(self):
+        """Return the variables found by the API server, filtered by path."""
+        self.ensure_one()
+        payload = {
+            'endpoint': self.device_id.endpoint,
+            'node_id': self.root_node_id,
+            'max_depth': self.max_depth,
+            'max_nodes': self.max_nodes,
+            'include_ns0': self.include_ns0,
+        }
+        client = self.device_id._get_bridge_client()
+        nodes = []
+        offset = 0
+        # The API server returns the walk in pages, sliced from its cached result
+        while offset is not None:
+            try:
+                response = client.post('/browse', json=dict(payload, offset=offset, refresh=self.refresh and not offset),
+                                       idempotent=True, timeout=(3.05, 300))
+                response.raise_for_status()
+                data = response.json()
+            except requests.exceptions.ConnectionError:
+                raise UserError(f"Could not connect to OPC UA API at {client.base_url}. "
+                                f"Please ensure the API server is running.")
+            except Exception as e:
+                raise UserError(f"Error browsing {self.device_id.endpoint}: {str(e)}")
+            if data.get('error'):
+                raise UserError(f"Error browsing {self.device_id.endpoint}: {data['error']}")
+            nodes += data.get('nodes', [])
+            offset = data.get('next')
+        if self.path_filter:
+            needle = self.path_filter.lower()
+            nodes = [node for node in nodes if needle in (node.get('path') or '').lower()]
+        return nodes, data.get('truncated')
+
+    def _get_existing_node_ids(self):
+        """Node ids already configured on the device, archived ones included, in one query."""
+        self.env['opcua.node'].flush_model(['node_id', 'device_id'])
+        self.env.cr.execute("SELECT node_id FROM opcua_node WHERE device_id = %s", (self.device_id.id,))
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    def action_browse(self):
+        self.ensure_one()
+        nodes, truncated = self._browse()
+        existing = self._get_existing_node_ids()
+        new_nodes = [node for node in nodes if node['node_id'] not in existing]
+        importable = [node for node in new_nodes if is_importable(node)]
+        lines = [f"{len(nodes)} variables found, {len(new_nodes)} new, {len(nodes) - len(new_nodes)} already configured."]
+        if len(importable) < len(new_nodes):
+            lines.append(f"{len(new_nodes) - len(importable)} new variables are skipped: "
+                         f"only numeric and boolean scalars can be stored.")
+        new_nodes = importable
+        if truncated:
+            lines.append(f"The browse stopped at {self.max_nodes} nodes, raise Max Nodes to see more.")
+        lines += [''] + [f"{node['path']}  ({node['node_id']})" for node in new_nodes[:50]]
+        if len(new_nodes) > 50:
+            lines.append(f"... and {len(new_nodes) - 50} more")
+        self.write({'preview': '\n'.join(lines), 'state': 'browsed', 'refresh': False})
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def action_import(self):
+        """Create the new nodes in batches; the API server serves the browse from its cache."""
+        self.ensure_one()
+        nodes, _truncated = self._browse()
+        seen = self._get_existing_node_ids()
+        vals_list = []
+        for node in nodes:
+            if node['node_id'] in seen or not is_importable(node):
+                continue
+            seen.add(node['node_id'])
+            vals_list.append({
+                'device_id': self.device_id.id,
+                'node_id': node['node_id'],
+                'name': node.get('name') or node['node_id'],
+                'description': node.get('path'),
+                'data_type': node['data_type'],
+            })
+        Node = self.env['opcua.node']
+        for start in range(0, len(vals_list), IMPORT_BATCH_SIZE):
+            Node.create(vals_list[start:start + IMPORT_BATCH_SIZE])
+        _logger.info(f"Imported {len(vals_list)} nodes into device {self.device_id.name}")
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Nodes Imported',
+                'message': f'{len(vals_list)} nodes created on {self.device_id.name}.',
+                'type': 'success',
+                'sticky': False,
+                'next': {'type': 'ir.actions.act_window_close'},
+            }
+        }